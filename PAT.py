@@ -1,14 +1,273 @@
 import requests
 import json
-from typing import Optional, Any, Tuple, Dict, Union
-from rich.console import Console
-from rich.panel import Panel
-from rich.syntax import Syntax
-from rich.table import Table
-from rich import box
+import array
+import atexit
+import codecs
+import collections
+import csv
+import dataclasses
+import datetime
+import enum
+import functools
+import hashlib
+import heapq
+import importlib
+import inspect
+import io
+import math
+import mimetypes
+import mmap
+import multiprocessing
+import os
+import queue
+import random
+import re
+import shutil
+import signal
+import socket
+import string
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Any, Tuple, Dict, Union, List, Callable
+from urllib.parse import quote, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
-# 全局变量存储测试结果
-_test_results: Dict[str, Tuple[str, bool]] = {}
+# 单次请求的耗时（秒）和收发字节数；connect 为 None 表示复用了已有连接。
+# bytes_sent/bytes_received 是请求体和响应体实际传输的字节数（压缩后），
+# *_uncompressed 是压缩前/解压后的字节数；retries 是请求引擎重试的次数
+class Timing:
+    def __init__(self):
+        self.connect: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.total: Optional[float] = None
+        self.bytes_sent = 0
+        self.bytes_sent_uncompressed = 0
+        self.bytes_received = 0
+        self.bytes_received_uncompressed = 0
+        self.retries = 0
+        self.error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"Timing(connect={self.connect}, ttfb={self.ttfb}, total={self.total}, "
+            f"bytes_sent={self.bytes_sent}, bytes_received={self.bytes_received}, "
+            f"retries={self.retries}, error={self.error!r})"
+        )
+
+
+# HTTP 方法函数返回的响应元组，解包方式不变，另外附带请求方法、URL 和耗时信息
+class ApiResponse(tuple):
+    def __new__(
+        cls,
+        status: str,
+        content: Any,
+        status_code: int,
+        extract: Optional[str],
+        method: Optional[str] = None,
+        url: Optional[str] = None,
+        timing: Optional[Timing] = None,
+    ):
+        self = super().__new__(cls, (status, content, status_code, extract))
+        self.method = method
+        self.url = url
+        self.timing = timing
+        return self
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        return self.timing.total if self.timing is not None else None
+
+
+# ---------- 测试结果记录 ----------
+
+# 单条测试结果：每次 run_test 追加一条，重复的描述也会保留
+TestRecord = collections.namedtuple(
+    "TestRecord",
+    [
+        "description",
+        "verb",
+        "url",
+        "status",
+        "success",
+        "duration",
+        "bytes",
+        "connect",
+        "ttfb",
+        "error",
+        "sent",
+        "sent_uncompressed",
+        "received_uncompressed",
+    ],
+    defaults=(None, None, None),
+)
+
+
+# 同一描述的所有结果的汇总，只保存计数和合计值
+class _ResultAggregate:
+    __slots__ = (
+        "count",
+        "failures",
+        "last_status",
+        "last_error",
+        "duration",
+        "timed",
+        "connect",
+        "connect_count",
+        "ttfb",
+        "ttfb_count",
+        "bytes",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.last_status = ""
+        self.last_error: Optional[str] = None
+        self.duration = 0.0
+        self.timed = 0
+        self.connect = 0.0
+        self.connect_count = 0
+        self.ttfb = 0.0
+        self.ttfb_count = 0
+        self.bytes = 0
+
+    def add(self, status: str, record: TestRecord):
+        self.count += 1
+        if not record.success:
+            self.failures += 1
+            self.last_error = record.error
+        self.last_status = status
+        if record.duration is not None:
+            self.duration += record.duration
+            self.timed += 1
+        if record.connect is not None:
+            self.connect += record.connect
+            self.connect_count += 1
+        if record.ttfb is not None:
+            self.ttfb += record.ttfb
+            self.ttfb_count += 1
+        self.bytes += record.bytes or 0
+
+
+# 只追加的测试结果日志：内存中只保留按描述汇总的数据和最慢的几条记录，
+# 完整记录可以实时写入 JSONL 文件
+class ResultsLog:
+    OVERFLOW = "其他描述"
+
+    def __init__(self, max_descriptions: int = 1000, keep_slowest: int = 20):
+        self.max_descriptions = max_descriptions
+        self.keep_slowest = keep_slowest
+        self._lock = threading.Lock()
+        self._file = None
+        self.path: Optional[str] = None
+        self._reset()
+
+    def _reset(self):
+        self._aggregates: Dict[str, _ResultAggregate] = {}
+        self._latencies: Dict[str, "_LatencyStats"] = {}
+        self._slowest: List[Tuple[float, int, str]] = []
+        self.count = 0
+        self.failures = 0
+        self.total_duration = 0.0
+        self.total_bytes = 0
+        self.total_bytes_uncompressed = 0
+        self.total_sent = 0
+        self.total_sent_uncompressed = 0
+
+    def stream_to(self, path: Optional[str]):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = path
+            if path is not None:
+                self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def append(self, status: str, record: TestRecord):
+        with self._lock:
+            aggregate = self._aggregates.get(record.description)
+            if aggregate is None:
+                name = record.description
+                if len(self._aggregates) >= self.max_descriptions:
+                    name = self.OVERFLOW
+                aggregate = self._aggregates.setdefault(name, _ResultAggregate())
+            aggregate.add(status, record)
+            self.count += 1
+            if not record.success:
+                self.failures += 1
+            self.total_bytes += record.bytes or 0
+            self.total_bytes_uncompressed += (
+                record.received_uncompressed or record.bytes or 0
+            )
+            self.total_sent += record.sent or 0
+            self.total_sent_uncompressed += record.sent_uncompressed or 0
+            if record.duration is not None:
+                self.total_duration += record.duration
+                entry = (record.duration, self.count, record.description)
+                if len(self._slowest) < self.keep_slowest:
+                    heapq.heappush(self._slowest, entry)
+                elif entry > self._slowest[0]:
+                    heapq.heapreplace(self._slowest, entry)
+            if self._file is not None:
+                self._file.write(_dumps(record._asdict()).decode("utf-8") + "\n")
+
+    # 设置了 p95 预算的描述才保存耗时直方图，返回加入本次耗时后的统计
+    def add_latency(self, description: str, duration: float) -> "_LatencyStats":
+        with self._lock:
+            stats = self._latencies.get(description)
+            if stats is None:
+                if len(self._latencies) >= self.max_descriptions:
+                    description = self.OVERFLOW
+                stats = self._latencies.setdefault(description, _LatencyStats())
+            stats.add(duration, True)
+            return stats
+
+    def aggregates(self) -> List[Tuple[str, _ResultAggregate]]:
+        with self._lock:
+            return list(self._aggregates.items())
+
+    def slowest(self, n: int) -> List[Tuple[float, str]]:
+        with self._lock:
+            ranked = sorted(self._slowest, reverse=True)[:n]
+        return [(duration, description) for duration, _, description in ranked]
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def close(self):
+        self.stream_to(None)
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def read_results(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield TestRecord(**_loads(line))
+
+
+# 全局测试结果日志；设置 PAT_RESULTS_FILE 时同时写入该 JSONL 文件
+_test_results = ResultsLog()
+if os.environ.get("PAT_RESULTS_FILE"):
+    _test_results.stream_to(os.environ["PAT_RESULTS_FILE"])
+
+
+def stream_results(path: Optional[str]):
+    _test_results.stream_to(path)
+
+
+atexit.register(_test_results.close)
 
 
 def _get_status_color(status_code: int) -> str:
@@ -21,130 +280,5203 @@ def _get_status_color(status_code: int) -> str:
     return "white"
 
 
-def print_info(title: str, info: Dict[str, Any]):
-    console = Console()
+# 输出详细程度：full 显示全部，failures 只显示失败的步骤，
+# summary 只显示汇总，silent 不输出任何内容（结果仍会记录）
+VERBOSITY_LEVELS = ("full", "failures", "summary", "silent")
+_verbosity = os.environ.get("PAT_VERBOSITY", "full")
+if _verbosity not in VERBOSITY_LEVELS:
+    _verbosity = "full"
+
+# 渲染响应体的上限：列表/对象最多显示的元素数、最多显示的行数和字符数
+_render_limits = {"max_items": 50, "max_lines": 300, "max_chars": 64 * 1024}
+
+# 无界面模式：只输出纯文本行，从不导入 rich
+_headless = os.environ.get("PAT_HEADLESS", "") not in ("", "0")
+
+_console: Optional[Any] = None
+
+_RICH_MODULES = {
+    "Console": "rich.console",
+    "Group": "rich.console",
+    "Live": "rich.live",
+    "Panel": "rich.panel",
+    "Syntax": "rich.syntax",
+    "Table": "rich.table",
+    "Text": "rich.text",
+    "box": "rich.box",
+}
+
+
+# rich（以及 Syntax 依赖的 Pygments）在第一次渲染时才导入
+@functools.lru_cache(maxsize=None)
+def _rich(name: str) -> Any:
+    module = importlib.import_module(_RICH_MODULES[name])
+    return module if name == "box" else getattr(module, name)
+
+
+def _get_console() -> Any:
+    global _console
+    if _console is None:
+        _console = _rich("Console")()
+    return _console
+
+
+def set_headless(enabled: bool = True):
+    global _headless
+    _headless = enabled
+
+
+def is_headless() -> bool:
+    return _headless
+
+
+_MARKUP = re.compile(
+    r"\[/?(?:bold|dim|green|red|yellow|blue|white|magenta|cyan)"
+    r"(?: (?:bold|dim|green|red|yellow|blue|white|magenta|cyan))*\]"
+)
+
+
+def _strip_markup(text: str) -> str:
+    return _MARKUP.sub("", text)
+
+
+# 无界面模式下代替 rich 表格，只记录表头和行
+class _PlainTable:
+    def __init__(self):
+        self.columns: List[str] = []
+        self.rows: List[Tuple[str, ...]] = []
+
+    def add_column(self, header: str, **kwargs):
+        self.columns.append(header)
+
+    def add_row(self, *cells: str):
+        self.rows.append(cells)
+
+    def lines(self) -> List[str]:
+        lines = ["  ".join(self.columns)]
+        for cells in self.rows:
+            if not any(cells):
+                continue
+            text = "  ".join(_strip_markup(c).replace("\n", " ") for c in cells)
+            lines.append(text.rstrip())
+        return lines
+
+
+def _new_table() -> Any:
+    if _headless:
+        return _PlainTable()
+    return _rich("Table")(
+        show_header=True, header_style="magenta", box=_rich("box").ROUNDED, expand=True
+    )
+
+
+def _print_panel(
+    renderable: Any, title: str, border_style: str, subtitle: Optional[str] = None
+):
+    if _headless:
+        lines = [f"== {_strip_markup(title)} =="]
+        if isinstance(renderable, _PlainTable):
+            lines.extend(renderable.lines())
+        else:
+            lines.append(str(renderable))
+        if subtitle:
+            lines.append(_strip_markup(subtitle))
+        print("\n".join(lines))
+        return
+    _get_console().print(
+        _rich("Panel")(
+            renderable,
+            title=title,
+            subtitle=subtitle,
+            border_style=border_style,
+            expand=True,
+        )
+    )
+
+
+def _print_line(text: str):
+    if _headless:
+        print(_strip_markup(text))
+    else:
+        _get_console().print(text)
+
+
+def set_verbosity(level: str):
+    global _verbosity
+    if level not in VERBOSITY_LEVELS:
+        raise ValueError(f"未知的输出级别: {level}，可选: {', '.join(VERBOSITY_LEVELS)}")
+    _verbosity = level
+
+
+def get_verbosity() -> str:
+    return _verbosity
+
+
+def set_render_limits(
+    max_items: Optional[int] = None,
+    max_lines: Optional[int] = None,
+    max_chars: Optional[int] = None,
+):
+    for name, value in (
+        ("max_items", max_items),
+        ("max_lines", max_lines),
+        ("max_chars", max_chars),
+    ):
+        if value is not None:
+            _render_limits[name] = value
+
+
+def _truncate(obj: Any, max_items: int) -> Any:
+    if isinstance(obj, list):
+        items = [_truncate(v, max_items) for v in obj[:max_items]]
+        if len(obj) > max_items:
+            items.append(f"... 还有 {len(obj) - max_items} 项")
+        return items
+    if isinstance(obj, dict):
+        result = {}
+        for i, (k, v) in enumerate(obj.items()):
+            if i >= max_items:
+                result["..."] = f"还有 {len(obj) - max_items} 个字段"
+                break
+            result[k] = _truncate(v, max_items)
+        return result
+    return obj
+
+
+def _render_body(display_content: Any) -> Any:
+    if not isinstance(display_content, (dict, list)):
+        text = str(display_content)
+        max_chars = _render_limits["max_chars"]
+        if len(text) > max_chars:
+            text = text[:max_chars] + f"\n... 已截断 {len(text) - max_chars} 个字符"
+        return text
+
+    json_str = json.dumps(
+        _truncate(display_content, _render_limits["max_items"]),
+        indent=4,
+        ensure_ascii=False,
+    )
+    max_chars = _render_limits["max_chars"]
+    if len(json_str) > max_chars:
+        cut = json_str.rfind("\n", 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        json_str = json_str[:cut] + f"\n... 已截断 {len(json_str) - cut} 个字符"
+    max_lines = _render_limits["max_lines"]
+    if json_str.count("\n") >= max_lines:
+        lines = json_str.split("\n")
+        json_str = "\n".join(
+            lines[:max_lines] + [f"... 还有 {len(lines) - max_lines} 行"]
+        )
+    if _headless:
+        return json_str
+    return _rich("Syntax")(
+        json_str,
+        "json",
+        theme="dracula",
+        line_numbers=True,
+        background_color="default",
+    )
+
+
+def print_info(title: str, info: Dict[str, Any]):
+    if _load_stats is not None or _verbosity in ("summary", "silent"):
+        return
+    table = _new_table()
+    table.add_column("Key", style="dim", width=20)
+    table.add_column("Value")
+
+    for k, v in info.items():
+        table.add_row(str(k), str(v))
+
+    _print_panel(table, title, "green")
+
+
+def _format_ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+
+def _format_bytes(size: Optional[int]) -> str:
+    if size is None:
+        return "-"
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def show_result(title: str = "测试结果汇总", slowest: int = 3):
+    if _verbosity == "silent":
+        _test_results.clear()
+        return
+    if not _test_results:
+        _print_line("[yellow]没有测试结果可显示[/yellow]")
+        return
+
+    table = _new_table()
+    table.add_column("测试描述", style="dim", min_width=20, ratio=1)
+    table.add_column("结果", width=10)
+    table.add_column("耗时", justify="right", no_wrap=True)
+    table.add_column("连接", justify="right", no_wrap=True)
+    table.add_column("首字节", justify="right", no_wrap=True)
+    table.add_column("大小", justify="right", no_wrap=True)
+
+    regressions = {r.description: r for r in check_baseline()}
+    repeated = False
+    for description, agg in _test_results.aggregates():
+        regression = regressions.get(description)
+        # 重复的描述显示平均耗时和平均大小
+        durations = (
+            _format_ms(agg.duration / agg.timed) if agg.timed else "-",
+            _format_ms(agg.connect / agg.connect_count) if agg.connect_count else "-",
+            _format_ms(agg.ttfb / agg.ttfb_count) if agg.ttfb_count else "-",
+            _format_bytes(agg.bytes // agg.count) if agg.timed else "-",
+        )
+        if agg.count > 1:
+            repeated = True
+            description = f"{description} [bold]×{agg.count}[/bold]"
+        if not agg.failures:
+            result = f"[green]{agg.last_status} 成功[/green]"
+        elif agg.count > 1:
+            result = f"[red]❌ 失败 {agg.failures}/{agg.count}[/red]"
+        else:
+            result = f"[red]{agg.last_status} 失败[/red]"
+        if agg.failures and agg.last_error:
+            result += f"\n[red]{agg.last_error}[/red]"
+        if regression is not None:
+            result += (
+                f"\n[yellow]变慢 {regression.ratio - 1:+.0%}"
+                f"（基线 {_format_ms(regression.baseline)} ms）[/yellow]"
+            )
+        table.add_row(description, result, *durations)
+
+    table.add_row("", "", "", "", "", "")
+    timed = _test_results.slowest(slowest) if slowest else []
+    if timed:
+        for rank, (elapsed, description) in enumerate(timed, 1):
+            table.add_row(
+                f"[bold]最慢 #{rank}[/bold] {description}",
+                "",
+                f"[yellow]{_format_ms(elapsed)}[/yellow]",
+                "",
+                "",
+                "",
+            )
+        table.add_row("", "", "", "", "", "")
+    success_count = _test_results.count - _test_results.failures
+    table.add_row(
+        "[bold]总计[/bold]",
+        f"[green]成功: {success_count}[/green] | [red]失败: {_test_results.failures}[/red]",
+        f"[bold]{_format_ms(_test_results.total_duration)}[/bold]",
+        "",
+        "",
+        f"[bold]{_format_bytes(_test_results.total_bytes)}[/bold]",
+    )
+    transfer = _transfer_summary(_test_results)
+    if transfer:
+        table.add_row(f"[bold]传输量[/bold] {transfer}", "", "", "", "", "")
+
+    subtitle = "耗时单位: ms"
+    if repeated:
+        subtitle += "，重复的描述显示平均值"
+    if regressions:
+        subtitle += (
+            f"，[yellow]{len(regressions)} 个步骤比基线慢"
+            f" {_baseline_tolerance:.0%} 以上[/yellow]"
+        )
+    _print_panel(table, title, "cyan", subtitle)
+
+    _test_results.clear()
+
+
+def clear_test_results():
+    _test_results.clear()
+
+
+def _saving(wire: int, raw: int) -> str:
+    if not raw or wire == raw:
+        return ""
+    return f"，节省 {1 - wire / raw:.0%}"
+
+
+# 有发送字节或响应经过压缩时，汇总发送和接收的传输量与压缩前大小
+def _transfer_summary(log: ResultsLog) -> Optional[str]:
+    sent, sent_raw = log.total_sent, log.total_sent_uncompressed
+    received, received_raw = log.total_bytes, log.total_bytes_uncompressed
+    if not sent and received == received_raw:
+        return None
+    parts = []
+    if sent:
+        parts.append(
+            f"发送 {_format_bytes(sent)}（压缩前 {_format_bytes(sent_raw)}{_saving(sent, sent_raw)}）"
+        )
+    parts.append(
+        f"接收 {_format_bytes(received)}（解压后 {_format_bytes(received_raw)}{_saving(received, received_raw)}）"
+    )
+    return "，".join(parts)
+
+
+# ---------- 实时进度 ----------
+
+# 无界面模式下输出进度行的最短间隔（秒）
+_PLAIN_PROGRESS_INTERVAL = 5.0
+
+
+# 大量步骤时代替逐条面板：用 rich Live 按固定频率刷新一个进度面板，
+# 显示完成数、成功/失败数、吞吐量、最近 window 条的耗时分位数和最近的失败，
+# 结束时输出 show_result 汇总
+class LiveProgress:
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        title: str = "测试结果汇总",
+        failures: int = 5,
+        window: int = 1000,
+        refresh_per_second: float = 4,
+        show: bool = True,
+    ):
+        self.total = total
+        self.title = title
+        self.refresh_per_second = refresh_per_second
+        self.show = show
+        self._lock = threading.Lock()
+        self._recent: collections.deque = collections.deque(maxlen=window)
+        self._failures: collections.deque = collections.deque(maxlen=failures)
+        self._live = None
+        self.completed = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._next_line = 0.0
+
+    def __enter__(self) -> "LiveProgress":
+        global _live_progress
+        if _live_progress is not None:
+            raise RuntimeError("已有一个实时进度面板在运行")
+        self.started = time.perf_counter()
+        self._next_line = self.started + _PLAIN_PROGRESS_INTERVAL
+        if _verbosity != "silent" and not _headless:
+            # 刷新在 rich 的后台线程中进行，run_test 只更新计数
+            self._live = _rich("Live")(
+                console=_get_console(),
+                get_renderable=self._render,
+                refresh_per_second=self.refresh_per_second,
+                transient=True,
+            )
+            self._live.start()
+        _live_progress = self
+        return self
+
+    def __exit__(self, *exc):
+        global _live_progress
+        _live_progress = None
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+        elif _headless and self.completed and _verbosity != "silent":
+            print(self._plain_line())
+        if self.show:
+            show_result(self.title)
+
+    def record(
+        self,
+        description: str,
+        success: bool,
+        status_code: int,
+        content: Any,
+        duration: Optional[float],
+    ):
+        now = time.perf_counter()
+        with self._lock:
+            self.completed += 1
+            self._recent.append((now, duration))
+            if not success:
+                self.failed += 1
+                self._failures.append((description, status_code, _failure_text(content)))
+        if _headless and now >= self._next_line and _verbosity != "silent":
+            self._next_line = now + _PLAIN_PROGRESS_INTERVAL
+            print(self._plain_line())
+
+    def _snapshot(self):
+        with self._lock:
+            recent = list(self._recent)
+            failures = list(self._failures)
+            completed, failed = self.completed, self.failed
+        elapsed = time.perf_counter() - self.started
+        # 吞吐量按最近 window 条的完成时间计算，开始阶段按总耗时
+        if len(recent) > 1 and recent[-1][0] > recent[0][0]:
+            rate = (len(recent) - 1) / (recent[-1][0] - recent[0][0])
+        else:
+            rate = completed / elapsed if elapsed > 0 else 0.0
+        durations = sorted(d for _, d in recent if d is not None)
+        percentiles = {p: _nearest_rank(durations, p) for p in (50, 95, 99)}
+        return completed, failed, rate, elapsed, percentiles, len(durations), failures
+
+    def _progress_text(self, completed: int) -> str:
+        if self.total:
+            return f"{completed}/{self.total} ({completed / self.total:.0%})"
+        return str(completed)
+
+    def _plain_line(self) -> str:
+        completed, failed, rate, elapsed, pct, _, _ = self._snapshot()
+        return (
+            f"进度 {self._progress_text(completed)}  成功 {completed - failed}  失败 {failed}"
+            f"  {rate:.1f}/s  p50 {_format_ms(pct[50])} ms  p95 {_format_ms(pct[95])} ms"
+            f"  p99 {_format_ms(pct[99])} ms  已用 {elapsed:.1f}s"
+        )
+
+    def _render(self) -> Any:
+        completed, failed, rate, elapsed, pct, sampled, failures = self._snapshot()
+        stats = _rich("Table").grid(padding=(0, 3))
+        for _ in range(4):
+            stats.add_column()
+        stats.add_row(
+            f"进度 [bold]{self._progress_text(completed)}[/bold]",
+            f"[green]成功 {completed - failed}[/green]",
+            f"[red]失败 {failed}[/red]",
+            f"吞吐 [bold]{rate:.1f}[/bold] 次/秒",
+        )
+        stats.add_row(
+            f"p50 [bold]{_format_ms(pct[50])}[/bold] ms",
+            f"p95 [bold]{_format_ms(pct[95])}[/bold] ms",
+            f"p99 [bold]{_format_ms(pct[99])}[/bold] ms",
+            f"[dim]最近 {sampled} 条，已用 {elapsed:.1f}s[/dim]",
+        )
+        parts = [stats]
+        if failures:
+            table = _new_table()
+            table.add_column("最近失败", style="dim", ratio=1)
+            table.add_column("状态码", width=8)
+            table.add_column("错误", ratio=2, no_wrap=True, overflow="ellipsis")
+            for description, status_code, text in failures:
+                color = _get_status_color(status_code)
+                table.add_row(
+                    description, f"[{color}]{status_code}[/{color}]", _escape(text)
+                )
+            parts.append(table)
+        return _rich("Panel")(
+            _rich("Group")(*parts),
+            title=self.title,
+            border_style="cyan",
+            subtitle="耗时单位: ms",
+            expand=True,
+        )
+
+
+def live_progress(
+    total: Optional[int] = None,
+    title: str = "测试结果汇总",
+    failures: int = 5,
+    window: int = 1000,
+    refresh_per_second: float = 4,
+    show: bool = True,
+) -> LiveProgress:
+    return LiveProgress(total, title, failures, window, refresh_per_second, show)
+
+
+_live_progress: Optional[LiveProgress] = None
+
+
+def _nearest_rank(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    return values[max(0, math.ceil(len(values) * p / 100) - 1)]
+
+
+# 失败的响应内容压成一行，供进度面板显示
+def _failure_text(content: Any, limit: int = 200) -> str:
+    if isinstance(content, StreamedBody):
+        text = content.error or ""
+    elif isinstance(content, (dict, list)):
+        text = json.dumps(content, ensure_ascii=False, default=str)
+    else:
+        text = str(content)
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def _escape(text: str) -> str:
+    return text.replace("[", "\\[")
+
+
+# ---------- 耗时预算与性能基线 ----------
+
+# 比基线慢的步骤：baseline 和 current 为平均耗时（秒），ratio 为 current / baseline
+Regression = collections.namedtuple(
+    "Regression", ["description", "baseline", "current", "ratio"]
+)
+
+# 样本数少于此值时 p95 就是最大值，不据此判定
+_P95_MIN_SAMPLES = 20
+
+_baseline: Optional[Dict[str, float]] = None
+_baseline_tolerance = 0.2
+_baseline_min_delta = 0.005
+
+
+# 返回超出预算的原因，没有超出时返回 None
+def _check_budget(
+    description: str,
+    duration: float,
+    max_time: Optional[float],
+    max_p95: Optional[float],
+) -> Optional[str]:
+    if max_time is not None and duration > max_time:
+        over = f"超出耗时预算: {_format_ms(duration)} > {_format_ms(max_time)} ms"
+    else:
+        over = None
+    if max_p95 is not None:
+        stats = _test_results.add_latency(description, duration)
+        if over is None and stats.recorded >= _P95_MIN_SAMPLES:
+            p95 = stats.percentile(95)
+            if p95 > max_p95:
+                over = f"p95 超出预算: {_format_ms(p95)} > {_format_ms(max_p95)} ms"
+    return over
+
+
+# 把当前测试结果中每个描述的平均耗时写入基线文件，应在 show_result 之前调用
+def save_baseline(path: str):
+    steps = {}
+    for description, agg in _test_results.aggregates():
+        if agg.timed and description != ResultsLog.OVERFLOW:
+            steps[description] = {
+                "count": agg.timed,
+                "mean": round(agg.duration / agg.timed, 6),
+            }
+    partial = path + ".part"
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "steps": steps}, f, ensure_ascii=False, indent=2)
+    os.replace(partial, path)
+
+
+# 载入基线文件；之后 show_result 会标出平均耗时比基线慢 tolerance 以上、
+# 且绝对差值超过 min_delta 秒的步骤
+def load_baseline(path: Optional[str], tolerance: float = 0.2, min_delta: float = 0.005):
+    global _baseline, _baseline_tolerance, _baseline_min_delta
+    if path is None:
+        _baseline = None
+        return
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    _baseline = {
+        description: step["mean"]
+        for description, step in data.get("steps", {}).items()
+        if step.get("mean")
+    }
+    _baseline_tolerance = tolerance
+    _baseline_min_delta = min_delta
+
+
+def check_baseline() -> List[Regression]:
+    if not _baseline:
+        return []
+    regressions = []
+    for description, agg in _test_results.aggregates():
+        old = _baseline.get(description)
+        if old is None or not agg.timed:
+            continue
+        current = agg.duration / agg.timed
+        if (
+            current > old * (1 + _baseline_tolerance)
+            and current - old > _baseline_min_delta
+        ):
+            regressions.append(Regression(description, old, current, current / old))
+    return regressions
+
+
+if os.environ.get("PAT_BASELINE"):
+    load_baseline(os.environ["PAT_BASELINE"])
+
+
+# ---------- 事件钩子与性能剖析 ----------
+
+# 请求、解析、提取、渲染和记录各环节触发的事件；结束类事件带有该环节耗时 elapsed_ns
+HOOK_EVENTS = (
+    "request_start",
+    "request_end",
+    "response_parsed",
+    "render_start",
+    "render_end",
+    "result_recorded",
+    "extract_done",
+    "request_retry",
+    "circuit_open",
+)
+
+# 传给钩子的事件：time_ns 为 time.perf_counter_ns() 时间戳，data 为事件相关的字段
+HookEvent = collections.namedtuple("HookEvent", ["name", "time_ns", "data"])
+
+# 没有注册钩子时为空字典，各触发点只做一次真值判断
+_hooks: Dict[str, List[Callable[[HookEvent], Any]]] = {}
+_hooks_lock = threading.Lock()
+
+
+def add_hook(event: str, callback: Callable[[HookEvent], Any]):
+    if event not in HOOK_EVENTS:
+        raise ValueError(f"未知的事件: {event}，可选: {', '.join(HOOK_EVENTS)}")
+    with _hooks_lock:
+        # 触发时遍历的是列表快照，注册和移除都替换整个列表
+        _hooks[event] = _hooks.get(event, []) + [callback]
+
+
+def remove_hook(event: str, callback: Callable[[HookEvent], Any]):
+    with _hooks_lock:
+        callbacks = [c for c in _hooks.get(event, []) if c != callback]
+        if callbacks:
+            _hooks[event] = callbacks
+        else:
+            _hooks.pop(event, None)
+
+
+def _emit(name: str, time_ns: Optional[int] = None, **data: Any):
+    callbacks = _hooks.get(name)
+    if not callbacks:
+        return
+    event = HookEvent(name, time_ns or time.perf_counter_ns(), data)
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            # 钩子出错不影响测试本身
+            _print_line(
+                f"[bold red]Warning:[/bold red] 钩子 {getattr(callback, '__name__', callback)} 处理 {name} 事件时出错: {e}"
+            )
+
+
+def _emit_request_end(
+    method: str, url: str, status: Optional[int], timing: Timing, started_ns: int
+):
+    _emit(
+        "request_end",
+        method=method,
+        url=url,
+        status=status,
+        error=timing.error,
+        bytes=timing.bytes_received,
+        elapsed_ns=time.perf_counter_ns() - started_ns,
+    )
+
+
+def _emit_extract_done(
+    description: str, paths: Tuple[str, ...], errors: Dict[int, str], started_ns: int
+):
+    _emit(
+        "extract_done",
+        description=description,
+        paths=paths,
+        errors=len(errors),
+        elapsed_ns=time.perf_counter_ns() - started_ns,
+    )
+
+
+# 结束类事件对应的环节
+_PHASES = {
+    "request_end": "网络",
+    "response_parsed": "JSON 解析",
+    "extract_done": "数据提取",
+    "render_end": "渲染",
+}
+
+
+class _PhaseStats:
+    __slots__ = ("count", "total_ns", "max_ns", "peak_bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.peak_bytes = 0
+
+
+# Python 3.12 起 cProfile 基于 sys.monitoring，一个 Profile 就能记录所有线程；
+# 更早的版本只记录调用 enable 的线程，工作线程需要各自的 Profile
+_PROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+
+# 同一时间只能有一个会话开启 cProfile，嵌套的会话只统计各环节耗时和内存
+_cpu_session: Optional["ProfileSession"] = None
+_cpu_session_lock = threading.Lock()
+
+
+# 性能剖析会话：按环节统计客户端耗时（以及开启 memory 时的内存峰值），
+# 可选用 cProfile 记录函数级耗时；可以包住整个套件，也可以只包住单个步骤
+#
+#   with profile_session(memory=True, output="suite.prof"):
+#       ...
+class ProfileSession:
+    def __init__(
+        self,
+        cpu: bool = True,
+        memory: bool = False,
+        output: Optional[str] = None,
+        top: int = 15,
+        show: bool = True,
+        title: str = "性能剖析",
+    ):
+        self.cpu = cpu
+        self.memory = memory
+        self.output = output
+        self.top = top
+        self.show = show
+        self.title = title
+        self.phases: Dict[str, _PhaseStats] = {}
+        self.stats = None
+        self.allocations: List[Any] = []
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+        self.cpu_skipped: Optional[str] = None
+        self._profiler = None
+        self._thread_profilers: List[Any] = []
+        self._previous_hook = None
+        self._tracemalloc = None
+        self._started_tracing = False
+        self._marks: Dict[int, int] = {}
+        self._started = 0.0
+
+    def __enter__(self) -> "ProfileSession":
+        global _cpu_session
+        # 剖析用到的模块在开始记录内存之前导入，不计入内存统计
+        if self.cpu:
+            with _cpu_session_lock:
+                if _cpu_session is None:
+                    _cpu_session = self
+            if _cpu_session is self:
+                self._profiler = importlib.import_module("cProfile").Profile()
+                importlib.import_module("pstats")
+            else:
+                self.cpu_skipped = "外层剖析会话已开启 cProfile"
+        if self.memory:
+            self._tracemalloc = importlib.import_module("tracemalloc")
+            if not self._tracemalloc.is_tracing():
+                self._tracemalloc.start()
+                self._started_tracing = True
+        self._started = time.perf_counter()
+        if self._profiler is not None:
+            if not _PROFILE_ALL_THREADS:
+                # 剖析期间新启动的线程（套件、负载测试的工作线程）各自开启一个 Profile
+                self._previous_hook = threading.getprofile()
+                threading.setprofile(self._profile_thread)
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # 调试器等其他剖析工具已经占用了 cProfile
+                self._release_profiler()
+                self.cpu_skipped = "其他剖析工具正在运行"
+        # 钩子在剖析开始后才注册，开启失败时不会残留
+        for event in HOOK_EVENTS:
+            add_hook(event, self._on_event)
+        return self
+
+    def _release_profiler(self):
+        global _cpu_session
+        if not _PROFILE_ALL_THREADS:
+            threading.setprofile(self._previous_hook)
+        self._profiler = None
+        with _cpu_session_lock:
+            if _cpu_session is self:
+                _cpu_session = None
+
+    def _profile_thread(self, frame, event, arg):
+        profiler = importlib.import_module("cProfile").Profile()
+        with self._lock:
+            self._thread_profilers.append(profiler)
+        profiler.enable()
+
+    def __exit__(self, *exc):
+        profiler = self._profiler
+        if profiler is not None:
+            profiler.disable()
+            self._release_profiler()
+        self.elapsed = time.perf_counter() - self._started
+        for event in HOOK_EVENTS:
+            remove_hook(event, self._on_event)
+        if self._tracemalloc is not None:
+            tracemalloc = self._tracemalloc
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                )
+            )
+            self.allocations = snapshot.statistics("lineno")[: self.top]
+            if self._started_tracing:
+                tracemalloc.stop()
+        if profiler is not None:
+            self.stats = importlib.import_module("pstats").Stats(profiler)
+            with self._lock:
+                thread_profilers, self._thread_profilers = self._thread_profilers, []
+            for thread_profiler in thread_profilers:
+                self.stats.add(thread_profiler)
+            if self.output:
+                self.stats.dump_stats(self.output)
+        if self.show:
+            show_profile(self)
+
+    # 每个事件都是上一环节的结束和下一环节的开始；内存峰值按线程记录起点，
+    # 多线程并发时 tracemalloc 的峰值是全局的，只能作为近似
+    def _on_event(self, event: HookEvent):
+        phase = _PHASES.get(event.name)
+        thread = threading.get_ident()
+        peak = 0
+        if self._tracemalloc is not None:
+            current, high = self._tracemalloc.get_traced_memory()
+            if phase is not None:
+                peak = max(high - self._marks.get(thread, current), 0)
+            self._marks[thread] = current
+            self._tracemalloc.reset_peak()
+        if phase is None:
+            return
+        elapsed = event.data.get("elapsed_ns", 0)
+        with self._lock:
+            stats = self.phases.get(phase)
+            if stats is None:
+                stats = self.phases[phase] = _PhaseStats()
+            stats.count += 1
+            stats.total_ns += elapsed
+            stats.max_ns = max(stats.max_ns, elapsed)
+            stats.peak_bytes = max(stats.peak_bytes, peak)
+
+
+def profile_session(
+    cpu: bool = True,
+    memory: bool = False,
+    output: Optional[str] = None,
+    top: int = 15,
+    show: bool = True,
+    title: str = "性能剖析",
+) -> ProfileSession:
+    return ProfileSession(cpu, memory, output, top, show, title)
+
+
+def show_profile(session: ProfileSession):
+    if _verbosity == "silent":
+        return
+    table = _new_table()
+    table.add_column("环节", style="dim", min_width=12, ratio=1)
+    table.add_column("次数", justify="right", no_wrap=True)
+    table.add_column("合计", justify="right", no_wrap=True)
+    table.add_column("平均", justify="right", no_wrap=True)
+    table.add_column("最大", justify="right", no_wrap=True)
+    table.add_column("占比", justify="right", no_wrap=True)
+    if session.memory:
+        table.add_column("内存峰值", justify="right", no_wrap=True)
+    accounted = 0
+    for phase in _PHASES.values():
+        stats = session.phases.get(phase)
+        if stats is None:
+            continue
+        accounted += stats.total_ns
+        row = [
+            phase,
+            str(stats.count),
+            _format_ms(stats.total_ns / 1e9),
+            _format_ms(stats.total_ns / stats.count / 1e9),
+            _format_ms(stats.max_ns / 1e9),
+            f"{stats.total_ns / 1e9 / session.elapsed:.1%}" if session.elapsed else "-",
+        ]
+        if session.memory:
+            row.append(_format_bytes(stats.peak_bytes))
+        table.add_row(*row)
+    other = max(session.elapsed - accounted / 1e9, 0.0)
+    row = ["[bold]其他[/bold]", "", _format_ms(other), "", "", ""]
+    if session.elapsed:
+        row[5] = f"{other / session.elapsed:.1%}"
+    if session.memory:
+        row.append("")
+    table.add_row(*row)
+    caption = f"总耗时 {_format_ms(session.elapsed)} ms，耗时单位: ms；并发时各环节耗时之和可能超过总耗时"
+    if session.cpu_skipped:
+        caption += f"\n{session.cpu_skipped}，本会话未记录 cProfile 函数耗时"
+    _print_panel(table, session.title, "magenta", caption)
+
+    if session.stats is not None:
+        buffer = io.StringIO()
+        session.stats.stream = buffer
+        session.stats.sort_stats("cumulative").print_stats(session.top)
+        text = buffer.getvalue().strip()
+        # 去掉 pstats 输出开头的汇总行，只保留函数表
+        start = text.find("   ncalls")
+        _print_panel(
+            _plain_text(text[start:] if start >= 0 else text),
+            "cProfile（按累计耗时）",
+            "magenta",
+        )
+    if session.allocations:
+        lines = [
+            f"{_format_bytes(stat.size):>10}  {stat.count:>8} 次  {stat.traceback}"
+            for stat in session.allocations
+        ]
+        _print_panel(
+            _plain_text("\n".join(lines)), "tracemalloc（按代码行）", "magenta"
+        )
+
+
+# 不解析 rich 标记的文本，用于显示函数名、文件路径等原样内容
+def _plain_text(text: str) -> Any:
+    return text if _headless else _rich("Text")(text)
+
+
+# ---------- 数据提取 ----------
+#
+# 提取路径用 "." 分隔，每一段可以是：
+#   字段名或列表下标（支持负数下标，如 "-1"）
+#   "*"      遍历列表的所有元素或对象的所有值
+#   "0:10"   列表切片，语法与 Python 切片相同；作用于对象时按字面键名查找（如 "10:30"）
+# 使用 "*" 或切片后，后续路径作用于每个元素，结果为列表（缺失的元素被跳过）；
+# 没有任何元素匹配时报告第一个元素的失败原因
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_path(path: str) -> Tuple[Tuple[Any, ...], ...]:
+    segments = []
+    for part in path.split("."):
+        if part == "*":
+            segments.append(("wild", part, None))
+        elif ":" in part and _is_slice(part):
+            bounds = tuple(int(b) if b else None for b in part.split(":"))
+            segments.append(("slice", part, bounds))
+        else:
+            digits = part[1:] if part.startswith("-") else part
+            index = int(part) if digits.isdigit() else None
+            segments.append(("key", part, index))
+    return tuple(segments)
+
+
+def _is_slice(part: str) -> bool:
+    bounds = part.split(":")
+    if len(bounds) > 3:
+        return False
+    for b in bounds:
+        digits = b[1:] if b.startswith("-") else b
+        if b and not digits.isdigit():
+            return False
+    return True
+
+
+# 多条路径合并成前缀树，一次遍历即可取出全部路径的值
+class _PathTrie:
+    def __init__(self):
+        self.children: Dict[Tuple[Any, ...], "_PathTrie"] = {}
+        self.ends: List[int] = []
+        self.all_ends: List[int] = []
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_paths(paths: Tuple[str, ...]) -> _PathTrie:
+    root = _PathTrie()
+    for i, path in enumerate(paths):
+        node = root
+        node.all_ends.append(i)
+        for segment in _compile_path(path):
+            node = node.children.setdefault(segment, _PathTrie())
+            node.all_ends.append(i)
+        node.ends.append(i)
+    return root
+
+
+def _type_name(obj: Any) -> str:
+    if obj is None:
+        return "null"
+    if isinstance(obj, dict):
+        return "object"
+    if isinstance(obj, (list, _SparseList)):
+        return "list"
+    return type(obj).__name__
+
+
+def _walk(
+    obj: Any,
+    trie: _PathTrie,
+    location: str,
+    found: Dict[int, Any],
+    errors: Dict[int, str],
+):
+    for i in trie.ends:
+        found[i] = obj
+    for (kind, text, arg), child in trie.children.items():
+        here = f"{location}.{text}" if location else text
+        if kind == "key":
+            if isinstance(obj, dict):
+                if text in obj:
+                    _walk(obj[text], child, here, found, errors)
+                    continue
+                reason = f"key '{text}' not found"
+            elif isinstance(obj, (list, _SparseList)) and arg is not None:
+                if -len(obj) <= arg < len(obj):
+                    _walk(obj[arg], child, here, found, errors)
+                    continue
+                reason = f"index {arg} out of range (length {len(obj)})"
+            else:
+                reason = f"cannot look up '{text}' in {_type_name(obj)}"
+        else:
+            column = obj.columns.get((kind, text, arg)) if isinstance(obj, _SparseList) else None
+            leaves = _key_suffixes(child) if column is not None else None
+            if leaves is not None and all(suffix in column.values for suffix, _ in leaves):
+                _walk_column(column, leaves, child, here, found, errors)
+                continue
+            if isinstance(obj, list) and kind == "slice":
+                items = map(obj.__getitem__, range(*slice(*arg).indices(len(obj))))
+            elif isinstance(obj, (list, _SparseList)):
+                items = obj if kind == "wild" else obj[slice(*arg)]
+            elif isinstance(obj, dict) and kind == "wild":
+                items = obj.values()
+            elif isinstance(obj, dict) and text in obj:
+                # 形如切片的字段名（如 "10:30"）
+                _walk(obj[text], child, here, found, errors)
+                continue
+            else:
+                reason = f"cannot apply '{text}' to {_type_name(obj)}"
+                for i in child.all_ends:
+                    errors[i] = f"{reason} at '{location or '<root>'}'"
+                continue
+            # 每个元素的结果直接追加到各路径的结果列表，失败原因只保留第一个
+            results: Dict[int, List[Any]] = {i: [] for i in child.all_ends}
+            first_errors: Dict[int, str] = {}
+            item_found: Dict[int, Any] = {}
+            item_errors: Dict[int, str] = {}
+            for item in items:
+                _walk(item, child, here, item_found, item_errors)
+                for i, value in item_found.items():
+                    results[i].append(value)
+                for i, reason in item_errors.items():
+                    first_errors.setdefault(i, reason)
+                item_found.clear()
+                item_errors.clear()
+            for i, values in results.items():
+                found[i] = values
+                if not values and i in first_errors:
+                    errors[i] = f"no element matched: {first_errors[i]}"
+            continue
+        for i in child.all_ends:
+            errors[i] = f"{reason} at '{location or '<root>'}'"
+
+
+# 流式解析时已经收集好的值：没有任何元素匹配时，用第一个缺失的元素生成失败原因
+def _walk_column(
+    column: "_Column",
+    leaves: List[Tuple[Tuple[Any, ...], List[int]]],
+    child: _PathTrie,
+    location: str,
+    found: Dict[int, Any],
+    errors: Dict[int, str],
+):
+    for suffix, ends in leaves:
+        values = column.values[suffix]
+        for i in ends:
+            found[i] = values
+        if not values and suffix in column.failed:
+            item_errors: Dict[int, str] = {}
+            _walk(column.failed[suffix], child, location, {}, item_errors)
+            for i in ends:
+                if i in item_errors:
+                    errors[i] = f"no element matched: {item_errors[i]}"
+
+
+# 一次遍历提取多条路径，返回值列表和 {路径序号: 失败原因}
+def _extract_many(
+    obj: Any, paths: Tuple[str, ...]
+) -> Tuple[List[Any], Dict[int, str]]:
+    found: Dict[int, Any] = {}
+    errors: Dict[int, str] = {}
+    _walk(obj, _compile_paths(tuple(paths)), "", found, errors)
+    return [found.get(i) for i in range(len(paths))], errors
+
+
+def _deep_get(obj: Any, path: str) -> Any:
+    values, _ = _extract_many(obj, (path,))
+    return values[0]
+
+
+# ---------- 流式提取 ----------
+#
+# 流式模式下不把整个响应体解析成 Python 对象，而是边读边解析，
+# 只保留提取路径需要的分支（裁剪后的文档），再交给 _extract_many 提取。
+
+
+# 裁剪后的列表：记录原始长度，只保存需要的元素
+class _SparseList:
+    def __init__(
+        self,
+        length: int,
+        items: Dict[int, Any],
+        columns: Optional[Dict[Tuple[Any, ...], "_Column"]] = None,
+    ):
+        self.length = length
+        self._items = items
+        self.columns = columns or {}
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        for i in sorted(self._items):
+            yield self._items[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [
+                self._items[i]
+                for i in range(*index.indices(self.length))
+                if i in self._items
+            ]
+        if index < 0:
+            index += self.length
+        return self._items[index]
+
+
+# 通配符或切片之后只剩字段查找时，流式解析不保留元素本身，
+# 而是按后续路径直接收集每个元素的值；failed 保存每条路径第一个缺失该值的元素，用于生成失败原因
+class _Column:
+    __slots__ = ("values", "failed")
+
+    def __init__(self, suffixes):
+        self.values: Dict[Tuple[Any, ...], List[Any]] = {suffix: [] for suffix in suffixes}
+        self.failed: Dict[Tuple[Any, ...], Any] = {}
+
+    def add(self, item: Any):
+        for suffix, values in self.values.items():
+            value = _lookup_keys(item, suffix)
+            if value is _MISSING:
+                self.failed.setdefault(suffix, item)
+            else:
+                values.append(value)
+
+
+# 节点之后只有字段查找时，返回 [(后续路径, 路径序号)]；包含通配符或切片时返回 None
+def _key_suffixes(
+    node: _PathTrie, prefix: Tuple[Any, ...] = ()
+) -> Optional[List[Tuple[Tuple[Any, ...], List[int]]]]:
+    leaves = [(prefix, node.ends)] if node.ends else []
+    for segment, child in node.children.items():
+        if segment[0] != "key":
+            return None
+        sub = _key_suffixes(child, prefix + (segment,))
+        if sub is None:
+            return None
+        leaves.extend(sub)
+    return leaves
+
+
+# 按字段查找的规则（与 _walk 相同）取出后续路径的值，不存在时返回 _MISSING
+def _lookup_keys(obj: Any, suffix: Tuple[Any, ...]) -> Any:
+    for _, text, arg in suffix:
+        if isinstance(obj, dict):
+            if text not in obj:
+                return _MISSING
+            obj = obj[text]
+        elif isinstance(obj, (list, _SparseList)) and arg is not None:
+            if not -len(obj) <= arg < len(obj):
+                return _MISSING
+            obj = obj[arg]
+        else:
+            return _MISSING
+    return obj
+
+
+_JSON_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_JSON_SCALAR = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+# 一段不含括号的内容（其中的字符串必须完整），用于快速跳过和定位容器的结尾
+_JSON_RUN = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_JSON_KEY = re.compile(r'("[^"\\]*(?:\\.[^"\\]*)*")[ \t\n\r]*:[ \t\n\r]*')
+_JSON_DECODER = json.JSONDecoder()
+
+
+# 按块读取 JSON 文本的游标：需要的值用 raw_decode 一次解析，
+# 不需要的值只扫描括号层级后丢弃，已读过的内容会从缓冲区中释放
+class _JsonStream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.buf = ""
+        self.pos = 0
+        self.mark: Optional[int] = None
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            raise ValueError("JSON 数据不完整")
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            text = self._decoder.decode(b"", final=True)
+        elif isinstance(chunk, str):
+            text = chunk
+        else:
+            text = self._decoder.decode(chunk)
+        keep = self.pos if self.mark is None else self.mark
+        if keep:
+            self.buf = self.buf[keep:]
+            self.pos -= keep
+            if self.mark is not None:
+                self.mark -= keep
+        self.buf += text
+
+    def peek(self) -> str:
+        pos = self.pos
+        if pos < len(self.buf) and self.buf[pos] not in " \t\n\r":
+            return self.buf[pos]
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self._fill()
+
+    def at_end(self) -> bool:
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return False
+            if self.eof:
+                return True
+            self._fill()
+
+    def _scalar(self, pattern) -> str:
+        while True:
+            m = pattern.match(self.buf, self.pos)
+            # 数字和字面量可能被块边界截断，读到后面的字符后才算完整
+            if m is not None and (
+                self.eof
+                or (m.end() < len(self.buf) and self.buf[m.end()] not in ".eE+-")
+            ):
+                self.pos = m.end()
+                return m.group()
+            if m is None and (
+                self.buf[self.pos] not in '"-0123456789tfn'
+                or (len(self.buf) - self.pos > 64 and self.buf[self.pos] != '"')
+            ):
+                raise ValueError(f"无效的 JSON: {self.buf[self.pos:self.pos + 20]!r}")
+            self._fill()
+
+    def read_key(self) -> str:
+        while True:
+            self.peek()
+            m = _JSON_KEY.match(self.buf, self.pos)
+            if m is not None and m.end() < len(self.buf):
+                self.pos = m.end()
+                token = m.group(1)
+                return json.loads(token) if "\\" in token else token[1:-1]
+            if m is None:
+                if self.buf[self.pos] != '"':
+                    raise ValueError(f"期望字符串，实际为 {self.buf[self.pos]!r}")
+                s = _JSON_STRING.match(self.buf, self.pos)
+                if s is not None:
+                    after = _JSON_WHITESPACE.match(self.buf, s.end()).end()
+                    if after < len(self.buf) and self.buf[after] != ":":
+                        raise ValueError("对象的键之后缺少 ':'")
+            self._fill()
+
+    def _scan_container(self):
+        depth = 0
+        while True:
+            self.pos = _JSON_RUN.match(self.buf, self.pos).end()
+            if self.pos >= len(self.buf):
+                self._fill()
+                continue
+            char = self.buf[self.pos]
+            if char == '"':
+                # 字符串被块边界截断
+                self._fill()
+                continue
+            self.pos += 1
+            if char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def skip_value(self):
+        char = self.peek()
+        if char in "[{":
+            self._scan_container()
+        elif char == '"':
+            self._scalar(_JSON_STRING)
+        else:
+            self._scalar(_JSON_SCALAR)
+
+    def read_value(self) -> Any:
+        char = self.peek()
+        if char not in "[{":
+            token = self._scalar(_JSON_STRING if char == '"' else _JSON_SCALAR)
+            return json.loads(token)
+        self.mark = self.pos
+        try:
+            self._scan_container()
+            value, _ = _JSON_DECODER.raw_decode(self.buf[self.mark : self.pos])
+        finally:
+            self.mark = None
+        return value
+
+
+_MISSING = object()
+
+
+def _match_key(nodes: List[_PathTrie], key: str) -> List[_PathTrie]:
+    matched = []
+    for node in nodes:
+        for (kind, text, _), child in node.children.items():
+            if kind == "wild" or (kind in ("key", "slice") and text == key):
+                matched.append(child)
+    return matched
+
+
+# 列表中每个下标需要保留哪些路径分支；负数下标和负数起点的切片
+# 需要列表末尾的元素，用固定长度的尾部缓冲区保存候选
+class _ListPlan:
+    def __init__(self, nodes: List[_PathTrie]):
+        self.every: List[_PathTrie] = []
+        self.indexed: Dict[int, List[_PathTrie]] = {}
+        self.slices: List[Tuple[int, Optional[int], int, _PathTrie]] = []
+        self.tail: List[_PathTrie] = []
+        self.tail_size = 0
+        # 只收集值的分支：节点 -> 路径段，路径段 -> 需要收集的后续路径
+        self.column_of: Dict[_PathTrie, Tuple[Any, ...]] = {}
+        self.columns: Dict[Tuple[Any, ...], set] = {}
+        for node in nodes:
+            for segment, child in node.children.items():
+                kind, _, arg = segment
+                if kind == "wild":
+                    self.every.append(child)
+                    self._add_column(segment, child)
+                elif kind == "key" and arg is not None:
+                    if arg >= 0:
+                        self.indexed.setdefault(arg, []).append(child)
+                    else:
+                        self.tail.append(child)
+                        self.tail_size = max(self.tail_size, -arg)
+                elif kind == "slice":
+                    start, stop, step = (list(arg) + [None, None])[:3]
+                    if (step or 1) > 0 and (start or 0) >= 0 and (stop is None or stop >= 0):
+                        self.slices.append((start or 0, stop, step or 1, child))
+                        self._add_column(segment, child)
+                    elif (step or 1) == 1 and start is not None and start < 0 and stop is None:
+                        self.tail.append(child)
+                        self.tail_size = max(self.tail_size, -start)
+                    else:
+                        self.every.append(child)
+
+    def _add_column(self, segment: Tuple[Any, ...], child: _PathTrie):
+        leaves = _key_suffixes(child)
+        if leaves is not None:
+            self.column_of[child] = segment
+            self.columns.setdefault(segment, set()).update(suffix for suffix, _ in leaves)
+
+    def fixed(self, i: int) -> List[_PathTrie]:
+        nodes = list(self.every)
+        nodes.extend(self.indexed.get(i, ()))
+        for start, stop, step, child in self.slices:
+            if i >= start and (stop is None or i < stop) and (i - start) % step == 0:
+                nodes.append(child)
+        return nodes
+
+
+def _prune_value(stream: _JsonStream, nodes: List[_PathTrie]) -> Any:
+    if not nodes:
+        stream.skip_value()
+        return _MISSING
+    if any(node.ends for node in nodes):
+        return stream.read_value()
+    if not any(node.children for node in nodes):
+        stream.skip_value()
+        return _MISSING
+    char = stream.peek()
+    if char == "{":
+        stream.pos += 1
+        obj = {}
+        if stream.peek() == "}":
+            stream.pos += 1
+            return obj
+        while True:
+            key = stream.read_key()
+            pruned = _prune_value(stream, _match_key(nodes, key))
+            if pruned is not _MISSING:
+                obj[key] = pruned
+            char = stream.peek()
+            stream.pos += 1
+            if char == "}":
+                return obj
+            if char != ",":
+                raise ValueError(f"期望 ',' 或 '}}'，实际为 {char!r}")
+    if char == "[":
+        stream.pos += 1
+        plan = _ListPlan(nodes)
+        items: Dict[int, Any] = {}
+        columns = {segment: _Column(suffixes) for segment, suffixes in plan.columns.items()}
+        tail: collections.deque = collections.deque(maxlen=plan.tail_size or None)
+        length = 0
+        if stream.peek() == "]":
+            stream.pos += 1
+        else:
+            while True:
+                fixed = plan.fixed(length)
+                if fixed:
+                    pruned = _prune_value(stream, fixed + plan.tail)
+                    if pruned is not _MISSING:
+                        keep = False
+                        segments = set()
+                        for node in fixed:
+                            segment = plan.column_of.get(node)
+                            if segment is None:
+                                keep = True
+                            else:
+                                segments.add(segment)
+                        for segment in segments:
+                            columns[segment].add(pruned)
+                        if keep:
+                            items[length] = pruned
+                elif plan.tail:
+                    # 尾部候选只保留原始文本，离开尾部窗口的元素无需解析
+                    stream.peek()
+                    stream.mark = stream.pos
+                    stream.skip_value()
+                    tail.append((length, stream.buf[stream.mark : stream.pos]))
+                    stream.mark = None
+                else:
+                    stream.skip_value()
+                length += 1
+                char = stream.peek()
+                stream.pos += 1
+                if char == "]":
+                    break
+                if char != ",":
+                    raise ValueError(f"期望 ',' 或 ']'，实际为 {char!r}")
+        for i, text in tail:
+            if i >= length - plan.tail_size and i not in items:
+                pruned = _prune_value(_JsonStream([text]), plan.tail)
+                if pruned is not _MISSING:
+                    items[i] = pruned
+        return _SparseList(length, items, columns)
+    return stream.read_value()
+
+
+# 流式响应体：在 run_test 中按提取路径边读边解析，只保留需要的部分和一段预览
+class StreamedBody:
+    def __init__(self, resp, timing: Optional[Timing] = None, start: Optional[float] = None):
+        self._resp = resp
+        self.content_type = resp.headers.get("Content-Type")
+        self._timing = timing
+        self._start = start
+        self._paths: Optional[Tuple[str, ...]] = None
+        self._pruned: Any = _MISSING
+        self._preview = bytearray()
+        self._preview_limit = _render_limits["max_chars"]
+        self.size = 0
+        self.error: Optional[str] = None
+
+    @property
+    def consumed(self) -> bool:
+        return self._paths is not None
+
+    def _chunks(self):
+        for chunk in self._resp.iter_content(chunk_size=64 * 1024):
+            self.size += len(chunk)
+            room = self._preview_limit - len(self._preview)
+            if room > 0:
+                self._preview += chunk[:room]
+            yield chunk
+
+    def _consume(self, paths: Tuple[str, ...]):
+        self._paths = paths
+        try:
+            stream = _JsonStream(self._chunks())
+            self._pruned = _prune_value(stream, [_compile_paths(paths)])
+            if not stream.at_end():
+                raise ValueError("JSON 之后还有多余的内容")
+        except Exception as e:
+            self.error = f"{_NotJsonBody.describe(self.content_type)}: {e}"
+        finally:
+            self.close()
+
+    def extract(self, paths: Tuple[str, ...]) -> Tuple[List[Any], Dict[int, str]]:
+        paths = tuple(paths)
+        if self._paths is None:
+            self._consume(paths)
+        elif not set(paths) <= set(self._paths):
+            reason = "流式响应已被读取，只能提取首次读取时指定的路径"
+            return [None] * len(paths), {i: reason for i in range(len(paths))}
+        if self.error:
+            return [None] * len(paths), {i: self.error for i in range(len(paths))}
+        return _extract_many(self._pruned, paths)
+
+    def close(self):
+        resp, self._resp = self._resp, None
+        if resp is None:
+            return
+        raw = resp.raw
+        if self._timing is not None:
+            self._timing.bytes_received = (
+                raw.tell() if raw is not None else 0
+            ) or self.size
+            self._timing.bytes_received_uncompressed = self.size
+            if self._start is not None:
+                self._timing.total = time.perf_counter() - self._start
+        resp.close()
+
+    def preview(self) -> str:
+        text = bytes(self._preview).decode("utf-8", errors="replace")
+        if self.size > len(self._preview):
+            text += f"\n... 流式解析，共 {_format_bytes(self.size)}，仅显示前 {_format_bytes(len(self._preview))}"
+        return text
+
+    def __str__(self) -> str:
+        if not self.consumed:
+            return "<未读取的流式响应>"
+        return self.preview()
+
+    def __repr__(self) -> str:
+        return f"StreamedBody(size={self.size}, consumed={self.consumed})"
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+# 从响应内容中提取多条路径，流式响应体在这里才真正读取
+def _extract_content(content: Any, paths: Tuple[str, ...]) -> Tuple[List[Any], Dict[int, str]]:
+    if isinstance(content, StreamedBody):
+        return content.extract(paths)
+    if isinstance(content, _NotJsonBody):
+        return [None] * len(paths), {i: str(content) for i in range(len(paths))}
+    return _extract_many(content, paths)
+
+
+def run_test(
+    description: str,
+    response: Tuple[str, Any, int, Optional[str]],
+    *extract_paths: str,
+    max_time: Optional[float] = None,
+    max_p95: Optional[float] = None,
+) -> Any:
+    if _load_stats is not None:
+        return _load_stats.record_step(description, response, extract_paths)
+    status, content, status_code, _ = response
+    extracted = None
+    if isinstance(content, StreamedBody):
+        # 流式响应在提取时才读取和解析响应体
+        extract_ns = time.perf_counter_ns()
+        extracted = content.extract(extract_paths)
+        if _hooks:
+            _emit_extract_done(description, extract_paths, extracted[1], extract_ns)
+        if content.error:
+            status = "❌"
+    timing = getattr(response, "timing", None)
+    duration = timing.total if timing is not None else None
+    error = timing.error if timing is not None else None
+    if (max_time is not None or max_p95 is not None) and duration is not None:
+        over_budget = _check_budget(description, duration, max_time, max_p95)
+        if over_budget and status == "✅":
+            status = "❌"
+            error = error or over_budget
+    is_success = status == "✅"
+    live = _live_progress
+    verbose = live is None and (
+        _verbosity == "full" or (_verbosity == "failures" and not is_success)
+    )
+
+    if verbose:
+        render_ns = time.perf_counter_ns()
+        if _hooks:
+            _emit("render_start", render_ns, description=description)
+        color = _get_status_color(status_code)
+        title = f"""{description}: {status} [bold {color}]HTTP {status_code}[/bold {color}]"""
+        if error:
+            title += f" [bold red]{error}[/bold red]"
+        if timing is not None and timing.retries:
+            title += f" [yellow]重试 {timing.retries} 次[/yellow]"
+        if duration is not None:
+            title += f" [dim]{_format_ms(duration)} ms[/dim]"
+
+        display_content = content
+        if not extract_paths and isinstance(content, dict) and "buckets" in content:
+            display_content = content["buckets"]
+
+        body = _render_body(display_content)
+        _print_panel(body, title, "blue")
+        if not _headless:
+            _get_console().print()
+        if _hooks:
+            _emit(
+                "render_end",
+                description=description,
+                elapsed_ns=time.perf_counter_ns() - render_ns,
+            )
+
+    record = TestRecord(
+        description,
+        getattr(response, "method", None),
+        getattr(response, "url", None),
+        status_code,
+        is_success,
+        duration,
+        timing.bytes_received if timing is not None else None,
+        timing.connect if timing is not None else None,
+        timing.ttfb if timing is not None else None,
+        error,
+        timing.bytes_sent if timing is not None else None,
+        timing.bytes_sent_uncompressed if timing is not None else None,
+        timing.bytes_received_uncompressed if timing is not None else None,
+    )
+    _test_results.append(status, record)
+    if _hooks:
+        _emit("result_recorded", description=description, record=record)
+    if live is not None:
+        live.record(description, is_success, status_code, content, duration)
+
+    if not extract_paths:
+        return None
+    if extracted is None:
+        extract_ns = time.perf_counter_ns()
+        extracted = _extract_content(content, extract_paths)
+        if _hooks:
+            _emit_extract_done(description, extract_paths, extracted[1], extract_ns)
+    values, errors = extracted
+    if live is None and _verbosity in ("full", "failures"):
+        for i, reason in errors.items():
+            _print_line(
+                f"[bold red]Warning:[/bold red] Could not extract '{extract_paths[i]}' from response: {reason}."
+            )
+    if len(extract_paths) == 1:
+        return values[0]
+    return tuple(values)
+
+
+# ---------- 请求引擎 ----------
+
+
+# 按主机维护 keep-alive 连接池，并统计每个主机的连接复用情况
+class _PoolAdapter(HTTPAdapter):
+    def __init__(self, *args, **kwargs):
+        self._stats_lock = threading.Lock()
+        self._retired: Dict[str, Dict[str, int]] = {}
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+        # 连接池被淘汰或关闭时保留它的计数
+        self.poolmanager.pools.dispose_func = self._retire_pool
+
+    def _retire_pool(self, pool):
+        with self._stats_lock:
+            host = self._retired.setdefault(
+                _pool_host(pool), {"requests": 0, "connections": 0}
+            )
+            host["requests"] += pool.num_requests
+            host["connections"] += pool.num_connections
+        pool.close()
+
+    def host_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._stats_lock:
+            stats = {h: dict(v) for h, v in self._retired.items()}
+        for key in list(self.poolmanager.pools.keys()):
+            pool = self.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            host = stats.setdefault(
+                _pool_host(pool), {"requests": 0, "connections": 0}
+            )
+            host["requests"] += pool.num_requests
+            host["connections"] += pool.num_connections
+        return stats
+
+
+# 当前线程正在进行的请求的耗时记录，由新建连接时的 connect() 填入连接耗时
+_timing_local = threading.local()
+
+
+def _record_connect(elapsed: float):
+    timing = getattr(_timing_local, "current", None)
+    if timing is not None:
+        timing.connect = (timing.connect or 0.0) + elapsed
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+# 把请求异常归类，区分连接超时、读取超时等
+def _error_kind(exc: BaseException) -> str:
+    if isinstance(exc, CassetteMissError):
+        return "cassette_miss"
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return "connect_timeout"
+    if isinstance(exc, requests.exceptions.ReadTimeout):
+        return "read_timeout"
+    if isinstance(exc, requests.exceptions.SSLError):
+        return "ssl_error"
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return "connection_error"
+    if isinstance(exc, requests.exceptions.TooManyRedirects):
+        return "too_many_redirects"
+    name = type(exc).__name__
+    if name == "ConnectionTimeoutError":
+        return "connect_timeout"
+    if name in ("SocketTimeoutError", "ServerTimeoutError"):
+        return "read_timeout"
+    if isinstance(exc, TimeoutError):
+        return "timeout"
+    if name in ("ClientConnectorError", "ServerDisconnectedError"):
+        return "connection_error"
+    if name == "ClientSSLError" or "SSL" in name:
+        return "ssl_error"
+    return "error"
+
+
+def _pool_host(pool) -> str:
+    return f"{pool.scheme}://{pool.host}:{pool.port}"
+
+
+# 所有 HTTP 方法函数共享的请求引擎：一个 Session 加按主机划分的连接池
+class Engine:
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        timeout: Union[float, Tuple[float, float]] = 10,
+        keep_alive: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+        cassette: Optional["Cassette"] = None,
+        compress: Optional[str] = None,
+        compress_min_size: int = 1024,
+        accept_encoding: Optional[str] = None,
+        retries: int = 0,
+        backoff: float = 0.1,
+        backoff_max: float = 5.0,
+        retry_statuses: Tuple[int, ...] = (429, 502, 503, 504),
+        rate_limit: Optional[float] = None,
+        burst: Optional[int] = None,
+        breaker_threshold: Optional[int] = None,
+        breaker_cooldown: float = 30.0,
+    ):
+        if compress is not None:
+            _compressor(compress)
+        if retries < 0:
+            raise ValueError("retries 不能小于 0")
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("rate_limit 必须大于 0")
+        if breaker_threshold is not None and breaker_threshold < 1:
+            raise ValueError("breaker_threshold 必须大于 0")
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.headers = dict(headers or {})
+        self.cassette = cassette
+        self.compress = compress
+        self.compress_min_size = compress_min_size
+        self.accept_encoding = accept_encoding
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retry_statuses = tuple(retry_statuses)
+        self.rate_limit = rate_limit
+        self.burst = burst if burst is not None else max(1, math.ceil(rate_limit or 1))
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._session: Optional[requests.Session] = None
+        self._adapter: Optional[_PoolAdapter] = None
+        self._lock = threading.Lock()
+        # 按主机记录限流令牌、熔断状态和重试计数，关闭引擎后仍保留供统计
+        self._guarded = bool(retries or rate_limit or breaker_threshold)
+        self._hosts: Dict[str, _HostState] = {}
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None
+
+    def open(self) -> "Engine":
+        with self._lock:
+            if self._session is not None:
+                return self
+            session = requests.Session()
+            adapter = _PoolAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(self.headers)
+            if self.accept_encoding:
+                session.headers["Accept-Encoding"] = self.accept_encoding
+            if not self.keep_alive:
+                session.headers["Connection"] = "close"
+            self._session = session
+            self._adapter = adapter
+        return self
+
+    def close(self) -> Dict[str, Any]:
+        with self._lock:
+            session, adapter = self._session, self._adapter
+            self._session = None
+            if session is not None:
+                session.close()
+        return self.stats() if adapter is not None else _empty_engine_stats()
+
+    @property
+    def session(self) -> requests.Session:
+        session = self._session
+        if session is None:
+            session = self.open()._session
+        return session
+
+    # cache=False 时不经过录制回放
+    def request(
+        self, method: str, url: str, cache: bool = True, **kwargs
+    ) -> requests.Response:
+        session = self.session
+        kwargs.setdefault("timeout", self.timeout)
+        headers, data = kwargs.get("headers"), kwargs.get("data")
+
+        # 只在真正发送时压缩请求体，缓存键按压缩前的请求体计算
+        def send() -> requests.Response:
+            if data is not None:
+                kwargs["data"], encoding = self._encode(data)
+                if encoding is not None:
+                    kwargs["headers"] = {**(headers or {}), "Content-Encoding": encoding}
+            return session.request(method, url, **kwargs)
+
+        return self._dispatch(method, url, headers, data, send, cache)
+
+    # 直接发送已准备好的请求，跳过 requests 的逐次准备；headers 只用于计算回放缓存键
+    def send(
+        self,
+        prepared: requests.PreparedRequest,
+        headers: Optional[Dict[str, str]],
+        **kwargs,
+    ) -> requests.Response:
+        session = self.session
+        kwargs.setdefault("timeout", self.timeout)
+        body = prepared.body
+
+        def send() -> requests.Response:
+            if body is not None:
+                prepared.body, encoding = self._encode(body)
+                if encoding is not None:
+                    prepared.headers["Content-Encoding"] = encoding
+                    if isinstance(prepared.body, bytes):
+                        prepared.headers["Content-Length"] = str(len(prepared.body))
+                    else:
+                        prepared.headers.pop("Content-Length", None)
+                        prepared.headers["Transfer-Encoding"] = "chunked"
+            return session.send(prepared, **kwargs)
+
+        return self._dispatch(prepared.method, prepared.url, headers, body, send)
+
+    # 按配置压缩请求体，并把发送字节数记入当前请求的 Timing；
+    # 返回实际发送的请求体和 Content-Encoding（未压缩时为 None）
+    def _encode(self, data: Any) -> Tuple[Any, Optional[str]]:
+        timing = getattr(_timing_local, "current", None)
+        encoding = self.compress
+        if isinstance(data, (bytes, bytearray)):
+            size = len(data)
+            if encoding is not None and size >= self.compress_min_size:
+                data = _compress(encoding, data)
+            else:
+                encoding = None
+            if timing is not None:
+                timing.bytes_sent_uncompressed = size
+                timing.bytes_sent = len(data)
+            return data, encoding
+        if not _is_stream_body(data):
+            return data, None
+        size = _body_length(data)
+        if encoding is None and size is not None:
+            if timing is not None:
+                timing.bytes_sent = timing.bytes_sent_uncompressed = size
+            return data, None
+        # 流式请求体边发送边压缩和计数，改用分块传输
+        return _count_chunks(data, encoding, timing), encoding
+
+    def _dispatch(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        data: Any,
+        send: Callable[[], requests.Response],
+        cache: bool = True,
+    ) -> requests.Response:
+        if self._guarded:
+            send = self._guard(method, url, data, send)
+        cassette = self.cassette
+        if cassette is None or cassette.mode == "passthrough":
+            return send()
+        if not cache or not _cacheable_body(data):
+            # 下载到文件的响应和流式请求体不录制；只回放模式下同样不能访问网络
+            if cassette.mode == "replay_only":
+                raise CassetteMissError(f"回放缓存不支持流式请求体或下载到文件: {method} {url}")
+            return send()
+        key = cassette.key(method, url, {**self.headers, **(headers or {})}, data)
+        hit = cassette.load(key)
+        if hit is not None:
+            return _replayed_response(url, *hit)
+        if cassette.mode == "replay_only":
+            raise CassetteMissError(f"回放缓存中没有该请求: {method} {url}")
+        resp = send()
+        cassette.save(key, method, url, resp.status_code, resp.headers, resp.content)
+        return resp
+
+    def _host_state(self, host: str) -> "_HostState":
+        state = self._hosts.get(host)
+        if state is None:
+            with self._lock:
+                state = self._hosts.setdefault(host, _HostState(self.burst))
+        return state
+
+    # 包装真正的发送：按主机限流和熔断，对可重试的失败按退避间隔重试。
+    # 只重试可以重复发送的请求体；连接超时时请求尚未发出，任何方法都可以重试
+    def _guard(
+        self,
+        method: str,
+        url: str,
+        data: Any,
+        send: Callable[[], requests.Response],
+    ) -> Callable[[], requests.Response]:
+        host = _url_host(url)
+        state = self._host_state(host)
+        replayable = data is None or isinstance(data, (bytes, bytearray, str))
+        retries = self.retries if replayable else 0
+        idempotent = method.upper() in _IDEMPOTENT_METHODS
+        threshold = self.breaker_threshold
+
+        def guarded() -> requests.Response:
+            if threshold is not None and not state.admit(self.breaker_cooldown):
+                raise CircuitOpenError(
+                    f"{host} 连续 {state.failures} 次失败，熔断中，"
+                    f"{self.breaker_cooldown:g} 秒后再试探"
+                )
+            # 熔断器按请求计数：重试用尽后只记一次成功或失败
+            ok: Optional[bool] = None
+            try:
+                attempt = 0
+                while True:
+                    if self.rate_limit is not None:
+                        state.throttle(self.rate_limit, self.burst)
+                    try:
+                        resp = send()
+                    except Exception as e:
+                        kind = _error_kind(e)
+                        transient = kind in _TRANSIENT_ERRORS
+                        if not (
+                            transient
+                            and attempt < retries
+                            and (idempotent or kind == "connect_timeout")
+                        ):
+                            ok = False if transient else None
+                            raise
+                        reason: Any = kind
+                        delay = self._backoff_delay(attempt)
+                    else:
+                        status = resp.status_code
+                        if not (
+                            status in self.retry_statuses
+                            and attempt < retries
+                            and idempotent
+                        ):
+                            ok = status not in _BREAKER_STATUSES
+                            return resp
+                        reason = status
+                        delay = self._backoff_delay(
+                            attempt, resp.headers.get("Retry-After")
+                        )
+                        resp.close()
+                    attempt += 1
+                    with state.lock:
+                        state.retries += 1
+                    timing = getattr(_timing_local, "current", None)
+                    if timing is not None:
+                        timing.retries = attempt
+                    if _hooks:
+                        _emit(
+                            "request_retry",
+                            method=method,
+                            url=url,
+                            attempt=attempt,
+                            reason=reason,
+                            delay=delay,
+                        )
+                    time.sleep(delay)
+            finally:
+                if threshold is not None:
+                    self._record_outcome(state, host, ok)
+
+        return guarded
+
+    def _record_outcome(self, state: "_HostState", host: str, ok: Optional[bool]):
+        if state.record(ok, self.breaker_threshold) and _hooks:
+            _emit(
+                "circuit_open",
+                host=host,
+                failures=state.failures,
+                cooldown=self.breaker_cooldown,
+            )
+
+    # 指数退避加全随机抖动；服务端给出秒数形式的 Retry-After 时以它为下限，
+    # 两者都不超过 backoff_max
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return min(delay, self.backoff_max)
+
+    def stats(self) -> Dict[str, Any]:
+        if self._adapter is None:
+            return _empty_engine_stats()
+        hosts = self._adapter.host_stats()
+        for host, state in list(self._hosts.items()):
+            counters = hosts.setdefault(host, {"requests": 0, "connections": 0})
+            counters["retries"] = state.retries
+            counters["rejected"] = state.rejected
+            counters["throttled"] = state.throttled
+        total_requests = sum(h["requests"] for h in hosts.values())
+        total_connections = sum(h["connections"] for h in hosts.values())
+        return {
+            "requests": total_requests,
+            "connections": total_connections,
+            "reused": max(total_requests - total_connections, 0),
+            "retries": sum(h.get("retries", 0) for h in hosts.values()),
+            "rejected": sum(h.get("rejected", 0) for h in hosts.values()),
+            "throttled": sum(h.get("throttled", 0.0) for h in hosts.values()),
+            "hosts": hosts,
+        }
+
+    def __enter__(self) -> "Engine":
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _empty_engine_stats() -> Dict[str, Any]:
+    return {
+        "requests": 0,
+        "connections": 0,
+        "reused": 0,
+        "retries": 0,
+        "rejected": 0,
+        "throttled": 0.0,
+        "hosts": {},
+    }
+
+
+# 当前生效的请求引擎，首次请求时按默认配置创建
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def _get_engine() -> Engine:
+    global _engine
+    engine = _engine
+    if engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = Engine().open()
+            engine = _engine
+    return engine
+
+
+def open_engine(**config) -> Engine:
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+        _engine = Engine(**config).open()
+        return _engine
+
+
+def close_engine(show: bool = True, title: str = "连接复用统计") -> Dict[str, Any]:
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    stats = engine.close() if engine is not None else _empty_engine_stats()
+    if show:
+        show_engine_stats(stats, title)
+    return stats
+
+
+def engine_stats() -> Dict[str, Any]:
+    engine = _engine
+    return engine.stats() if engine is not None else _empty_engine_stats()
+
+
+def show_engine_stats(
+    stats: Optional[Dict[str, Any]] = None, title: str = "连接复用统计"
+):
+    if stats is None:
+        stats = engine_stats()
+    if _verbosity == "silent":
+        return
+    table = _new_table()
+    table.add_column("主机", style="dim")
+    table.add_column("请求数", justify="right")
+    table.add_column("新建连接", justify="right")
+    table.add_column("复用", justify="right")
+    table.add_column("复用率", justify="right")
+    # 只在用到重试、熔断或限流时显示对应的列
+    extra = [
+        (key, name)
+        for key, name in (("retries", "重试"), ("rejected", "熔断拒绝"), ("throttled", "限流等待"))
+        if stats.get(key)
+    ]
+    for _, name in extra:
+        table.add_column(name, justify="right")
+
+    def _row(name: str, counters: Dict[str, Any]):
+        requests_, connections = counters["requests"], counters["connections"]
+        reused = max(requests_ - connections, 0)
+        rate = f"{reused / requests_:.1%}" if requests_ else "-"
+        cells = [name, str(requests_), str(connections), str(reused), rate]
+        for key, _ in extra:
+            value = counters.get(key, 0)
+            cells.append(f"{value:.2f}s" if key == "throttled" else str(value))
+        table.add_row(*cells)
+
+    for host, host_stats in sorted(stats["hosts"].items()):
+        _row(host, host_stats)
+
+    table.add_row(*[""] * (5 + len(extra)))
+    _row("[bold]总计[/bold]", stats)
+
+    _print_panel(table, title, "cyan")
+
+
+@atexit.register
+def _close_engine_at_exit():
+    close_engine(show=False)
+
+
+# fork 出的子进程不能与父进程共用连接池中的套接字，换成同样配置的新引擎
+def _reset_engine_in_child():
+    global _engine, _engine_lock
+    _engine_lock = threading.Lock()
+    engine = _engine
+    if engine is not None:
+        _engine = Engine(
+            pool_connections=engine.pool_connections,
+            pool_maxsize=engine.pool_maxsize,
+            timeout=engine.timeout,
+            keep_alive=engine.keep_alive,
+            headers=engine.headers,
+            cassette=engine.cassette,
+            compress=engine.compress,
+            compress_min_size=engine.compress_min_size,
+            accept_encoding=engine.accept_encoding,
+            retries=engine.retries,
+            backoff=engine.backoff,
+            backoff_max=engine.backoff_max,
+            retry_statuses=engine.retry_statuses,
+            rate_limit=engine.rate_limit,
+            burst=engine.burst,
+            breaker_threshold=engine.breaker_threshold,
+            breaker_cooldown=engine.breaker_cooldown,
+        )
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engine_in_child)
+
+
+# ---------- 录制回放 ----------
+
+
+# 只有一次性给出的请求体才能计算缓存键，流式请求体（生成器、文件）不经过录制回放
+def _cacheable_body(data: Any) -> bool:
+    return data is None or isinstance(data, (bytes, bytearray, str))
+
+
+class CassetteMissError(Exception):
+    pass
+
+
+# 回放时重建的响应头里不再保留这些：响应体已按解压后的内容保存
+_CASSETTE_DROP_HEADERS = frozenset(
+    ("content-encoding", "content-length", "transfer-encoding", "connection")
+)
+
+
+# 录制回放缓存：按 方法 + URL + 规范化请求头 + 请求体哈希 保存响应，存放在单个 SQLite 文件中
+class Cassette:
+    MODES = ("record_new", "replay_only", "passthrough")
+    _TOUCH_BATCH = 1000
+
+    def __init__(
+        self,
+        path: str = ".pat_cassette.db",
+        mode: str = "record_new",
+        max_bytes: Optional[int] = None,
+        ignore_headers: Tuple[str, ...] = (),
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"未知的回放模式: {mode}，可选: {', '.join(self.MODES)}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.ignore_headers = frozenset(h.lower() for h in ignore_headers)
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        # 回放命中只在内存中记录访问时间，写入或关闭时再批量落盘
+        self._touched: Dict[str, float] = {}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, method TEXT, url TEXT, status INTEGER, "
+            "headers TEXT, body BLOB, size INTEGER, last_used REAL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+        )
+        self._db.commit()
+        self._size = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if max_bytes is not None:
+            self._evict()
+            self._db.commit()
+
+    def key(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        body: Any,
+    ) -> str:
+        normalized = sorted(
+            (name.lower(), str(value).strip())
+            for name, value in (headers or {}).items()
+            if name.lower() not in self.ignore_headers
+        )
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        body_hash = hashlib.sha256(body or b"").hexdigest()
+        material = json.dumps([method.upper(), url, normalized, body_hash])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self._TOUCH_BATCH:
+                self._flush_touched()
+                self._db.commit()
+            self.hits += 1
+        status, headers, body = row
+        return status, json.loads(headers), zlib.decompress(body)
+
+    def save(
+        self,
+        key: str,
+        method: str,
+        url: str,
+        status: int,
+        headers: Any,
+        body: bytes,
+    ):
+        if self.mode != "record_new" or status >= 500:
+            # 5xx 多半是后端偶发故障，录下来会让之后的回放一直失败
+            return
+        stored_headers = {
+            name: value
+            for name, value in headers.items()
+            if name.lower() not in _CASSETTE_DROP_HEADERS
+        }
+        blob = zlib.compress(body)
+        size = len(blob)
+        with self._lock:
+            old = self._db.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    method,
+                    url,
+                    status,
+                    json.dumps(stored_headers),
+                    blob,
+                    size,
+                    time.time(),
+                ),
+            )
+            self._size += size - (old[0] if old else 0)
+            self.recorded += 1
+            self._flush_touched()
+            if self.max_bytes is not None:
+                self._evict()
+            self._db.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    # 按最近使用时间淘汰，直到总大小不超过 max_bytes；只读取需要淘汰的那些行
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        self._flush_touched()
+        evicted = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY last_used"
+        ):
+            if self._size <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self.evicted += len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "entries": entries,
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+            "evicted": self.evicted,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _replayed_response(
+    url: str, status: int, headers: Dict[str, str], body: bytes
+) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = requests.structures.CaseInsensitiveDict(headers)
+    resp.url = url
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    resp._content = body
+    resp._content_consumed = True
+    return resp
+
+
+# ---------- 并发测试套件 ----------
+
+
+_UNSET = object()
+
+
+# 引用某个延迟步骤提取出的值，在步骤执行完成后才有实际值
+class Ref:
+    def __init__(self, step: int, path: str):
+        self.step = step
+        self.path = path
+        self.value: Any = _UNSET
+
+    def __repr__(self) -> str:
+        return f"Ref(step={self.step}, path={self.path!r})"
+
+
+# 延迟格式化的字符串，参数中可以包含 Ref
+class _Format:
+    def __init__(self, template: str, args: tuple, kwargs: Dict[str, Any]):
+        self.template = template
+        self.args = args
+        self.kwargs = kwargs
+
+
+def fmt(template: str, *args: Any, **kwargs: Any) -> _Format:
+    return _Format(template, args, kwargs)
+
+
+def _collect_refs(obj: Any, refs: List[Ref]):
+    if isinstance(obj, Ref):
+        refs.append(obj)
+    elif isinstance(obj, _Format):
+        _collect_refs(obj.args, refs)
+        _collect_refs(obj.kwargs, refs)
+    elif isinstance(obj, dict):
+        for k, v in obj.items():
+            _collect_refs(k, refs)
+            _collect_refs(v, refs)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            _collect_refs(v, refs)
+
+
+def _resolve(obj: Any) -> Any:
+    if isinstance(obj, Ref):
+        return None if obj.value is _UNSET else obj.value
+    if isinstance(obj, _Format):
+        return obj.template.format(*_resolve(obj.args), **_resolve(obj.kwargs))
+    if isinstance(obj, dict):
+        return {_resolve(k): _resolve(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_resolve(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(_resolve(v) for v in obj)
+    return obj
+
+
+class _Step:
+    def __init__(
+        self,
+        index: int,
+        description: str,
+        verb: Callable[..., Tuple[str, Any, int, Optional[str]]],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        extract_paths: Tuple[str, ...],
+    ):
+        self.index = index
+        self.description = description
+        self.verb = verb
+        self.args = args
+        self.kwargs = kwargs
+        self.extract_paths = extract_paths
+        self.refs = [Ref(index, path) for path in extract_paths]
+        # 耗时预算交给 run_test，不传给 HTTP 方法函数
+        self.budget = {
+            name: kwargs.pop(name) for name in ("max_time", "max_p95") if name in kwargs
+        }
+        deps: List[Ref] = []
+        _collect_refs((args, kwargs), deps)
+        self.deps = {ref.step for ref in deps}
+        self.response: Optional[Tuple[str, Any, int, Optional[str]]] = None
+        # 运行历史中的键、本次请求的指纹，以及是否复用了上次的结果
+        self.key = description
+        self.fingerprint: Optional[str] = None
+        self.reused = False
+
+    def execute(
+        self, history: Optional["RunHistory"] = None, reuse: bool = False
+    ) -> Tuple[str, Any, int, Optional[str]]:
+        args, kwargs = _resolve(self.args), _resolve(self.kwargs)
+        if history is not None:
+            # 指纹包含已解析的上游提取值，上游结果变化时不会复用
+            self.fingerprint = _fingerprint(self.verb, args, kwargs, self.extract_paths)
+            if reuse and self.fingerprint is not None:
+                cached = history.response(self.key, self.fingerprint)
+                if cached is not None:
+                    self.reused = True
+                    return cached
+        return self.verb(*args, **kwargs)
+
+
+def _step_error(exc: BaseException) -> Tuple[str, Any, int, Optional[str]]:
+    return "❌", {"error": "步骤执行异常", "details": f"{type(exc).__name__}: {exc}"}, 999, None
+
+
+# 请求方法、解析后的参数和提取路径的哈希；参数无法稳定序列化时返回 None
+def _fingerprint(
+    verb: Callable[..., Any], args: tuple, kwargs: Dict[str, Any], paths: Tuple[str, ...]
+) -> Optional[str]:
+    name = getattr(verb, "__qualname__", None) or repr(verb)
+    try:
+        material = json.dumps(
+            [name, args, kwargs, paths],
+            sort_keys=True,
+            default=_fingerprint_value,
+            ensure_ascii=False,
+        )
+    except (TypeError, ValueError, OSError):
+        return None
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+# 非 JSON 参数在指纹中的稳定表示：文件请求体按路径、大小和修改时间，字节按内容哈希；
+# 其余对象（文件句柄、下载目标等）没有跨运行稳定的表示，抛出 TypeError，该步骤不复用
+def _fingerprint_value(value: Any) -> Any:
+    if isinstance(value, FileBody):
+        stat = os.stat(value.path)
+        return {
+            "file": os.path.abspath(value.path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "content_type": value.content_type,
+        }
+    if isinstance(value, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    return _json_default(value)
+
+
+# 套件运行历史：按步骤描述保存最近一次的结果、耗时、请求指纹和成功的响应，
+# 以及每次运行的汇总，存放在单个 SQLite 文件中
+class RunHistory:
+    def __init__(self, path: str = ".pat_history.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS steps ("
+            "key TEXT PRIMARY KEY, fingerprint TEXT, success INTEGER, duration REAL, "
+            "response BLOB, runs INTEGER, failures INTEGER, last_run REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, started REAL, elapsed REAL, "
+            "executed INTEGER, reused INTEGER, skipped INTEGER, failed INTEGER)"
+        )
+        self._db.commit()
+
+    # 步骤键 -> (上次是否成功, 上次耗时)
+    def load(self) -> Dict[str, Tuple[bool, Optional[float]]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, success, duration FROM steps"
+            ).fetchall()
+        return {key: (bool(success), duration) for key, success, duration in rows}
+
+    # 指纹相同且上次成功时返回上次的响应元组
+    def response(self, key: str, fingerprint: str) -> Optional[ApiResponse]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM steps WHERE key = ? AND fingerprint = ? "
+                "AND success = 1 AND response IS NOT NULL",
+                (key, fingerprint),
+            ).fetchone()
+        if row is None:
+            return None
+        status, content, status_code, extract, method, url = _loads(
+            zlib.decompress(row[0])
+        )
+        return ApiResponse(status, content, status_code, extract, method=method, url=url)
+
+    # rows: (键, 指纹, 是否成功, 耗时, 响应元组)；响应只在成功且可以序列化时保存
+    def record(
+        self,
+        rows: List[Tuple[str, Optional[str], bool, Optional[float], Any]],
+        started: float,
+        elapsed: float,
+        executed: int,
+        reused: int,
+        skipped: int,
+    ):
+        now = time.time()
+        entries = []
+        for key, fingerprint, success, duration, response in rows:
+            blob = None
+            if success and fingerprint is not None:
+                try:
+                    blob = zlib.compress(
+                        _dumps(
+                            [
+                                *response,
+                                getattr(response, "method", None),
+                                getattr(response, "url", None),
+                            ]
+                        )
+                    )
+                except (TypeError, ValueError):
+                    pass
+            entries.append(
+                (key, fingerprint, int(success), duration, blob, int(not success), now)
+            )
+        failed = sum(entry[5] for entry in entries)
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO steps VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET fingerprint = excluded.fingerprint, "
+                "success = excluded.success, duration = excluded.duration, "
+                "response = excluded.response, runs = runs + 1, "
+                "failures = failures + excluded.failures, last_run = excluded.last_run",
+                entries,
+            )
+            self._db.execute(
+                "INSERT INTO runs (started, elapsed, executed, reused, skipped, failed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (started, elapsed, executed, reused, skipped, failed),
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            steps, failed = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(1 - success), 0) FROM steps"
+            ).fetchone()
+            runs = self._db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        return {"steps": steps, "failed": failed, "runs": runs}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM steps")
+            self._db.execute("DELETE FROM runs")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "RunHistory":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# 声明式测试套件：先登记步骤，再由线程池并发执行所有依赖已就绪的步骤，
+# 输出和测试结果仍按声明顺序排列；指定 history 时记录每次运行的结果，支持增量重跑
+class Suite:
+    def __init__(
+        self,
+        max_workers: int = 8,
+        history: Optional[Union[str, RunHistory]] = None,
+    ):
+        self.max_workers = max_workers
+        self.history = RunHistory(history) if isinstance(history, str) else history
+        self.summary: Dict[str, int] = {}
+        self._steps: List[_Step] = []
+        self._descriptions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+    def step(
+        self,
+        description: str,
+        verb: Callable[..., Tuple[str, Any, int, Optional[str]]],
+        url: Any,
+        *extract_paths: str,
+        **kwargs: Any,
+    ) -> Any:
+        step = _Step(
+            len(self._steps), description, verb, (url,), kwargs, extract_paths
+        )
+        for dep in step.deps:
+            if dep >= step.index:
+                raise ValueError(f"步骤 '{description}' 引用了尚未声明的步骤")
+        # 描述重复的步骤在运行历史中按出现次序区分
+        repeats = self._descriptions.get(description, 0)
+        self._descriptions[description] = repeats + 1
+        if repeats:
+            step.key = f"{description} #{repeats + 1}"
+        self._steps.append(step)
+        if not step.refs:
+            return None
+        if len(step.refs) == 1:
+            return step.refs[0]
+        return tuple(step.refs)
+
+    # only_failed: 只运行上次失败和新增的步骤（以及它们依赖的步骤）；
+    # failed_first: 先执行上次失败和新增的步骤，其余按上次耗时从长到短；
+    # fail_fast: 出现失败后不再启动新的步骤；
+    # reuse: 请求指纹与上次相同且上次成功的步骤直接复用上次的结果
+    def run(
+        self,
+        only_failed: bool = False,
+        failed_first: bool = False,
+        fail_fast: bool = False,
+        reuse: bool = False,
+    ) -> List[Any]:
+        history = self.history
+        if history is None and (only_failed or failed_first or reuse):
+            raise ValueError("only_failed、failed_first 和 reuse 需要指定 Suite 的 history")
+        steps = self._steps
+        results: List[Any] = [None] * len(steps)
+        previous = history.load() if history is not None else {}
+        started, start = time.time(), time.perf_counter()
+
+        selected = range(len(steps))
+        if only_failed:
+            selected = self._select(previous)
+        order = sorted(selected)
+        waiting = {i: set(steps[i].deps) for i in order}
+        dependents: Dict[int, List[int]] = {}
+        for i in order:
+            for dep in steps[i].deps:
+                dependents.setdefault(dep, []).append(i)
+
+        def _rank(i: int) -> Tuple[int, float]:
+            entry = previous.get(steps[i].key)
+            if entry is None:
+                return (1, 0.0)
+            success, duration = entry
+            return (2 if success else 0, -(duration or 0.0))
+
+        rows: List[Tuple[str, Optional[str], bool, Optional[float], Any]] = []
+        counts = {"executed": 0, "reused": 0, "failed": 0}
+        stopped = False
+        flushed = 0
+        done = set()
+
+        def _flush(i: int):
+            nonlocal stopped
+            step = steps[i]
+            response = step.response
+            failures = _test_results.failures
+            results[i] = run_test(
+                step.description, response, *step.extract_paths, **step.budget
+            )
+            # 超出耗时预算的步骤由 run_test 记为失败
+            success = response[0] == "✅" and _test_results.failures == failures
+            counts["reused" if step.reused else "executed"] += 1
+            if not success:
+                counts["failed"] += 1
+                stopped = stopped or fail_fast
+            if history is not None:
+                timing = getattr(response, "timing", None)
+                if step.reused:
+                    duration = previous[step.key][1]
+                else:
+                    duration = timing.total if timing is not None else None
+                rows.append((step.key, step.fingerprint, success, duration, response))
+            step.response = None
+            step.reused = False
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                running = {}
+
+                def _submit_ready(indices):
+                    if stopped:
+                        return
+                    if failed_first:
+                        indices = sorted(indices, key=_rank)
+                    for i in indices:
+                        if not waiting[i] and i not in running:
+                            running[i] = pool.submit(steps[i].execute, history, reuse)
+
+                _submit_ready(order)
+                while flushed < len(order):
+                    futures = {f: i for i, f in running.items() if i not in done}
+                    if not futures:
+                        break
+                    finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    ready = []
+                    for future in finished:
+                        i = futures[future]
+                        step = steps[i]
+                        # 单个步骤出错（如 Ref 解析或提取失败）只记为该步骤失败，其余步骤照常执行
+                        try:
+                            step.response = future.result()
+                            if step.refs:
+                                values, _ = _extract_content(
+                                    step.response[1], step.extract_paths
+                                )
+                                for ref, value in zip(step.refs, values):
+                                    ref.value = value
+                        except Exception as e:
+                            step.response = _step_error(e)
+                        if fail_fast and step.response[0] != "✅":
+                            stopped = True
+                        done.add(i)
+                        for child in dependents.get(i, ()):
+                            waiting[child].discard(i)
+                            ready.append(child)
+                    _submit_ready(ready)
+
+                    # 按声明顺序输出已完成的连续前缀
+                    while flushed < len(order) and order[flushed] in done:
+                        _flush(order[flushed])
+                        flushed += 1
+
+                    if stopped:
+                        # 取消已提交但尚未开始的步骤
+                        for i, future in list(running.items()):
+                            if future.cancel():
+                                del running[i]
+
+            # 提前停止时，排在未执行步骤之后的已完成步骤也照常输出
+            for i in order[flushed:]:
+                if i in done:
+                    _flush(i)
+        finally:
+            counts["skipped"] = len(steps) - counts["executed"] - counts["reused"]
+            self.summary = counts
+            if history is not None:
+                history.record(
+                    rows,
+                    started,
+                    time.perf_counter() - start,
+                    counts["executed"],
+                    counts["reused"],
+                    counts["skipped"],
+                )
+        if (history is not None or stopped) and _verbosity != "silent" and _live_progress is None:
+            _print_line(
+                f"[dim]套件运行: 执行 {counts['executed']} 步，复用 {counts['reused']} 步，"
+                f"跳过 {counts['skipped']} 步，失败 {counts['failed']} 步[/dim]"
+            )
+        return results
+
+    # 上次失败或没有记录的步骤，加上它们直接或间接依赖的步骤
+    def _select(self, previous: Dict[str, Tuple[bool, Optional[float]]]) -> List[int]:
+        selected = set()
+        pending = [
+            step.index
+            for step in self._steps
+            if not previous.get(step.key, (False, None))[0]
+        ]
+        while pending:
+            i = pending.pop()
+            if i not in selected:
+                selected.add(i)
+                pending.extend(self._steps[i].deps)
+        return sorted(selected)
+
+
+# ---------- 数据驱动批量用例 ----------
+
+
+_TRUE_STRINGS = ("1", "true", "yes", "y", "on")
+
+
+def _case_verb(method: str) -> Callable[..., Tuple[str, Any, int, Optional[str]]]:
+    verbs = {
+        "GET": get,
+        "POST": post,
+        "PUT": put,
+        "PATCH": patch,
+        "DELETE": delete,
+        "OPTIONS": option,
+        "OPTION": option,
+    }
+    verb = verbs.get(method.upper())
+    if verb is None:
+        raise ValueError(f"不支持的请求方法: {method}")
+    return verb
+
+
+# CSV 中的 body/headers 等字段以 JSON 文本保存，解析失败时保留原字符串
+def _case_json(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if not text:
+        return None
+    if text[0] in "{[":
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return value
+
+
+def _case_paths(value: Any) -> Tuple[str, ...]:
+    value = _case_json(value)
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return tuple(p.strip() for p in value.split(",") if p.strip())
+    return tuple(value)
+
+
+def _case_flag(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_STRINGS
+    return bool(value)
+
+
+# 逐行读取用例文件，不会一次性载入整个文件
+def _read_cases(path: str, format: Optional[str] = None):
+    if format is None:
+        format = "csv" if path.lower().endswith(".csv") else "jsonl"
+    if format == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for line, row in enumerate(csv.DictReader(f), 2):
+                yield line, row
+    elif format == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line, text in enumerate(f, 1):
+                if text.strip():
+                    yield line, text
+    else:
+        raise ValueError(f"未知的用例文件格式: {format}，可选: jsonl, csv")
+
+
+class _Case:
+    def __init__(
+        self,
+        line: int,
+        row: Any,
+        variables: Dict[str, Any],
+        base_url: Optional[str],
+    ):
+        self.line = line
+        self.description = f"第 {line} 行"
+        self.extract_paths: Tuple[str, ...] = ()
+        self.budget: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        try:
+            if isinstance(row, str):
+                row = _loads(row)
+            if not isinstance(row, dict):
+                raise ValueError("每行用例必须是一个对象")
+            self._parse(row, variables, base_url)
+        except Exception as e:
+            self.error = f"第 {line} 行: {e}"
+
+    def _parse(
+        self, row: Dict[str, Any], variables: Dict[str, Any], base_url: Optional[str]
+    ):
+        method = (row.get("method") or "GET").strip()
+        self.verb = _case_verb(method)
+        if not row.get("url"):
+            raise ValueError("缺少 url")
+        try:
+            url = row["url"].format(**{**variables, **row})
+        except KeyError as e:
+            raise ValueError(f"URL 模板缺少变量 {e}") from None
+        if base_url and not url.startswith(("http://", "https://")):
+            url = base_url.rstrip("/") + "/" + url.lstrip("/")
+        self.url = url
+        self.description = row.get("description") or f"{method.upper()} {url}"
+        self.extract_paths = _case_paths(row.get("extract"))
+        for name in ("max_time", "max_p95"):
+            if row.get(name) not in (None, ""):
+                self.budget[name] = float(row[name])
+        self.kwargs: Dict[str, Any] = {
+            "should_fail": _case_flag(row.get("should_fail")),
+            "headers": _case_json(row.get("headers")) or None,
+            "key": row.get("key") or None,
+        }
+        body = _case_json(row.get("body"))
+        if body is not None:
+            if self.verb not in (post, put, patch):
+                raise ValueError(f"{method.upper()} 请求不能带 body")
+            self.kwargs["body"] = body
+
+    def execute(self) -> Tuple[str, Any, int, Optional[str]]:
+        if self.error is not None:
+            return "❌", {"error": "用例无效", "details": self.error}, 999, None
+        return self.verb(self.url, **self.kwargs)
+
+
+# 从 JSONL/CSV 文件流式读取用例并发执行，结果按文件顺序交给 run_test，
+# 同时在途的用例数不超过 max_in_flight
+def run_cases(
+    path: str,
+    max_workers: int = 8,
+    max_in_flight: Optional[int] = None,
+    variables: Optional[Dict[str, Any]] = None,
+    base_url: Optional[str] = None,
+    format: Optional[str] = None,
+) -> Dict[str, int]:
+    variables = dict(variables or {})
+    window = max_in_flight or max_workers * 4
+    counts = {"cases": 0, "passed": 0, "failed": 0}
+    pending: collections.deque = collections.deque()
+
+    def _flush_one():
+        case, future = pending.popleft()
+        response = future.result()
+        failures = _test_results.failures
+        run_test(case.description, response, *case.extract_paths, **case.budget)
+        counts["cases"] += 1
+        passed = response[0] == "✅"
+        if passed and case.budget:
+            # 超出耗时预算的用例由 run_test 记为失败
+            passed = _test_results.failures == failures
+        counts["passed" if passed else "failed"] += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for line, row in _read_cases(path, format):
+            case = _Case(line, row, variables, base_url)
+            pending.append((case, pool.submit(case.execute)))
+            while len(pending) >= window:
+                _flush_one()
+        while pending:
+            _flush_one()
+    return counts
+
+
+# ---------- 负载测试 ----------
+
+
+# 延迟直方图（HDR 风格）：以微秒计，每个 2 的幂区间再均分为 128 个桶，
+# 相对误差不超过 1/128；内存固定，多个直方图逐桶相加即可精确合并
+_HIST_SUB_BITS = 7
+_HIST_MAX_MAGNITUDE = 36  # 最大可记录 2^36 微秒（约 19 小时），更大的值按上限记录
+_HIST_MAX_VALUE = (1 << _HIST_MAX_MAGNITUDE) - 1
+_HIST_BUCKETS = (
+    (_HIST_MAX_MAGNITUDE - _HIST_SUB_BITS - 1) << _HIST_SUB_BITS
+) + (2 << _HIST_SUB_BITS)
+
+
+def _bucket_index(micros: int) -> int:
+    shift = max(micros.bit_length() - _HIST_SUB_BITS - 1, 0)
+    return (shift << _HIST_SUB_BITS) + (micros >> shift)
+
+
+# 桶内可能的最大值（微秒）
+def _bucket_upper(index: int) -> int:
+    if index < (2 << _HIST_SUB_BITS):
+        return index
+    shift = (index >> _HIST_SUB_BITS) - 1
+    return ((index - (shift << _HIST_SUB_BITS) + 1) << shift) - 1
+
+
+# 单个步骤（或全部请求）的延迟统计
+class _LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.recorded = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.buckets = array.array("Q", bytes(8 * _HIST_BUCKETS))
+
+    def add(self, elapsed: Optional[float], is_success: bool):
+        self.count += 1
+        if not is_success:
+            self.errors += 1
+        if elapsed is None:
+            return
+        elapsed = max(elapsed, 0.0)
+        micros = min(int(elapsed * 1_000_000), _HIST_MAX_VALUE)
+        self.buckets[_bucket_index(micros)] += 1
+        self.recorded += 1
+        self.total += elapsed
+        if self.min is None or elapsed < self.min:
+            self.min = elapsed
+        if self.max is None or elapsed > self.max:
+            self.max = elapsed
+
+    def merge(self, other: "_LatencyStats"):
+        self.count += other.count
+        self.errors += other.errors
+        self.recorded += other.recorded
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        buckets = self.buckets
+        for index, n in enumerate(other.buckets):
+            if n:
+                buckets[index] += n
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.count if self.count else 0.0
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.recorded if self.recorded else None
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.recorded:
+            return None
+        rank = max(math.ceil(p / 100 * self.recorded), 1)
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            if n:
+                seen += n
+                if seen >= rank:
+                    return min(_bucket_upper(index) / 1_000_000, self.max)
+        return self.max
+
+
+class LoadReport:
+    def __init__(self, users: int):
+        self.users = users
+        self.nodes = 1
+        self.duration = 0.0
+        self.iterations = 0
+        self.scenario_errors = 0
+        self.requests = _LatencyStats()
+        self.steps: Dict[str, _LatencyStats] = {}
+
+    # 合并另一个进程或节点的报告；各节点同时开始，总用时取最长的一个
+    def merge(self, other: "LoadReport"):
+        self.users += other.users
+        self.nodes += other.nodes
+        self.duration = max(self.duration, other.duration)
+        self.iterations += other.iterations
+        self.scenario_errors += other.scenario_errors
+        self.requests.merge(other.requests)
+        for description, stats in other.steps.items():
+            mine = self.steps.get(description)
+            if mine is None:
+                mine = self.steps[description] = _LatencyStats()
+            mine.merge(stats)
+
+    @property
+    def rps(self) -> float:
+        return self.requests.count / self.duration if self.duration else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.requests.error_rate
+
+
+# 负载测试期间收集 run_test 和各 HTTP 方法的结果，代替逐条渲染
+class _LoadCollector:
+    def __init__(self, report: LoadReport):
+        self.report = report
+        self._lock = threading.Lock()
+
+    def record_request(self, response: ApiResponse):
+        with self._lock:
+            self.report.requests.add(response.elapsed, response[0] == "✅")
+
+    def record_step(
+        self,
+        description: str,
+        response: Tuple[str, Any, int, Optional[str]],
+        extract_paths: Tuple[str, ...],
+    ) -> Any:
+        content = response[1]
+        values, _ = _extract_content(content, extract_paths)
+        is_success = response[0] == "✅"
+        if isinstance(content, StreamedBody) and content.error:
+            is_success = False
+        with self._lock:
+            stats = self.report.steps.get(description)
+            if stats is None:
+                stats = self.report.steps[description] = _LatencyStats()
+            stats.add(getattr(response, "elapsed", None), is_success)
+        if not extract_paths:
+            return None
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def record_iteration(self, ok: bool):
+        with self._lock:
+            self.report.iterations += 1
+            if not ok:
+                self.report.scenario_errors += 1
+
+
+# 当前负载测试的收集器，不为 None 时 run_test 和 print_info 不再渲染输出
+_load_stats: Optional[_LoadCollector] = None
+
+
+def load_test(
+    scenario: Callable[[], Any],
+    users: int = 10,
+    iterations: Optional[int] = None,
+    duration: Optional[float] = None,
+    show: bool = True,
+    title: str = "负载测试结果",
+) -> LoadReport:
+    global _load_stats
+    if iterations is None and duration is None:
+        raise ValueError("iterations 和 duration 至少需要指定一个")
+    if _load_stats is not None:
+        raise RuntimeError("已有负载测试正在运行")
+
+    report = LoadReport(users)
+    collector = _LoadCollector(report)
+    counter_lock = threading.Lock()
+    started = [0]
+
+    def _next_iteration(deadline: Optional[float]) -> bool:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        with counter_lock:
+            if iterations is not None and started[0] >= iterations:
+                return False
+            started[0] += 1
+        return True
+
+    def _virtual_user(deadline: Optional[float]):
+        while _next_iteration(deadline):
+            try:
+                scenario()
+            except Exception:
+                collector.record_iteration(False)
+            else:
+                collector.record_iteration(True)
+
+    _load_stats = collector
+    try:
+        start = time.perf_counter()
+        deadline = start + duration if duration is not None else None
+        threads = [
+            threading.Thread(target=_virtual_user, args=(deadline,), daemon=True)
+            for _ in range(users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report.duration = time.perf_counter() - start
+    finally:
+        _load_stats = None
+
+    if show:
+        show_load_result(report, title)
+    return report
+
+
+# ---------- 多进程与多节点负载测试 ----------
+#
+# 协调者通过本地套接字（multiprocessing.connection）与各节点通信：
+#   节点连接后发送 ("hello", pid)；
+#   协调者在所有节点到齐后分配 ("config", 用户数, 迭代次数, 时长)，节点回复 ("ready",)；
+#   协调者同时向所有节点发送 ("start",)；
+#   节点运行 load_test 后发回 ("report", LoadReport) 或 ("error", 错误信息)
+
+
+def _split(total: Optional[int], parts: int, i: int) -> Optional[int]:
+    if total is None:
+        return None
+    return total // parts + (1 if i < total % parts else 0)
+
+
+def _serve_node(conn, scenario: Callable[[], Any]):
+    conn.send(("hello", os.getpid()))
+    _, users, iterations, duration = conn.recv()
+    conn.send(("ready",))
+    conn.recv()
+    try:
+        report = load_test(scenario, users, iterations, duration, show=False)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    else:
+        conn.send(("report", report))
+
+
+# 在后台线程中接受 nodes 个节点的连接，主线程按 0.1 秒轮询：
+# 超过 timeout 或本地工作进程提前退出时报错，而不是一直阻塞在 accept 上
+def _accept_nodes(
+    listener,
+    nodes: int,
+    conns: list,
+    workers: Optional[List[multiprocessing.Process]],
+    timeout: Optional[float],
+):
+    accepted: queue.Queue = queue.Queue()
+
+    def _accept():
+        try:
+            for _ in range(nodes):
+                accepted.put(listener.accept())
+        except Exception as e:
+            # 监听套接字被关闭时 accept 抛出 OSError，此时已不再需要结果
+            accepted.put(e)
+
+    threading.Thread(target=_accept, daemon=True).start()
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    while len(conns) < nodes:
+        try:
+            conn = accepted.get(timeout=0.1)
+        except queue.Empty:
+            for i, worker in enumerate(workers or ()):
+                if not worker.is_alive() and worker.exitcode is not None:
+                    raise RuntimeError(
+                        f"负载测试工作进程 {i}（pid {worker.pid}）在连接协调者之前退出，"
+                        f"退出码 {worker.exitcode}"
+                    )
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TimeoutError(
+                    f"{timeout:g} 秒内只有 {len(conns)}/{nodes} 个负载测试节点连接"
+                )
+            continue
+        if isinstance(conn, Exception):
+            raise conn
+        conns.append(conn)
+        conn.recv()
+
+
+def _coordinate(
+    listener,
+    nodes: int,
+    users: int,
+    iterations: Optional[int],
+    duration: Optional[float],
+    workers: Optional[List[multiprocessing.Process]] = None,
+    connect_timeout: Optional[float] = None,
+) -> LoadReport:
+    if iterations is None and duration is None:
+        raise ValueError("iterations 和 duration 至少需要指定一个")
+    if users < nodes:
+        raise ValueError(f"虚拟用户数 {users} 少于节点数 {nodes}")
+    conns: list = []
+    try:
+        _accept_nodes(listener, nodes, conns, workers, connect_timeout)
+        for i, conn in enumerate(conns):
+            conn.send(
+                (
+                    "config",
+                    _split(users, nodes, i),
+                    _split(iterations, nodes, i),
+                    duration,
+                )
+            )
+        for conn in conns:
+            conn.recv()
+        for conn in conns:
+            conn.send(("start",))
+        merged: Optional[LoadReport] = None
+        for conn in conns:
+            try:
+                kind, payload = conn.recv()
+            except EOFError:
+                raise RuntimeError("负载测试节点异常退出") from None
+            if kind == "error":
+                raise RuntimeError(f"负载测试节点出错: {payload}")
+            if merged is None:
+                merged = payload
+            else:
+                merged.merge(payload)
+        return merged
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+def _process_node(scenario: Callable[[], Any], address, authkey: bytes):
+    from multiprocessing.connection import Client
+
+    with Client(address, authkey=authkey) as conn:
+        _serve_node(conn, scenario)
+
+
+# 把场景分给多个工作进程执行，绕开单进程的 GIL 上限；users 和 iterations 为所有进程的总数
+def multiprocess_load_test(
+    scenario: Callable[[], Any],
+    processes: Optional[int] = None,
+    users: int = 10,
+    iterations: Optional[int] = None,
+    duration: Optional[float] = None,
+    show: bool = True,
+    title: str = "负载测试结果",
+    connect_timeout: float = 60.0,
+) -> LoadReport:
+    from multiprocessing.connection import Listener
+
+    processes = min(processes or os.cpu_count() or 1, users)
+    authkey = os.urandom(16)
+    with Listener(("127.0.0.1", 0), authkey=authkey) as listener:
+        workers = [
+            multiprocessing.Process(
+                target=_process_node,
+                args=(scenario, listener.address, authkey),
+                daemon=True,
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            report = _coordinate(
+                listener,
+                processes,
+                users,
+                iterations,
+                duration,
+                workers,
+                connect_timeout,
+            )
+        finally:
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+
+    if show:
+        show_load_result(report, title)
+    return report
+
+
+# 多节点模式的协调者：等待 nodes 个 load_node 连接后统一开始，合并各节点的报告
+def load_coordinator(
+    nodes: int,
+    users: int = 10,
+    iterations: Optional[int] = None,
+    duration: Optional[float] = None,
+    address: Tuple[str, int] = ("127.0.0.1", 6789),
+    authkey: bytes = b"PAT",
+    show: bool = True,
+    title: str = "负载测试结果",
+    connect_timeout: Optional[float] = None,
+) -> LoadReport:
+    from multiprocessing.connection import Listener
+
+    with Listener(address, authkey=authkey) as listener:
+        report = _coordinate(
+            listener, nodes, users, iterations, duration, None, connect_timeout
+        )
+    if show:
+        show_load_result(report, title)
+    return report
+
+
+# 多节点模式的节点：连接协调者，按分配的用户数和迭代次数运行场景
+def load_node(
+    scenario: Callable[[], Any],
+    address: Tuple[str, int] = ("127.0.0.1", 6789),
+    authkey: bytes = b"PAT",
+    retry_for: float = 30.0,
+):
+    from multiprocessing.connection import Client
+
+    deadline = time.perf_counter() + retry_for
+    while True:
+        try:
+            conn = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            # 协调者可能还没启动
+            if time.perf_counter() >= deadline:
+                raise
+            time.sleep(0.1)
+    with conn:
+        _serve_node(conn, scenario)
+
+
+# 恒定到达率（开环）测试报告：到达延迟从计划发送时刻开始计算
+class ArrivalReport(LoadReport):
+    def __init__(self, workers: int, target_rate: float):
+        super().__init__(workers)
+        self.target_rate = target_rate
+        self.scheduled = 0
+        self.arrivals = _LatencyStats()
+        self.lag = _LatencyStats()
+
+    @property
+    def achieved_rate(self) -> float:
+        return self.arrivals.count / self.duration if self.duration else 0.0
+
+
+# 按到达率曲线生成计划发送时刻（相对开始时刻的秒数）；
+# stages 中每一段在 duration 秒内把速率从上一段的终值线性变化到 target_rate
+def _arrival_times(start_rate: float, stages: List[Tuple[float, float]]):
+    offset = 0.0
+    emitted = 0.0
+    rate = start_rate
+    for duration, target in stages:
+        if duration <= 0:
+            rate = target
+            continue
+        a = (target - rate) / (2 * duration)
+        b = rate
+        k = math.floor(emitted) + 1
+        while True:
+            need = k - emitted
+            if a == 0:
+                if b <= 0:
+                    break
+                t = need / b
+            else:
+                disc = b * b + 4 * a * need
+                if disc < 0:
+                    break
+                t = (-b + math.sqrt(disc)) / (2 * a)
+            if t > duration or t < 0:
+                break
+            yield offset + t
+            k += 1
+        emitted += rate * duration + (target - rate) * duration / 2
+        offset += duration
+        rate = target
+
+
+def arrival_rate_test(
+    request: Callable[[], Any],
+    rate: Optional[float] = None,
+    duration: Optional[float] = None,
+    stages: Optional[List[Tuple[float, float]]] = None,
+    start_rate: float = 0.0,
+    workers: int = 100,
+    show: bool = True,
+    title: str = "恒定到达率测试结果",
+) -> ArrivalReport:
+    global _load_stats
+    if stages is None:
+        if rate is None or duration is None:
+            raise ValueError("需要同时指定 rate 和 duration，或者指定 stages")
+        stages = [(duration, rate)]
+        start_rate = rate
+    if _load_stats is not None:
+        raise RuntimeError("已有负载测试正在运行")
+
+    total_time = sum(d for d, _ in stages)
+    peak_rate = max([start_rate] + [r for _, r in stages])
+    report = ArrivalReport(workers, peak_rate)
+    collector = _LoadCollector(report)
+    lock = threading.Lock()
+
+    def _arrive(intended: float):
+        began = time.perf_counter()
+        ok = True
+        try:
+            result = request()
+            if isinstance(result, tuple) and result:
+                ok = result[0] == "✅"
+        except Exception:
+            ok = False
+        finished = time.perf_counter()
+        with lock:
+            report.arrivals.add(finished - intended, ok)
+            report.lag.add(began - intended, True)
+
+    _load_stats = collector
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            start = time.perf_counter()
+            for offset in _arrival_times(start_rate, stages):
+                intended = start + offset
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(_arrive, intended)
+                report.scheduled += 1
+        report.duration = max(time.perf_counter() - start, total_time)
+    finally:
+        _load_stats = None
+
+    if show:
+        show_load_result(report, title)
+    return report
+
+
+def show_load_result(report: LoadReport, title: str = "负载测试结果"):
+    if _verbosity == "silent":
+        return
+    table = _new_table()
+    table.add_column("测试描述", style="dim", min_width=16, ratio=1)
+    table.add_column("请求", justify="right", no_wrap=True)
+    table.add_column("错误率", justify="right", no_wrap=True)
+    table.add_column("req/s", justify="right", no_wrap=True)
+    table.add_column("p50", justify="right", no_wrap=True)
+    table.add_column("p90", justify="right", no_wrap=True)
+    table.add_column("p99", justify="right", no_wrap=True)
+    table.add_column("max", justify="right", no_wrap=True)
+
+    def _row(name: str, stats: _LatencyStats, show_errors: bool = True):
+        rps = stats.count / report.duration if report.duration else 0.0
+        color = "red" if stats.errors else "green"
+        table.add_row(
+            name,
+            str(stats.count),
+            f"[{color}]{stats.error_rate:.2%}[/{color}]" if show_errors else "-",
+            f"{rps:.1f}",
+            _format_ms(stats.percentile(50)),
+            _format_ms(stats.percentile(90)),
+            _format_ms(stats.percentile(99)),
+            _format_ms(stats.max),
+        )
+
+    for description, stats in report.steps.items():
+        _row(description, stats)
+
+    table.add_row("", "", "", "", "", "", "", "")
+    _row("[bold]全部请求[/bold]", report.requests)
+
+    if isinstance(report, ArrivalReport):
+        _row("[bold]到达延迟[/bold]", report.arrivals)
+        _row("[bold]调度滞后[/bold]", report.lag, show_errors=False)
+        summary = (
+            f"目标: {report.target_rate:.1f}/s | 实际: {report.achieved_rate:.1f}/s"
+            f" | 线程: {report.users} | 用时: {report.duration:.2f}s | 单位: ms"
+        )
+    elif report.nodes > 1:
+        summary = (
+            f"节点: {report.nodes} | 用户: {report.users} | 场景: {report.iterations} 次"
+            f" (异常 {report.scenario_errors}) | 用时: {report.duration:.2f}s | 单位: ms"
+        )
+    else:
+        summary = (
+            f"虚拟用户: {report.users} | 场景执行: {report.iterations} 次"
+            f" (异常 {report.scenario_errors}) | 用时: {report.duration:.2f}s | 延迟单位: ms"
+        )
+    _print_panel(table, title, "cyan", summary)
+
+
+# ---------- 后端生命周期 ----------
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _fill_port(value: Any, port: int) -> Any:
+    if isinstance(value, str):
+        return value.replace("{port}", str(port))
+    if isinstance(value, (list, tuple)):
+        return [_fill_port(v, port) for v in value]
+    return value
+
+
+def _terminate(process: subprocess.Popen, force: bool):
+    if os.name != "posix":
+        process.kill() if force else process.terminate()
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+
+# 一个被测后端进程：启动后按健康检查 URL 或 TCP 端口轮询，直到就绪
+class Backend:
+    def __init__(
+        self,
+        command: Union[str, List[str]],
+        name: Optional[str] = None,
+        port: Optional[int] = None,
+        health: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        cwd: Optional[str] = None,
+        cleanup: Union[str, List[str], Tuple[str, ...]] = (),
+        ready_timeout: float = 30.0,
+        stop_timeout: float = 5.0,
+        log: Optional[str] = None,
+    ):
+        self.command = command
+        self.name = name or (command if isinstance(command, str) else command[0])
+        self.port = port
+        self.health = health
+        self.env = dict(env or {})
+        self.cwd = cwd
+        self.cleanup = [cleanup] if isinstance(cleanup, str) else list(cleanup)
+        self.ready_timeout = ready_timeout
+        self.stop_timeout = stop_timeout
+        self.log = log
+        self.process: Optional[subprocess.Popen] = None
+        self.startup_time: Optional[float] = None
+        self.teardown_time: Optional[float] = None
+        self._log_file = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "Backend":
+        if self.process is not None:
+            return self
+        start = time.perf_counter()
+        if self.port is None:
+            self.port = _free_port()
+        env = dict(os.environ)
+        env["PORT"] = str(self.port)
+        env.update({k: _fill_port(v, self.port) for k, v in self.env.items()})
+        if self.log:
+            self._log_file = open(self.log, "ab")
+        output = self._log_file or subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            _fill_port(self.command, self.port),
+            shell=isinstance(self.command, str),
+            cwd=self.cwd,
+            env=env,
+            stdout=output,
+            stderr=output,
+            # 独立的进程组，关闭时连同 shell 启动的子进程一起结束
+            start_new_session=os.name == "posix",
+        )
+        try:
+            self._wait_ready(start)
+        except Exception:
+            self.stop()
+            raise
+        self.startup_time = time.perf_counter() - start
+        return self
+
+    def _probe(self) -> bool:
+        try:
+            if self.health:
+                url = _fill_port(self.health, self.port)
+                return 200 <= requests.get(url, timeout=1).status_code < 300
+            with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                return True
+        except (OSError, requests.RequestException):
+            return False
+
+    def _wait_ready(self, start: float):
+        delay = 0.01
+        while True:
+            code = self.process.poll()
+            if code is not None:
+                raise RuntimeError(f"后端 {self.name} 启动失败，退出码: {code}")
+            if self._probe():
+                return
+            if time.perf_counter() - start > self.ready_timeout:
+                raise TimeoutError(
+                    f"后端 {self.name} 在 {self.ready_timeout:g} 秒内未就绪"
+                )
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    def stop(self):
+        start = time.perf_counter()
+        process, self.process = self.process, None
+        if process is not None and process.poll() is None:
+            _terminate(process, force=False)
+            try:
+                process.wait(self.stop_timeout)
+            except subprocess.TimeoutExpired:
+                _terminate(process, force=True)
+                process.wait()
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+        for path in self.cleanup:
+            path = _fill_port(path, self.port)
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.lexists(path):
+                os.remove(path)
+        self.teardown_time = time.perf_counter() - start
+
+    def __repr__(self) -> str:
+        return f"Backend(name={self.name!r}, port={self.port})"
+
+
+# 一组同时启动、同时关闭的后端
+class BackendGroup:
+    def __init__(self, *backends: Backend, show: bool = True):
+        self.backends = list(backends)
+        self.show = show
+        self.startup_time: Optional[float] = None
+        self.teardown_time: Optional[float] = None
+        self._running = False
+
+    def __getitem__(self, name: Union[int, str]) -> Backend:
+        if isinstance(name, int):
+            return self.backends[name]
+        for backend in self.backends:
+            if backend.name == name:
+                return backend
+        raise KeyError(name)
+
+    def start(self) -> "BackendGroup":
+        if self._running:
+            return self
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(self.backends) or 1) as pool:
+            futures = [pool.submit(b.start) for b in self.backends]
+            errors = [f.exception() for f in futures]
+        failed = [e for e in errors if e is not None]
+        if failed:
+            self.stop(show=False)
+            raise failed[0]
+        self.startup_time = time.perf_counter() - start
+        self._running = True
+        return self
+
+    def stop(self, show: Optional[bool] = None):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(self.backends) or 1) as pool:
+            for future in [pool.submit(b.stop) for b in self.backends]:
+                future.result()
+        self.teardown_time = time.perf_counter() - start
+        self._running = False
+        if self.show if show is None else show:
+            show_backend_times(self)
+
+    # 运行外部测试命令，后端地址通过环境变量 PAT_BACKEND_<名称>_URL 传入
+    def run(self, command: Union[str, List[str]]) -> int:
+        env = dict(os.environ)
+        for i, backend in enumerate(self.backends):
+            key = re.sub(r"\W", "_", backend.name).upper() or str(i)
+            env[f"PAT_BACKEND_{key}_URL"] = backend.url
+            env[f"PAT_BACKEND_{key}_PORT"] = str(backend.port)
+        return subprocess.run(
+            command, shell=isinstance(command, str), env=env
+        ).returncode
+
+    def __enter__(self) -> "BackendGroup":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def start_backends(*backends: Backend, show: bool = True) -> BackendGroup:
+    return BackendGroup(*backends, show=show).start()
+
+
+def show_backend_times(group: BackendGroup, title: str = "后端启动与关闭"):
+    if _verbosity == "silent":
+        return
+    table = _new_table()
+    table.add_column("后端", style="dim", min_width=16, ratio=1)
+    table.add_column("端口", justify="right", no_wrap=True)
+    table.add_column("启动", justify="right", no_wrap=True)
+    table.add_column("关闭", justify="right", no_wrap=True)
+
+    for backend in group.backends:
+        table.add_row(
+            backend.name,
+            str(backend.port or "-"),
+            _format_ms(backend.startup_time),
+            _format_ms(backend.teardown_time),
+        )
+    table.add_row("", "", "", "")
+    table.add_row(
+        "[bold]总计（并行）[/bold]",
+        "",
+        f"[bold]{_format_ms(group.startup_time)}[/bold]",
+        f"[bold]{_format_ms(group.teardown_time)}[/bold]",
+    )
+    _print_panel(table, title, "cyan", "耗时单位: ms")
+
+
+# ---------- JSON 编解码 ----------
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 请求体编码和响应解析使用的 JSON 后端：安装了 orjson 时默认使用 orjson，否则使用标准库
+JSON_BACKENDS = ("orjson", "json")
+_json_backend = os.environ.get("PAT_JSON_BACKEND") or (
+    "orjson" if orjson is not None else "json"
+)
+if _json_backend not in JSON_BACKENDS or orjson is None:
+    _json_backend = "json"
+
+
+def set_json_backend(name: str):
+    global _json_backend
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"未知的 JSON 后端: {name}，可选: {', '.join(JSON_BACKENDS)}")
+    if name == "orjson" and orjson is None:
+        raise ImportError("orjson 后端需要先安装: uv add orjson 或 pip install orjson")
+    _json_backend = name
+
+
+def get_json_backend() -> str:
+    return _json_backend
+
+
+# orjson 原生支持而标准库不支持的类型，按 orjson 的格式编码
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# 与 orjson 一样把 NaN 和正负无穷替换为 null
+def _finite(obj: Any, active: Optional[set] = None) -> Any:
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if not isinstance(obj, (dict, list, tuple)):
+        return obj
+    if active is None:
+        active = set()
+    if id(obj) in active:
+        raise ValueError("Circular reference detected")
+    active.add(id(obj))
+    if isinstance(obj, dict):
+        result: Any = {key: _finite(value, active) for key, value in obj.items()}
+    else:
+        result = [_finite(value, active) for value in obj]
+    active.discard(id(obj))
+    return result
+
+
+def _dumps(obj: Any) -> bytes:
+    if _json_backend == "orjson":
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson 不支持的对象（如超过 64 位的整数）交给标准库
+            pass
+    # 与 orjson 的紧凑输出一致，请求体字节（以及回放缓存键）不随后端变化
+    try:
+        text = json.dumps(
+            obj,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=_json_default,
+            allow_nan=False,
+        )
+    except ValueError:
+        text = json.dumps(
+            _finite(obj),
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=lambda value: _finite(_json_default(value)),
+            allow_nan=False,
+        )
+    return text.encode("utf-8")
+
+
+def _loads(data: Union[bytes, str]) -> Any:
+    if _json_backend == "orjson":
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # UTF-16/32 编码、NaN 等 orjson 不接受的内容交给标准库再试一次
+            pass
+    return json.loads(data)
+
+
+# 直接从响应字节解析 JSON；响应头声明了其他字符集时按该字符集解码后再试
+def _parse_json_body(content: bytes, encoding: Optional[str]) -> Any:
+    try:
+        return _loads(content)
+    except ValueError:
+        if not encoding or codecs.lookup(encoding).name == "utf-8":
+            raise
+    return _loads(content.decode(encoding, errors="replace"))
+
+
+# ---------- 流式上传与下载 ----------
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _iter_chunks(chunks) -> Any:
+    if hasattr(chunks, "read"):
+        # 文件对象按固定大小分块读取，而不是按行迭代
+        chunks = iter(functools.partial(chunks.read, _CHUNK_SIZE), chunks.read(0))
+    for chunk in chunks:
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+# 从文件流式读取的请求体：按 chunk_size 分块读取，或者通过内存映射逐段发送，
+# 内存占用与文件大小无关；每次发送都从头重新读取
+class FileBody:
+    def __init__(
+        self,
+        path: str,
+        content_type: Optional[str] = None,
+        chunk_size: int = _CHUNK_SIZE,
+        mmap: bool = False,
+    ):
+        self.path = os.fspath(path)
+        self.content_type = (
+            content_type
+            or mimetypes.guess_type(self.path)[0]
+            or "application/octet-stream"
+        )
+        self.chunk_size = chunk_size
+        self.mmap = mmap
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.path)
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            if not self.mmap:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # 已发送的页从进程中释放（仍留在页缓存里），常驻内存不随文件大小增长
+            release = (
+                hasattr(mmap, "MADV_DONTNEED")
+                and self.chunk_size % mmap.PAGESIZE == 0
+            )
+            try:
+                view = memoryview(mapped)
+                for offset in range(0, size, self.chunk_size):
+                    yield view[offset : offset + self.chunk_size]
+                    if release:
+                        mapped.madvise(
+                            mmap.MADV_DONTNEED,
+                            offset,
+                            min(self.chunk_size, size - offset),
+                        )
+                view.release()
+            finally:
+                try:
+                    mapped.close()
+                except BufferError:
+                    # 发送方仍持有某一段的视图，映射在视图释放后自动关闭
+                    pass
+
+    def __repr__(self) -> str:
+        return f"FileBody({self.path!r})"
+
+
+# 流式生成的 multipart/form-data 请求体；fields 的值可以是字符串、字节、
+# dict/list（按 JSON 编码）、FileBody、生成器，或 (文件名, 值[, Content-Type]) 元组
+class MultipartBody:
+    def __init__(self, fields: Dict[str, Any], boundary: Optional[str] = None):
+        self.boundary = boundary or os.urandom(16).hex()
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._parts = [self._part(name, value) for name, value in fields.items()]
+        self._closing = f"--{self.boundary}--\r\n".encode("ascii")
+        # requests 通过 len 属性得到 Content-Length；含生成器时长度未知，改用分块传输
+        sizes = [_source_size(source) for _, source in self._parts]
+        if None in sizes:
+            self.len = None
+        else:
+            self.len = sum(len(h) + size + 2 for (h, _), size in zip(self._parts, sizes))
+            self.len += len(self._closing)
+
+    def _part(self, name: str, value: Any) -> Tuple[bytes, Any]:
+        filename = content_type = None
+        if isinstance(value, tuple):
+            filename, value, content_type = (value + (None,))[:3]
+        if isinstance(value, FileBody):
+            filename = filename or os.path.basename(value.path)
+            content_type = content_type or value.content_type
+        elif isinstance(value, (dict, list)):
+            value = _dumps(value)
+            content_type = content_type or "application/json"
+        elif isinstance(value, str):
+            value = value.encode("utf-8")
+        elif filename is not None and isinstance(value, (bytes, bytearray)):
+            content_type = content_type or "application/octet-stream"
+        header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote_field(name)}"'
+        if filename is not None:
+            header += f'; filename="{_quote_field(filename)}"'
+        header += "\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        return (header + "\r\n").encode("utf-8"), value
+
+    def __iter__(self):
+        for header, source in self._parts:
+            yield header
+            if isinstance(source, (bytes, bytearray)):
+                yield source
+            else:
+                yield from _iter_chunks(source)
+            yield b"\r\n"
+        yield self._closing
+
+    def __repr__(self) -> str:
+        return f"MultipartBody({len(self._parts)} 个字段)"
+
+
+def _source_size(source: Any) -> Optional[int]:
+    if isinstance(source, (bytes, bytearray, FileBody)):
+        return len(source)
+    return None
+
+
+def _body_length(body: Any) -> Optional[int]:
+    if isinstance(body, MultipartBody):
+        return body.len
+    return _source_size(body)
+
+
+def _quote_field(value: str) -> str:
+    for char, escaped in (("\\", "\\\\"), ('"', "%22"), ("\r", "%0D"), ("\n", "%0A")):
+        value = value.replace(char, escaped)
+    return value
+
+
+def _is_stream_body(body: Any) -> bool:
+    return (
+        isinstance(body, (FileBody, MultipartBody))
+        or hasattr(body, "read")
+        or hasattr(body, "__next__")
+    )
+
+
+# 下载目标：响应体分块写入文件，边写边计算校验和，
+# 给出 checksum 或 size 时校验，不一致的文件会被删除
+class DownloadSink:
+    def __init__(
+        self,
+        path: str,
+        checksum: Optional[str] = None,
+        size: Optional[int] = None,
+        algorithm: str = "sha256",
+        chunk_size: int = _CHUNK_SIZE,
+    ):
+        self.path = os.fspath(path)
+        self.checksum = checksum.lower() if checksum else None
+        self.size = size
+        self.algorithm = algorithm
+        self.chunk_size = chunk_size
+        hashlib.new(algorithm)
+
+    # 返回写入结果和校验错误（没有错误时为 None）
+    def write(self, resp: requests.Response) -> Tuple[Dict[str, Any], Optional[str]]:
+        digest = hashlib.new(self.algorithm)
+        written = 0
+        partial = self.path + ".part"
+        try:
+            with open(partial, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=self.chunk_size):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    written += len(chunk)
+        except BaseException:
+            _remove_quietly(partial)
+            raise
+        finally:
+            resp.close()
+        result = {
+            "path": self.path,
+            "bytes": written,
+            self.algorithm: digest.hexdigest(),
+            "content_type": resp.headers.get("Content-Type"),
+        }
+        error = None
+        if self.size is not None and written != self.size:
+            error = f"大小不一致: 期望 {self.size} 字节，实际 {written} 字节"
+        elif self.checksum is not None and result[self.algorithm] != self.checksum:
+            error = f"{self.algorithm} 校验和不一致"
+        if error:
+            _remove_quietly(partial)
+        else:
+            os.replace(partial, self.path)
+        return result, error
+
+    def __repr__(self) -> str:
+        return f"DownloadSink({self.path!r})"
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ---------- 压缩 ----------
+
+# 请求体可选的压缩算法；br 需要安装 brotli
+COMPRESSIONS = ("gzip", "deflate", "br")
+
+_ZLIB_WBITS = {"gzip": 31, "deflate": 15}
+
+
+def _import_brotli():
+    try:
+        return importlib.import_module("brotli")
+    except ImportError as e:
+        raise ImportError(
+            "br 压缩需要 brotli，请先安装: uv add brotli 或 pip install brotli"
+        ) from e
+
+
+# 返回 (压缩一块, 结束) 两个函数
+def _compressor(encoding: str) -> Tuple[Callable[[Any], bytes], Callable[[], bytes]]:
+    if encoding in _ZLIB_WBITS:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, _ZLIB_WBITS[encoding])
+        return compressor.compress, compressor.flush
+    if encoding == "br":
+        compressor = _import_brotli().Compressor()
+        return compressor.process, compressor.finish
+    raise ValueError(f"未知的压缩算法: {encoding}，可选: {', '.join(COMPRESSIONS)}")
+
+
+def _compress(encoding: str, data: bytes) -> bytes:
+    compress, finish = _compressor(encoding)
+    return compress(data) + finish()
+
+
+# 逐块转发流式请求体，encoding 不为 None 时同时压缩，结束时把收发字节数记入 timing
+def _count_chunks(chunks: Any, encoding: Optional[str], timing: Optional[Timing]):
+    compress, finish = _compressor(encoding) if encoding else (None, None)
+    raw = sent = 0
+    for chunk in _iter_chunks(chunks):
+        raw += len(chunk)
+        if compress is not None:
+            chunk = compress(chunk)
+        if chunk:
+            sent += len(chunk)
+            yield chunk
+    if finish is not None:
+        chunk = finish()
+        if chunk:
+            sent += len(chunk)
+            yield chunk
+    if timing is not None:
+        timing.bytes_sent_uncompressed = raw
+        timing.bytes_sent = sent
+
+
+# ---------- 重试、限流与熔断 ----------
+
+# 可以安全重复发送的方法
+_IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+# 可重试、计入熔断的请求异常类型（见 _error_kind）
+_TRANSIENT_ERRORS = frozenset(
+    ("connect_timeout", "read_timeout", "timeout", "connection_error")
+)
+
+# 计入熔断的状态码：网关或服务本身不可用
+_BREAKER_STATUSES = frozenset((502, 503, 504))
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def _url_host(url: str) -> str:
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+# 单个主机的令牌桶和熔断器。熔断器连续失败 threshold 次后打开，
+# 冷却期内直接拒绝请求；冷却期过后放行一个试探请求，成功则关闭，失败则重新打开
+class _HostState:
+    def __init__(self, burst: int):
+        self.lock = threading.Lock()
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.retries = 0
+        self.rejected = 0
+        self.throttled = 0.0
+
+    # 预留一个令牌，不足时预支并按预支的顺序等待，并发请求也不会超过速率
+    def throttle(self, rate: float, burst: int):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(burst, self.tokens + (now - self.updated) * rate) - 1
+            self.updated = now
+            wait = -self.tokens / rate if self.tokens < 0 else 0.0
+            self.throttled += wait
+        if wait:
+            time.sleep(wait)
+
+    def admit(self, cooldown: float) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < cooldown:
+                self.rejected += 1
+                return False
+            self.probing = True
+            return True
+
+    # ok 为 None 表示结果不说明主机是否可用；返回熔断器是否因此打开
+    def record(self, ok: Optional[bool], threshold: int) -> bool:
+        with self.lock:
+            probing, self.probing = self.probing, False
+            if ok is None:
+                return False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return False
+            self.failures += 1
+            if probing or (self.opened_at is None and self.failures >= threshold):
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+# ---------- HTTP 方法 ----------
+
+
+_NOT_JSON = object()
+
+
+# GET 响应体不是 JSON 时返回的说明文字，提取路径时直接报告该原因而不是路径不存在
+class _NotJsonBody(str):
+    @staticmethod
+    def describe(content_type: Optional[str]) -> str:
+        return f"响应不是有效的JSON格式（Content-Type: {content_type or '未声明'}）"
+
+
+def _build_headers(
+    key: Optional[str],
+    headers: Optional[Dict[str, str]],
+    content_type: str = "application/json",
+) -> Dict[str, str]:
+    request_headers = {"Content-Type": content_type}
+    if headers:
+        request_headers.update(headers)
+    if key:
+        request_headers["Authorization"] = f"Bearer {key}"
+    return request_headers
+
+
+def _encode_body(body: Optional[Union[str, Dict[str, Any], list]]) -> Any:
+    if isinstance(body, (dict, list)):
+        return _dumps(body)
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if hasattr(body, "read") or hasattr(body, "__next__"):
+        # 文件对象和生成器逐块发送，字符串块按 UTF-8 编码
+        return _iter_chunks(body)
+    return body
+
+
+# 流式请求体使用自己的 Content-Type，生成器和文件对象按二进制流发送
+def _body_content_type(body: Any) -> str:
+    content_type = getattr(body, "content_type", None)
+    if content_type:
+        return content_type
+    if hasattr(body, "__next__") or hasattr(body, "read"):
+        return "application/octet-stream"
+    return "application/json"
+
+
+def _options_details(headers) -> Dict[str, Optional[str]]:
+    return {
+        "allow": headers.get("Allow"),
+        "access_control_allow_methods": headers.get("Access-Control-Allow-Methods"),
+        "access_control_allow_headers": headers.get("Access-Control-Allow-Headers"),
+        "access_control_max_age": headers.get("Access-Control-Max-Age"),
+    }
+
+
+# 根据状态码、响应内容和 should_fail 生成响应元组，同步和异步接口共用
+def _build_response(
+    method: str,
+    status_code: int,
+    payload: Any,
+    text: Callable[[], str],
+    headers,
+    should_fail: bool,
+    extract: Optional[str],
+) -> Tuple[str, Any, int, Optional[str]]:
+    is_json = payload is not _NOT_JSON
+    if not (200 <= status_code < 300):
+        error_content = payload if is_json else text()
+        return (
+            "✅" if should_fail else "❌",
+            {"error": f"状态码异常: {status_code}", "details": error_content},
+            status_code,
+            extract,
+        )
+
+    if method == "GET":
+        if not is_json:
+            return (
+                ("❌" if not should_fail else "✅"),
+                _NotJsonBody(_NotJsonBody.describe(headers.get("Content-Type"))),
+                status_code,
+                extract,
+            )
+        if should_fail:
+            return (
+                "❌",
+                {"error": "期望失败但成功", "details": payload},
+                status_code,
+                extract,
+            )
+        return "✅", payload, status_code, extract
+
+    if not is_json:
+        if method == "OPTIONS":
+            payload = _options_details(headers)
+        elif should_fail:
+            payload = text()
+        else:
+            payload = {"response": text()}
+    if should_fail:
+        return (
+            "❌",
+            {"error": f"期望失败但成功: {status_code}", "details": payload},
+            status_code,
+            extract,
+        )
+    return "✅", payload, status_code, extract
+
+
+def _exception_response(
+    exc: BaseException, should_fail: bool, extract: Optional[str]
+) -> Tuple[str, Any, int, Optional[str]]:
+    if should_fail:
+        return "✅", {"error": "期望失败且成功", "details": str(exc)}, 999, extract
+    return "❌", {"error": "请求异常", "details": str(exc)}, 999, extract
+
+
+def _request(
+    method: str,
+    url: str,
+    body: Optional[Union[str, Dict[str, Any], list]],
+    key: Optional[str],
+    should_fail: bool,
+    extract: Optional[str],
+    headers: Optional[Dict[str, str]],
+    stream: bool = False,
+    sink: Optional[DownloadSink] = None,
+) -> Tuple[str, Any, int, Optional[str]]:
+    kwargs: Dict[str, Any] = {
+        "headers": _build_headers(key, headers, _body_content_type(body))
+    }
+    if body is not None:
+        kwargs["data"] = _encode_body(body)
+    # 下载到文件的响应不经过录制回放，避免把整个响应体读进内存
+    cache = sink is None
+    return _perform(
+        method,
+        url,
+        should_fail,
+        extract,
+        stream,
+        lambda engine: engine.request(method, url, cache, stream=True, **kwargs),
+        sink,
+    )
+
+
+# 发送请求并把响应转换为响应元组；send 接收当前引擎并返回 requests.Response
+def _perform(
+    method: str,
+    url: str,
+    should_fail: bool,
+    extract: Optional[str],
+    stream: bool,
+    send: Callable[[Engine], requests.Response],
+    sink: Optional[DownloadSink] = None,
+) -> ApiResponse:
+    timing = Timing()
+    _timing_local.current = timing
+    start = time.perf_counter()
+    started_ns = time.perf_counter_ns()
+    if _hooks:
+        _emit("request_start", started_ns, method=method, url=url)
+    try:
+        resp = send(_get_engine())
+        timing.ttfb = time.perf_counter() - start
+        if sink is not None and 200 <= resp.status_code < 300:
+            written, error = sink.write(resp)
+            raw = resp.raw
+            timing.bytes_received_uncompressed = written["bytes"]
+            timing.bytes_received = (
+                raw.tell() if raw is not None else 0
+            ) or written["bytes"]
+            if _hooks:
+                _emit_request_end(method, url, resp.status_code, timing, started_ns)
+            if error:
+                result = (
+                    "✅" if should_fail else "❌",
+                    {"error": error, "details": written},
+                    resp.status_code,
+                    extract,
+                )
+            else:
+                result = _build_response(
+                    method,
+                    resp.status_code,
+                    written,
+                    lambda: "",
+                    resp.headers,
+                    should_fail,
+                    extract,
+                )
+        elif stream and 200 <= resp.status_code < 300 and not should_fail:
+            # 响应体留给 run_test 按提取路径流式解析
+            streamed = StreamedBody(resp, timing, start)
+            result = ("✅", streamed, resp.status_code, extract)
+            if _hooks:
+                _emit_request_end(method, url, resp.status_code, timing, started_ns)
+        else:
+            content = resp.content
+            raw = resp.raw
+            timing.bytes_received = (raw.tell() if raw is not None else 0) or len(
+                content
+            )
+            timing.bytes_received_uncompressed = len(content)
+            if _hooks:
+                _emit_request_end(method, url, resp.status_code, timing, started_ns)
+            parse_ns = time.perf_counter_ns()
+            try:
+                payload = _parse_json_body(content, resp.encoding)
+            except (ValueError, LookupError):
+                payload = _NOT_JSON
+            if _hooks:
+                _emit(
+                    "response_parsed",
+                    method=method,
+                    url=url,
+                    json=payload is not _NOT_JSON,
+                    elapsed_ns=time.perf_counter_ns() - parse_ns,
+                )
+            result = _build_response(
+                method,
+                resp.status_code,
+                payload,
+                lambda: resp.text,
+                resp.headers,
+                should_fail,
+                extract,
+            )
+    except Exception as e:
+        timing.error = _error_kind(e)
+        result = _exception_response(e, should_fail, extract)
+        if _hooks:
+            _emit_request_end(method, url, None, timing, started_ns)
+    finally:
+        _timing_local.current = None
+    timing.total = time.perf_counter() - start
+    return _finish_response(result, method, url, timing)
+
+
+def _finish_response(
+    result: Tuple[str, Any, int, Optional[str]],
+    method: str,
+    url: str,
+    timing: Timing,
+) -> ApiResponse:
+    response = ApiResponse(*result, method=method, url=url, timing=timing)
+    if _load_stats is not None:
+        _load_stats.record_request(response)
+    return response
+
+
+def post(
+    url: str,
+    body: Optional[Union[str, Dict[str, Any], list]] = None,
+    key: Optional[str] = None,
+    should_fail: bool = False,
+    extract: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+    sink: Optional[DownloadSink] = None,
+) -> Tuple[str, Any, int, Optional[str]]:
+    return _request(
+        "POST", url, body, key, should_fail, extract, headers, stream, sink
+    )
+
+
+def delete(
+    url: str,
+    key: Optional[str] = None,
+    should_fail: bool = False,
+    extract: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+    sink: Optional[DownloadSink] = None,
+) -> Tuple[str, Any, int, Optional[str]]:
+    return _request(
+        "DELETE", url, None, key, should_fail, extract, headers, stream, sink
+    )
+
+
+def put(
+    url: str,
+    body: Optional[Union[str, Dict[str, Any], list]] = None,
+    key: Optional[str] = None,
+    should_fail: bool = False,
+    extract: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+    sink: Optional[DownloadSink] = None,
+) -> Tuple[str, Any, int, Optional[str]]:
+    return _request(
+        "PUT", url, body, key, should_fail, extract, headers, stream, sink
+    )
+
+
+def get(
+    url: str,
+    key: Optional[str] = None,
+    should_fail: bool = False,
+    extract: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+    sink: Optional[DownloadSink] = None,
+) -> Tuple[str, Any, int, Optional[str]]:
+    return _request(
+        "GET", url, None, key, should_fail, extract, headers, stream, sink
+    )
+
+
+def patch(
+    url: str,
+    body: Optional[Union[str, Dict[str, Any], list]] = None,
+    key: Optional[str] = None,
+    should_fail: bool = False,
+    extract: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+    sink: Optional[DownloadSink] = None,
+) -> Tuple[str, Any, int, Optional[str]]:
+    return _request(
+        "PATCH", url, body, key, should_fail, extract, headers, stream, sink
+    )
+
+
+def option(
+    url: str,
+    key: Optional[str] = None,
+    should_fail: bool = False,
+    extract: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+    sink: Optional[DownloadSink] = None,
+) -> Tuple[str, Any, int, Optional[str]]:
+    return _request(
+        "OPTIONS", url, None, key, should_fail, extract, headers, stream, sink
+    )
+
+
+# ---------- 请求模板 ----------
+
+
+# 请求模板中的参数占位符，放在请求体骨架里，调用模板时按名字填入
+class Param:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"Param({self.name!r})"
+
+
+_PARAM_MARK = "patparam" + os.urandom(6).hex()
+_URL_MARK_RE = re.compile(_PARAM_MARK + r"(\d+)x")
+_BODY_MARK_RE = re.compile(rb'"' + _PARAM_MARK.encode() + rb'(\d+)"')
 
-    table = Table(
-        show_header=True, header_style="magenta", box=box.ROUNDED, expand=True
-    )
-    table.add_column("Key", style="dim", width=20)
-    table.add_column("Value")
 
-    for k, v in info.items():
-        table.add_row(str(k), str(v))
+# 把骨架中的 Param 换成标记字符串，names 按出现顺序收集参数名
+def _mark_params(node: Any, names: List[str]) -> Any:
+    if isinstance(node, Param):
+        names.append(node.name)
+        return f"{_PARAM_MARK}{len(names) - 1}"
+    if isinstance(node, dict):
+        return {k: _mark_params(v, names) for k, v in node.items()}
+    if isinstance(node, (list, tuple)):
+        return [_mark_params(v, names) for v in node]
+    return node
 
-    console.print(Panel(table, title=title, border_style="green", expand=True))
 
+# 把 URL 中的 {name} 换成标记字符串，names 按出现顺序收集参数名
+def _mark_url(url: str, names: List[str]) -> str:
+    out = []
+    for literal, field, spec, conversion in string.Formatter().parse(url):
+        out.append(literal)
+        if field is None:
+            continue
+        if not field or spec or conversion:
+            raise ValueError(f"URL 模板只支持 {{name}} 形式的占位符: {url}")
+        names.append(field)
+        out.append(f"{_PARAM_MARK}{len(names) - 1}x")
+    return "".join(out)
 
-def show_result(title: str = "测试结果汇总"):
-    if not _test_results:
-        console = Console()
-        console.print("[yellow]没有测试结果可显示[/yellow]")
-        return
 
-    console = Console()
+# 按标记拆分成 [字面量, 参数名, 字面量, ...]，字面量在偶数位
+def _split_marked(text, pattern: re.Pattern, names: List[str]) -> list:
+    parts = pattern.split(text)
+    for i in range(1, len(parts), 2):
+        parts[i] = names[int(parts[i])]
+    return parts
 
-    table = Table(
-        show_header=True, header_style="magenta", box=box.ROUNDED, expand=True
-    )
-    table.add_column("测试描述", style="dim", width=30)
-    table.add_column("结果", width=10)
 
-    success_count = 0
-    fail_count = 0
+# 高频调用的请求：方法、URL、请求头、鉴权和请求体骨架只准备一次，每次调用只填参数
+#
+#   create = RequestTemplate("POST", f"{BASE}/users/{{group}}", {"name": Param("name")}, key=KEY)
+#   run_test("创建用户", create(group="dev", name="张三"), "id")
+class RequestTemplate:
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        body: Optional[Union[str, Dict[str, Any], list]] = None,
+        key: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        should_fail: bool = False,
+        extract: Optional[str] = None,
+        stream: bool = False,
+    ):
+        self.method = method.upper()
+        self.url = url
+        self.should_fail = should_fail
+        self.extract = extract
+        self.stream = stream
+        if hasattr(body, "__next__"):
+            raise ValueError("请求模板的请求体会被重复发送，不能使用生成器")
+        self.headers = _build_headers(key, headers, _body_content_type(body))
 
-    for description, (status, is_success) in _test_results.items():
-        if is_success:
-            table.add_row(description, f"[green]{status} 成功[/green]")
-            success_count += 1
+        url_names: List[str] = []
+        marked_url = _mark_url(url, url_names)
+        probe = requests.PreparedRequest()
+        probe.prepare_url(marked_url, None)
+        self._url_parts = _split_marked(probe.url, _URL_MARK_RE, url_names)
+
+        body_names: List[str] = []
+        if isinstance(body, (dict, list, tuple)):
+            encoded = _dumps(_mark_params(body, body_names))
+            self._body_parts = _split_marked(encoded, _BODY_MARK_RE, body_names)
         else:
-            table.add_row(description, f"[red]{status} 失败[/red]")
-            fail_count += 1
+            encoded = _encode_body(body)
+            self._body_parts = None if encoded is None else [encoded]
+        self.params = frozenset(url_names) | frozenset(body_names)
 
-    table.add_row("", "")
-    table.add_row(
-        "[bold]总计[/bold]",
-        f"[green]成功: {success_count}[/green] | [red]失败: {fail_count}[/red]",
-    )
+        self._session: Optional[requests.Session] = None
+        self._base: Optional[requests.PreparedRequest] = None
+        self._origins: Dict[str, Tuple[Dict[str, Any], Any]] = {}
 
-    console.print(Panel(table, title=title, border_style="cyan", expand=True))
+    def __repr__(self) -> str:
+        return f"RequestTemplate({self.method} {self.url})"
 
-    _test_results.clear()
+    def __call__(self, **params) -> ApiResponse:
+        if params.keys() != self.params:
+            missing = self.params.difference(params)
+            unknown = set(params).difference(self.params)
+            if missing:
+                raise TypeError(f"请求模板缺少参数: {', '.join(sorted(missing))}")
+            if unknown:
+                raise TypeError(f"请求模板没有这些参数: {', '.join(sorted(unknown))}")
+        url = self._fill_url(params)
+        body = self._fill_body(params)
+        return _perform(
+            self.method,
+            url,
+            self.should_fail,
+            self.extract,
+            self.stream,
+            lambda engine: self._send(engine, url, body),
+        )
 
+    def _fill_url(self, params: Dict[str, Any]) -> str:
+        parts = self._url_parts
+        if len(parts) == 1:
+            return parts[0]
+        out = parts[:]
+        for i in range(1, len(out), 2):
+            out[i] = quote(str(params[out[i]]), safe="")
+        return "".join(out)
 
-def clear_test_results():
-    _test_results.clear()
+    def _fill_body(self, params: Dict[str, Any]) -> Any:
+        parts = self._body_parts
+        if parts is None:
+            return None
+        if len(parts) == 1:
+            return parts[0]
+        out = parts[:]
+        for i in range(1, len(out), 2):
+            out[i] = _dumps(params[out[i]])
+        return b"".join(out)
+
+    # 合并会话请求头并预先算好 Content-Length；引擎重建后重新准备
+    def _prepare(self, session: requests.Session) -> requests.PreparedRequest:
+        base = requests.PreparedRequest()
+        base.method = self.method
+        base.headers = requests.sessions.merge_setting(
+            self.headers,
+            session.headers,
+            dict_class=requests.structures.CaseInsensitiveDict,
+        )
+        base.hooks = requests.hooks.default_hooks()
+        base._cookies = None
+        if self._body_parts is None and self.method not in ("GET", "HEAD"):
+            base.headers["Content-Length"] = "0"
+        self._origins = {}
+        self._base = base
+        self._session = session
+        return base
 
+    # 代理、证书和 netrc 鉴权按协议和主机缓存
+    def _origin(
+        self, session: requests.Session, url: str
+    ) -> Tuple[Dict[str, Any], Any]:
+        origin = url.split("/", 3)[2]
+        cached = self._origins.get(origin)
+        if cached is None:
+            settings = session.merge_environment_settings(url, {}, None, None, None)
+            settings.pop("stream", None)
+            auth = session.auth
+            if auth is None and session.trust_env:
+                auth = requests.utils.get_netrc_auth(url)
+            cached = self._origins[origin] = (settings, auth)
+        return cached
 
-def _deep_get(obj: Any, path: str) -> Any:
-    keys = path.split(".")
-    cur = obj
-    for k in keys:
-        if isinstance(cur, dict):
-            cur = cur.get(k)
-        elif isinstance(cur, list) and k.isdigit():
-            cur = cur[int(k)]
+    def _send(
+        self, engine: Engine, url: str, body: Any
+    ) -> requests.Response:
+        session = engine.session
+        base = self._base
+        if base is None or self._session is not session:
+            base = self._prepare(session)
+        settings, auth = self._origin(session, url)
+        prepared = base.copy()
+        prepared.url = url
+        if body is not None:
+            prepared.body = body
+            length = _body_length(body)
+            if length is None:
+                prepared.headers["Transfer-Encoding"] = "chunked"
+            else:
+                prepared.headers["Content-Length"] = str(length)
+        if session.cookies:
+            prepared.prepare_cookies(session.cookies)
+        if auth is not None:
+            prepared.prepare_auth(auth, url)
+        return engine.send(prepared, self.headers, stream=True, **settings)
+
+
+# ---------- 异步接口 ----------
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError as e:
+        raise ImportError(
+            "异步接口需要 aiohttp，请先安装: uv add aiohttp 或 pip install aiohttp"
+        ) from e
+    return aiohttp
+
+
+async def _trace_connect_start(session, ctx, params):
+    ctx.connect_start = time.perf_counter()
+
+
+async def _trace_connect_end(session, ctx, params):
+    timing = ctx.trace_request_ctx
+    if isinstance(timing, Timing):
+        elapsed = time.perf_counter() - ctx.connect_start
+        timing.connect = (timing.connect or 0.0) + elapsed
+
+
+# 异步请求引擎：单个事件循环上的 aiohttp 会话，用信号量限制同时在途的请求数
+class AsyncEngine:
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        timeout: Union[float, Tuple[float, float]] = 10,
+        headers: Optional[Dict[str, str]] = None,
+        cassette: Optional[Cassette] = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.cassette = cassette
+        self._session = None
+        self._semaphore: Optional["asyncio.Semaphore"] = None
+        # 会话和信号量只能在打开它们的事件循环上使用
+        self.loop: Optional["asyncio.AbstractEventLoop"] = None
+        self._closer: Optional["asyncio.Task"] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None
+
+    async def open(self) -> "AsyncEngine":
+        if self._session is not None:
+            return self
+        import asyncio
+
+        aiohttp = _import_aiohttp()
+        self.loop = asyncio.get_running_loop()
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+            timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
         else:
-            return None
-        if cur is None:
-            break
-    return cur
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(
+            limit=self.limit, limit_per_host=self.limit_per_host
+        )
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_start.append(_trace_connect_start)
+        trace.on_connection_create_end.append(_trace_connect_end)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers=self.headers,
+            trace_configs=[trace],
+        )
+        self._semaphore = asyncio.Semaphore(self.limit)
+        # asyncio.run 结束时会取消所有未完成的任务，借此在循环关闭前关闭会话
+        self._closer = self.loop.create_task(_close_on_loop_exit(self))
+        return self
 
+    async def close(self):
+        import asyncio
 
-def run_test(
-    description: str, response: Tuple[str, Any, int, Optional[str]], *extract_paths: str
-) -> Any:
-    console = Console()
-    status, content, status_code, _ = response
-    color = _get_status_color(status_code)
+        session, self._session = self._session, None
+        closer, self._closer = self._closer, None
+        if closer is not None and closer is not asyncio.current_task():
+            closer.cancel()
+        if session is not None:
+            await session.close()
 
-    title = (
-        f"""{description}: {status} [bold {color}]HTTP {status_code}[/bold {color}]"""
-    )
+    # 同样配置、尚未打开的新引擎，用于在另一个事件循环上继续发请求
+    def _copy(self) -> "AsyncEngine":
+        return AsyncEngine(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            timeout=self.timeout,
+            headers=self.headers,
+            cassette=self.cassette,
+        )
+
+    # 在打开引擎的事件循环之外关闭它：循环仍在运行时交给它关闭；
+    # 循环已结束时无法再 await，只断开会话，连接随对象回收释放
+    def _abandon(self):
+        session, self._session = self._session, None
+        loop = self.loop
+        if session is None or loop is None:
+            return
+        if loop.is_running() and not loop.is_closed():
+            import asyncio
+
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        session.detach()
 
-    display_content = content
-    if not extract_paths and isinstance(content, dict) and "buckets" in content:
-        display_content = content["buckets"]
+    async def request(
+        self,
+        method: str,
+        url: str,
+        should_fail: bool,
+        extract: Optional[str],
+        timing: Timing,
+        started_ns: Optional[int] = None,
+        **kwargs,
+    ) -> Tuple[str, Any, int, Optional[str]]:
+        if self._session is None:
+            await self.open()
+        if started_ns is None:
+            started_ns = time.perf_counter_ns()
+        cassette = self.cassette
+        key = None
+        if (
+            cassette is not None
+            and cassette.mode == "replay_only"
+            and not _cacheable_body(kwargs.get("data"))
+        ):
+            raise CassetteMissError(f"回放缓存不支持流式请求体: {method} {url}")
+        if (
+            cassette is not None
+            and cassette.mode != "passthrough"
+            and _cacheable_body(kwargs.get("data"))
+        ):
+            headers = {**self.headers, **(kwargs.get("headers") or {})}
+            key = cassette.key(method, url, headers, kwargs.get("data"))
+            start = time.perf_counter()
+            hit = cassette.load(key)
+            if hit is not None:
+                status, headers, raw = hit
+                timing.ttfb = time.perf_counter() - start
+                timing.bytes_received = len(raw)
+                timing.bytes_received_uncompressed = len(raw)
+                encoding = (
+                    requests.utils.get_encoding_from_headers(
+                        requests.structures.CaseInsensitiveDict(headers)
+                    )
+                    or "utf-8"
+                )
+                return _parse_async_body(
+                    method, url, status, raw, encoding, headers, should_fail, extract,
+                    timing, started_ns,
+                )
+            if cassette.mode == "replay_only":
+                raise CassetteMissError(f"回放缓存中没有该请求: {method} {url}")
+        async with self._semaphore:
+            start = time.perf_counter()
+            async with self._session.request(
+                method, url, trace_request_ctx=timing, **kwargs
+            ) as resp:
+                timing.ttfb = time.perf_counter() - start
+                raw = await resp.read()
+                timing.bytes_received = resp.content.total_bytes or len(raw)
+                timing.bytes_received_uncompressed = len(raw)
+                if key is not None:
+                    cassette.save(key, method, url, resp.status, resp.headers, raw)
+                return _parse_async_body(
+                    method,
+                    url,
+                    resp.status,
+                    raw,
+                    resp.get_encoding(),
+                    resp.headers,
+                    should_fail,
+                    extract,
+                    timing,
+                    started_ns,
+                )
 
-    if isinstance(display_content, (dict, list)):
-        json_str = json.dumps(display_content, indent=4, ensure_ascii=False)
-        body = Syntax(
-            json_str,
-            "json",
-            theme="dracula",
-            line_numbers=True,
-            background_color="default",
+    async def __aenter__(self) -> "AsyncEngine":
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+# 与同步接口触发同样的 request_end 和 response_parsed 事件
+def _parse_async_body(
+    method: str,
+    url: str,
+    status: int,
+    raw: bytes,
+    encoding: str,
+    headers: Any,
+    should_fail: bool,
+    extract: Optional[str],
+    timing: Timing,
+    started_ns: int,
+) -> Tuple[str, Any, int, Optional[str]]:
+    if _hooks:
+        _emit_request_end(method, url, status, timing, started_ns)
+    parse_ns = time.perf_counter_ns()
+    try:
+        payload = _parse_json_body(raw, encoding)
+    except (ValueError, LookupError):
+        payload = _NOT_JSON
+    if _hooks:
+        _emit(
+            "response_parsed",
+            method=method,
+            url=url,
+            json=payload is not _NOT_JSON,
+            elapsed_ns=time.perf_counter_ns() - parse_ns,
         )
+    return _build_response(
+        method,
+        status,
+        payload,
+        lambda: raw.decode(encoding, errors="replace"),
+        headers,
+        should_fail,
+        extract,
+    )
+
+
+# 当前生效的异步请求引擎，首次异步请求时在当前事件循环上创建
+_async_engine: Optional[AsyncEngine] = None
+
+
+async def open_async_engine(**config) -> AsyncEngine:
+    global _async_engine
+    if _async_engine is not None:
+        await _close_async(_async_engine)
+    _async_engine = await AsyncEngine(**config).open()
+    return _async_engine
+
+
+async def _close_async(engine: AsyncEngine):
+    import asyncio
+
+    if engine.loop is None or engine.loop is asyncio.get_running_loop():
+        await engine.close()
     else:
-        body = str(display_content)
+        engine._abandon()
 
-    console.print(Panel(body, title=title, border_style="blue", expand=True))
-    console.print()
 
-    is_success = status == "✅"
-    _test_results[description] = (status, is_success)
+# 返回当前事件循环上的异步请求引擎；不经过 run_async 直接调用 aget 等函数、
+# 之后又在新的事件循环中调用时，关闭旧循环上的引擎并按同样的配置新建
+async def _current_async_engine() -> AsyncEngine:
+    global _async_engine
+    import asyncio
 
-    if not extract_paths:
-        return None
-    if len(extract_paths) == 1:
-        value = _deep_get(content, extract_paths[0])
-        if value is None:
-            console.print(
-                f"[bold red]Warning:[/bold red] Could not extract '{extract_paths[0]}' from response."
-            )
-        return value
-    values = []
-    for path in extract_paths:
-        v = _deep_get(content, path)
-        if v is None:
-            console.print(
-                f"[bold red]Warning:[/bold red] Could not extract '{path}' from response."
-            )
-        values.append(v)
-    return tuple(values)
+    loop = asyncio.get_running_loop()
+    engine = _async_engine
+    if engine is not None and engine.loop is not None and engine.loop is not loop:
+        engine._abandon()
+        engine = _async_engine = engine._copy()
+    elif engine is None:
+        engine = _async_engine = AsyncEngine()
+    return engine
 
 
-def post(
+async def _close_on_loop_exit(engine: AsyncEngine):
+    import asyncio
+
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await engine.close()
+
+
+async def close_async_engine():
+    global _async_engine
+    engine, _async_engine = _async_engine, None
+    if engine is not None:
+        await _close_async(engine)
+
+
+def run_async(main, **config) -> Any:
+    import asyncio
+
+    async def _runner():
+        await open_async_engine(**config)
+        try:
+            return await main
+        finally:
+            await close_async_engine()
+
+    return asyncio.run(_runner())
+
+
+async def _arequest(
+    method: str,
+    url: str,
+    body: Optional[Union[str, Dict[str, Any], list]],
+    key: Optional[str],
+    should_fail: bool,
+    extract: Optional[str],
+    headers: Optional[Dict[str, str]],
+) -> Tuple[str, Any, int, Optional[str]]:
+    kwargs: Dict[str, Any] = {"headers": _build_headers(key, headers)}
+    if body is not None:
+        kwargs["data"] = _encode_body(body)
+    timing = Timing()
+    start = time.perf_counter()
+    started_ns = time.perf_counter_ns()
+    if _hooks:
+        _emit("request_start", started_ns, method=method, url=url)
+    try:
+        engine = await _current_async_engine()
+        result = await engine.request(
+            method, url, should_fail, extract, timing, started_ns, **kwargs
+        )
+    except ImportError:
+        raise
+    except Exception as e:
+        timing.error = _error_kind(e)
+        result = _exception_response(e, should_fail, extract)
+        if _hooks:
+            _emit_request_end(method, url, None, timing, started_ns)
+    timing.total = time.perf_counter() - start
+    return _finish_response(result, method, url, timing)
+
+
+async def apost(
     url: str,
     body: Optional[Union[str, Dict[str, Any], list]] = None,
     key: Optional[str] = None,
@@ -152,124 +5484,20 @@ def post(
     extract: Optional[str] = None,
     headers: Optional[Dict[str, str]] = None,
 ) -> Tuple[str, Any, int, Optional[str]]:
-    request_headers = {"Content-Type": "application/json"}
-    if headers:
-        request_headers.update(headers)
-    if key:
-        request_headers["Authorization"] = f"Bearer {key}"
-    kwargs = {"headers": request_headers, "timeout": 10}
-    if body is not None:
-        if isinstance(body, (dict, list)):
-            kwargs["data"] = json.dumps(body, ensure_ascii=False)
-        else:
-            kwargs["data"] = body
-    try:
-        resp = requests.post(url, **kwargs)
-        status_code = resp.status_code
-        if 200 <= status_code < 300:
-            if should_fail:
-                try:
-                    details = resp.json()
-                except ValueError:
-                    details = resp.text
-                return (
-                    "❌",
-                    {"error": f"期望失败但成功: {status_code}", "details": details},
-                    status_code,
-                    extract,
-                )
-            else:
-                try:
-                    return "✅", resp.json(), status_code, extract
-                except ValueError:
-                    return "✅", {"response": resp.text}, status_code, extract
-        else:
-            try:
-                error_content = resp.json()
-            except ValueError:
-                error_content = resp.text
-
-            if should_fail:
-                return (
-                    "✅",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-            else:
-                return (
-                    "❌",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-    except Exception as e:
-        if should_fail:
-            return "✅", {"error": "期望失败且成功", "details": str(e)}, 999, extract
-        else:
-            return "❌", {"error": "请求异常", "details": str(e)}, 999, extract
+    return await _arequest("POST", url, body, key, should_fail, extract, headers)
 
 
-def delete(
+async def adelete(
     url: str,
     key: Optional[str] = None,
     should_fail: bool = False,
     extract: Optional[str] = None,
     headers: Optional[Dict[str, str]] = None,
 ) -> Tuple[str, Any, int, Optional[str]]:
-    request_headers = {"Content-Type": "application/json"}
-    if headers:
-        request_headers.update(headers)
-    if key:
-        request_headers["Authorization"] = f"Bearer {key}"
-    try:
-        resp = requests.delete(url, headers=request_headers, timeout=10)
-        status_code = resp.status_code
-        if 200 <= status_code < 300:
-            if should_fail:
-                try:
-                    details = resp.json()
-                except ValueError:
-                    details = resp.text
-                return (
-                    "❌",
-                    {"error": f"期望失败但成功: {status_code}", "details": details},
-                    status_code,
-                    extract,
-                )
-            else:
-                try:
-                    return "✅", resp.json(), status_code, extract
-                except ValueError:
-                    return "✅", {"response": resp.text}, status_code, extract
-        else:
-            try:
-                error_content = resp.json()
-            except ValueError:
-                error_content = resp.text
-
-            if should_fail:
-                return (
-                    "✅",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-            else:
-                return (
-                    "❌",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-    except Exception as e:
-        if should_fail:
-            return "✅", {"error": "期望失败且成功", "details": str(e)}, 999, extract
-        else:
-            return "❌", {"error": "请求异常", "details": str(e)}, 999, extract
+    return await _arequest("DELETE", url, None, key, should_fail, extract, headers)
 
 
-def put(
+async def aput(
     url: str,
     body: Optional[Union[str, Dict[str, Any], list]] = None,
     key: Optional[str] = None,
@@ -277,126 +5505,20 @@ def put(
     extract: Optional[str] = None,
     headers: Optional[Dict[str, str]] = None,
 ) -> Tuple[str, Any, int, Optional[str]]:
-    request_headers = {"Content-Type": "application/json"}
-    if headers:
-        request_headers.update(headers)
-    if key:
-        request_headers["Authorization"] = f"Bearer {key}"
-    kwargs = {"headers": request_headers, "timeout": 10}
-    if body is not None:
-        if isinstance(body, (dict, list)):
-            kwargs["data"] = json.dumps(body, ensure_ascii=False)
-        else:
-            kwargs["data"] = body
-    try:
-        resp = requests.put(url, **kwargs)
-        status_code = resp.status_code
-        if 200 <= status_code < 300:
-            if should_fail:
-                try:
-                    details = resp.json()
-                except ValueError:
-                    details = resp.text
-                return (
-                    "❌",
-                    {"error": f"期望失败但成功: {status_code}", "details": details},
-                    status_code,
-                    extract,
-                )
-            else:
-                try:
-                    return "✅", resp.json(), status_code, extract
-                except ValueError:
-                    return "✅", {"response": resp.text}, status_code, extract
-        else:
-            try:
-                error_content = resp.json()
-            except ValueError:
-                error_content = resp.text
-
-            if should_fail:
-                return (
-                    "✅",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-            else:
-                return (
-                    "❌",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-    except Exception as e:
-        if should_fail:
-            return "✅", {"error": "期望失败且成功", "details": str(e)}, 999, extract
-        else:
-            return "❌", {"error": "请求异常", "details": str(e)}, 999, extract
+    return await _arequest("PUT", url, body, key, should_fail, extract, headers)
 
 
-def get(
+async def aget(
     url: str,
     key: Optional[str] = None,
     should_fail: bool = False,
     extract: Optional[str] = None,
     headers: Optional[Dict[str, str]] = None,
 ) -> Tuple[str, Any, int, Optional[str]]:
-    request_headers = {"Content-Type": "application/json"}
-    if headers:
-        request_headers.update(headers)
-    if key:
-        request_headers["Authorization"] = f"Bearer {key}"
-    try:
-        resp = requests.get(url, headers=request_headers, timeout=10)
-        status_code = resp.status_code
-        if not (200 <= status_code < 300):
-            try:
-                error_content = resp.json()
-            except ValueError:
-                error_content = resp.text
-
-            if should_fail:
-                return (
-                    "✅",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-            else:
-                return (
-                    "❌",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-        try:
-            json_data = resp.json()
-        except ValueError:
-            return (
-                ("❌" if not should_fail else "✅"),
-                "响应不是有效的JSON格式",
-                status_code,
-                extract,
-            )
-
-        if should_fail:
-            return (
-                "❌",
-                {"error": "期望失败但成功", "details": json_data},
-                status_code,
-                extract,
-            )
-        else:
-            return "✅", json_data, status_code, extract
-    except Exception as e:
-        if should_fail:
-            return "✅", {"error": "期望失败且成功", "details": str(e)}, 999, extract
-        else:
-            return "❌", {"error": "请求异常", "details": str(e)}, 999, extract
+    return await _arequest("GET", url, None, key, should_fail, extract, headers)
 
 
-def patch(
+async def apatch(
     url: str,
     body: Optional[Union[str, Dict[str, Any], list]] = None,
     key: Optional[str] = None,
@@ -404,143 +5526,28 @@ def patch(
     extract: Optional[str] = None,
     headers: Optional[Dict[str, str]] = None,
 ) -> Tuple[str, Any, int, Optional[str]]:
-    request_headers = {"Content-Type": "application/json"}
-    if headers:
-        request_headers.update(headers)
-    if key:
-        request_headers["Authorization"] = f"Bearer {key}"
-
-    kwargs = {"headers": request_headers, "timeout": 10}
-    if body is not None:
-        if isinstance(body, (dict, list)):
-            kwargs["data"] = json.dumps(body, ensure_ascii=False)
-        else:
-            kwargs["data"] = body
-    try:
-        resp = requests.patch(url, **kwargs)
-        status_code = resp.status_code
-
-        if 200 <= status_code < 300:
-            if should_fail:
-                try:
-                    details = resp.json()
-                except ValueError:
-                    details = resp.text
-                return (
-                    "❌",
-                    {"error": f"期望失败但成功: {status_code}", "details": details},
-                    status_code,
-                    extract,
-                )
-            try:
-                return "✅", resp.json(), status_code, extract
-            except ValueError:
-                return "✅", {"response": resp.text}, status_code, extract
-        else:
-            try:
-                error_content = resp.json()
-            except ValueError:
-                error_content = resp.text
-
-            if should_fail:
-                return (
-                    "✅",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-            return (
-                "❌",
-                {"error": f"状态码异常: {status_code}", "details": error_content},
-                status_code,
-                extract,
-            )
-
-    except Exception as e:
-        if should_fail:
-            return "✅", {"error": "期望失败且成功", "details": str(e)}, 999, extract
-        else:
-            return "❌", {"error": "请求异常", "details": str(e)}, 999, extract
+    return await _arequest("PATCH", url, body, key, should_fail, extract, headers)
 
 
-def option(
+async def aoption(
     url: str,
     key: Optional[str] = None,
     should_fail: bool = False,
     extract: Optional[str] = None,
     headers: Optional[Dict[str, str]] = None,
 ) -> Tuple[str, Any, int, Optional[str]]:
-    request_headers = {"Content-Type": "application/json"}
-    if headers:
-        request_headers.update(headers)
-    if key:
-        request_headers["Authorization"] = f"Bearer {key}"
-
-    try:
-        resp = requests.options(url, headers=request_headers, timeout=10)
-        status_code = resp.status_code
-
-        if 200 <= status_code < 300:
-            if should_fail:
-                try:
-                    details = resp.json()
-                except ValueError:
-                    details = {
-                        "allow": resp.headers.get("Allow"),
-                        "access_control_allow_methods": resp.headers.get(
-                            "Access-Control-Allow-Methods"
-                        ),
-                        "access_control_allow_headers": resp.headers.get(
-                            "Access-Control-Allow-Headers"
-                        ),
-                        "access_control_max_age": resp.headers.get(
-                            "Access-Control-Max-Age"
-                        ),
-                    }
-                return (
-                    "❌",
-                    {"error": f"期望失败但成功: {status_code}", "details": details},
-                    status_code,
-                    extract,
-                )
-            try:
-                json_data = resp.json()
-            except ValueError:
-                json_data = {
-                    "allow": resp.headers.get("Allow"),
-                    "access_control_allow_methods": resp.headers.get(
-                        "Access-Control-Allow-Methods"
-                    ),
-                    "access_control_allow_headers": resp.headers.get(
-                        "Access-Control-Allow-Headers"
-                    ),
-                    "access_control_max_age": resp.headers.get(
-                        "Access-Control-Max-Age"
-                    ),
-                }
-            return "✅", json_data, status_code, extract
-        else:
-            try:
-                error_content = resp.json()
-            except ValueError:
-                error_content = resp.text
+    return await _arequest("OPTIONS", url, None, key, should_fail, extract, headers)
 
-            if should_fail:
-                return (
-                    "✅",
-                    {"error": f"状态码异常: {status_code}", "details": error_content},
-                    status_code,
-                    extract,
-                )
-            return (
-                "❌",
-                {"error": f"状态码异常: {status_code}", "details": error_content},
-                status_code,
-                extract,
-            )
 
-    except Exception as e:
-        if should_fail:
-            return "✅", {"error": "期望失败且成功", "details": str(e)}, 999, extract
-        else:
-            return "❌", {"error": "请求异常", "details": str(e)}, 999, extract
+async def arun_test(
+    description: str,
+    response,
+    *extract_paths: str,
+    max_time: Optional[float] = None,
+    max_p95: Optional[float] = None,
+) -> Any:
+    if inspect.isawaitable(response):
+        response = await response
+    return run_test(
+        description, response, *extract_paths, max_time=max_time, max_p95=max_p95
+    )
@@ -0,0 +1,293 @@
+# 单请求开销基准：在进程内启动本地 HTTP 服务，对比直接使用 requests 与 PAT 各层的吞吐量和内存
+#
+#   python benchmarks/overhead.py                                   # 默认 100B ~ 50MB
+#   python benchmarks/overhead.py --sizes 100B,1MB --latency-ms 5
+#   python benchmarks/overhead.py --save baseline.json              # 保存基线
+#   python benchmarks/overhead.py --baseline baseline.json --threshold 0.2
+#
+# 每个场景的开销以「单次耗时 / 直接使用 requests 的单次耗时」表示；
+# 指定基线时，任一场景的开销比基线高出 threshold 以上即以非零状态退出。
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+import PAT  # noqa: E402
+
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024 * 1024}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for unit in ("KB", "MB", "B"):
+        if text.endswith(unit):
+            return int(float(text[: -len(unit)]) * _UNITS[unit])
+    return int(text)
+
+
+# 按终端显示宽度补齐，中文字符占两列
+def pad(text: str, width: int) -> str:
+    shown = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    return text + " " * max(width - shown, 0)
+
+
+def format_size(size: int) -> str:
+    for unit in ("MB", "KB"):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+# 生成约 size 字节的 JSON 列表，结构接近常见的列表接口
+def make_payload(size: int) -> bytes:
+    def item(i: int) -> dict:
+        return {
+            "id": i,
+            "name": f"item-{i:06d}",
+            "active": i % 2 == 0,
+            "tags": ["a", "b"],
+            "score": round(i / 7, 3),
+        }
+
+    count = max(1, size // (len(json.dumps(item(0))) + 2))
+    return json.dumps([item(i) for i in range(count)]).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    payloads: dict = {}
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, data: bytes):
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        size = int(query.get("size", ["100"])[0])
+        payload = self.payloads.get(size)
+        if payload is None:
+            payload = self.payloads.setdefault(size, make_payload(size))
+        self._reply(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self._reply(b'{"ok": true}')
+
+
+def start_server(latency: float):
+    _Handler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# 每个场景是一个无参数函数，执行一次完整的请求
+def scenarios(base: str, size: int):
+    url = f"{base}/payload?size={size}"
+    post_url = f"{base}/echo"
+    body = json.loads(make_payload(min(size, 1024 * 1024)))
+    session = requests.Session()
+
+    def raw_get():
+        session.get(url).json()
+
+    def raw_post():
+        session.post(
+            post_url,
+            data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        ).json()
+
+    def pat_get():
+        PAT.get(url)
+
+    def pat_post():
+        PAT.post(post_url, body)
+
+    get_template = PAT.RequestTemplate("GET", url)
+    post_template = PAT.RequestTemplate("POST", post_url, body)
+
+    def pat_template_get():
+        get_template()
+
+    def pat_template_post():
+        post_template()
+
+    def pat_run_test():
+        PAT.run_test("bench", PAT.get(url), "0.id")
+
+    return [
+        ("requests GET", raw_get, None, "silent", False),
+        ("PAT get", pat_get, "requests GET", "silent", False),
+        ("PAT 请求模板 GET", pat_template_get, "requests GET", "silent", False),
+        ("PAT get + run_test (不渲染)", pat_run_test, "requests GET", "silent", False),
+        ("PAT get + run_test (rich)", pat_run_test, "requests GET", "full", False),
+        ("PAT get + run_test (纯文本)", pat_run_test, "requests GET", "full", True),
+        ("requests POST", raw_post, None, "silent", False),
+        ("PAT post", pat_post, "requests POST", "silent", False),
+        ("PAT 请求模板 POST", pat_template_post, "requests POST", "silent", False),
+    ]
+
+
+@contextlib.contextmanager
+def output_mode(verbosity: str, headless: bool):
+    old = (PAT.get_verbosity(), PAT.is_headless())
+    PAT.set_verbosity(verbosity)
+    PAT.set_headless(headless)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) as sink:
+            # rich 控制台按需取 sys.stdout，渲染结果丢进内存后立即清空
+            yield sink
+    finally:
+        PAT.set_verbosity(old[0])
+        PAT.set_headless(old[1])
+        PAT.clear_test_results()
+
+
+def measure(fn, seconds: float, min_runs: int, sink: io.StringIO) -> float:
+    fn()  # 预热：建立连接、编译提取路径
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        sink.seek(0)
+        sink.truncate()
+        elapsed = time.perf_counter() - start
+        if runs >= min_runs and elapsed >= seconds:
+            return elapsed / runs
+
+
+def peak_memory(fn, runs: int, sink: io.StringIO) -> int:
+    tracemalloc.start()
+    try:
+        for _ in range(runs):
+            fn()
+            sink.seek(0)
+            sink.truncate()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, seconds: float, min_runs: int, latency: float) -> dict:
+    server, base = start_server(latency)
+    results = {}
+    try:
+        for size in sizes:
+            label = format_size(size)
+            rows = {}
+            for name, fn, reference, verbosity, headless in scenarios(base, size):
+                with output_mode(verbosity, headless) as sink:
+                    per_op = measure(fn, seconds, min_runs, sink)
+                    peak = peak_memory(fn, 1 if size >= 1024 * 1024 else 5, sink)
+                rows[name] = {
+                    "ms": per_op * 1000,
+                    "ops": 1 / per_op,
+                    "peak_mb": peak / 1024 / 1024,
+                    "ratio": (
+                        per_op * 1000 / rows[reference]["ms"] if reference else 1.0
+                    ),
+                }
+            results[label] = rows
+    finally:
+        server.shutdown()
+        server.server_close()
+        PAT.close_engine(show=False)
+    return results
+
+
+def report(results: dict):
+    print(
+        f"{pad('大小', 8)}{pad('场景', 30)}{'ops/s':>10}{'ms/op':>10}"
+        f"{'开销':>6}{'峰值MB':>8}"
+    )
+    for label, rows in results.items():
+        for name, row in rows.items():
+            print(
+                f"{pad(label, 8)}{pad(name, 30)}{row['ops']:>10.1f}{row['ms']:>10.3f}"
+                f"{row['ratio']:>7.2f}x{row['peak_mb']:>10.2f}"
+            )
+        print()
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    failures = []
+    for label, rows in results.items():
+        for name, row in rows.items():
+            old = baseline.get(label, {}).get(name)
+            if old is None or old["ratio"] == 1.0:
+                continue
+            limit = old["ratio"] * (1 + threshold)
+            if row["ratio"] > limit:
+                failures.append(
+                    f"{label} {name}: 开销 {row['ratio']:.2f}x"
+                    f" 超过基线 {old['ratio']:.2f}x 的 {threshold:.0%} 容差"
+                )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="PAT 单请求开销基准")
+    parser.add_argument(
+        "--sizes", default="100B,10KB,1MB,50MB", help="逗号分隔的响应体大小"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="服务端每个请求的附加延迟"
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=1.0, help="每个场景至少运行的时间"
+    )
+    parser.add_argument(
+        "--min-runs", type=int, default=3, help="每个场景至少运行的次数"
+    )
+    parser.add_argument("--save", help="把结果保存为基线 JSON 文件")
+    parser.add_argument("--baseline", help="与之比较的基线 JSON 文件")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="允许的开销增长比例"
+    )
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    results = run(sizes, args.seconds, args.min_runs, args.latency_ms / 1000)
+    report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare(results, json.load(f), args.threshold)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
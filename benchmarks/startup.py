@@ -0,0 +1,98 @@
+# 启动耗时基准：在全新的解释器中反复导入 PAT，检查导入耗时是否超出预算
+#
+#   python benchmarks/startup.py                 # 默认预算
+#   python benchmarks/startup.py --budget-ms 150 --runs 20
+#
+# 超出预算或无界面模式下导入了 rich 时以非零状态退出，可直接放进 CI。
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "rich": any(m == "rich" or m.startswith(("rich.", "pygments")) for m in sys.modules),
+}}))
+"""
+
+
+def measure(module: str, runs: int, headless: bool) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("PAT_HEADLESS", None)
+    if headless:
+        env["PAT_HEADLESS"] = "1"
+    samples = []
+    loaded_rich = False
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            env=env,
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout)
+        samples.append(result["ms"])
+        loaded_rich = loaded_rich or result["rich"]
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "rich": loaded_rich,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="PAT 导入耗时基准")
+    parser.add_argument("--runs", type=int, default=10, help="每项测量的次数")
+    parser.add_argument(
+        "--budget-ms", type=float, default=200.0, help="import PAT 的中位耗时上限"
+    )
+    parser.add_argument(
+        "--overhead-ms",
+        type=float,
+        default=40.0,
+        help="import PAT 相对 import requests 的额外耗时上限",
+    )
+    args = parser.parse_args()
+
+    baseline = measure("requests", args.runs, headless=False)
+    pat = measure("PAT", args.runs, headless=False)
+    headless = measure("PAT", args.runs, headless=True)
+    overhead = pat["median"] - baseline["median"]
+
+    print(f"{'导入':<24}{'中位':>10}{'最小':>10}{'最大':>10}  (ms, {args.runs} 次)")
+    for name, result in (
+        ("import requests", baseline),
+        ("import PAT", pat),
+        ("import PAT (headless)", headless),
+    ):
+        print(
+            f"{name:<24}{result['median']:>10.1f}{result['min']:>10.1f}{result['max']:>10.1f}"
+        )
+    print(f"PAT 额外耗时: {overhead:.1f} ms")
+
+    failures = []
+    if pat["median"] > args.budget_ms:
+        failures.append(f"import PAT 中位耗时 {pat['median']:.1f} ms 超出预算 {args.budget_ms:.1f} ms")
+    if overhead > args.overhead_ms:
+        failures.append(f"PAT 额外耗时 {overhead:.1f} ms 超出预算 {args.overhead_ms:.1f} ms")
+    if pat["rich"] or headless["rich"]:
+        failures.append("导入 PAT 时加载了 rich/Pygments，应推迟到第一次渲染")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
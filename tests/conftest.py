@@ -0,0 +1,93 @@
+# 测试共用的本地 HTTP 服务：每个测试注册自己的路由，响应由路由函数决定
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PAT  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        server = self.server
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        else:
+            body = self.rfile.read(length)
+        with server.lock:
+            server.hits[path] = server.hits.get(path, 0) + 1
+            server.bodies.setdefault(path, []).append(body)
+        route = server.routes.get((self.command, path))
+        if route is None:
+            status, headers, data = 404, {}, b'{"error": "not found"}'
+        else:
+            status, headers, data = route(self, body)
+        if isinstance(data, (dict, list)):
+            data = PAT._dumps(data)
+        self.send_response(status)
+        headers = {"Content-Type": "application/json", **headers}
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _handle
+
+
+class LocalServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.hits = {}
+        self.bodies = {}
+        self.base = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def route(self, method, path, handler):
+        self.routes[(method, path)] = handler
+        return self.base + path
+
+    def json(self, method, path, payload, status=200):
+        return self.route(method, path, lambda req, body: (status, {}, payload))
+
+
+@pytest.fixture
+def server():
+    srv = LocalServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    PAT.set_verbosity("silent")
+    yield
+    PAT.close_engine(show=False)
+    PAT.clear_test_results()
+    PAT.set_verbosity("full")
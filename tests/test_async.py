@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+import PAT
+
+pytest.importorskip("aiohttp")
+
+
+def test_bare_verbs_survive_a_new_event_loop(server):
+    url = server.json("GET", "/item", {"id": 1})
+
+    for _ in range(3):
+        status, content, status_code, _ = asyncio.run(PAT.aget(url))
+        assert (status, content, status_code) == ("✅", {"id": 1}, 200)
+    assert server.hits["/item"] == 3
+
+
+def test_engine_keeps_its_config_on_a_new_loop(server):
+    url = server.json("GET", "/item", {"id": 1})
+
+    async def first():
+        await PAT.open_async_engine(limit=3, headers={"X-Test": "1"})
+        return await PAT.aget(url)
+
+    asyncio.run(first())
+    assert asyncio.run(PAT.aget(url))[2] == 200
+    assert PAT._async_engine.limit == 3
+    asyncio.run(PAT.close_async_engine())
+
+
+def test_run_async_after_bare_call(server):
+    url = server.json("GET", "/item", {"id": 1})
+    asyncio.run(PAT.aget(url))
+
+    async def main():
+        return await PAT.aget(url)
+
+    assert PAT.run_async(main())[2] == 200
+    assert PAT._async_engine is None
+
+
+def test_arun_test_applies_time_budget(server):
+    def slow(req, body):
+        import time
+
+        time.sleep(0.05)
+        return 200, {}, {"id": 1}
+
+    url = server.route("GET", "/slow", slow)
+
+    async def main():
+        await PAT.arun_test("宽松预算", PAT.aget(url), max_time=5)
+        await PAT.arun_test("超出预算", PAT.aget(url), max_time=0.001)
+
+    PAT.run_async(main())
+    aggregates = dict(PAT._test_results.aggregates())
+    assert aggregates["宽松预算"].failures == 0
+    assert aggregates["超出预算"].failures == 1
+    assert "超出耗时预算" in aggregates["超出预算"].last_error
+
+
+def test_async_requests_emit_request_events(server):
+    url = server.json("GET", "/item", {"id": 1})
+    seen = []
+
+    def record(event):
+        seen.append((event.name, event.data.get("status")))
+
+    for event in ("request_start", "request_end", "response_parsed"):
+        PAT.add_hook(event, record)
+
+    async def main():
+        await PAT.arun_test("异步", PAT.aget(url), "id")
+        await PAT.arun_test("无法连接", PAT.aget("http://127.0.0.1:9/x"))
+
+    try:
+        with PAT.profile_session(show=False) as session:
+            PAT.run_async(main())
+    finally:
+        for event in ("request_start", "request_end", "response_parsed"):
+            PAT.remove_hook(event, record)
+
+    assert seen[:3] == [("request_start", None), ("request_end", 200), ("response_parsed", None)]
+    assert seen[3:] == [("request_start", None), ("request_end", None)]
+    assert session.phases["网络"].count == 2
+    assert session.phases["JSON 解析"].count == 1
@@ -0,0 +1,59 @@
+import time
+
+import PAT
+
+
+def _slow(server, delay):
+    def handler(req, body):
+        time.sleep(delay[0])
+        return 200, {}, {"ok": True}
+
+    return server.route("GET", "/slow", handler)
+
+
+def test_max_time_fails_a_passing_step(server):
+    url = _slow(server, [0.05])
+    PAT.run_test("宽松", PAT.get(url), max_time=5)
+    PAT.run_test("超时", PAT.get(url), max_time=0.01)
+
+    aggregates = dict(PAT._test_results.aggregates())
+    assert aggregates["宽松"].failures == 0
+    assert aggregates["超时"].failures == 1
+    assert aggregates["超时"].last_error.startswith("超出耗时预算")
+
+
+def test_p95_budget_applies_after_twenty_samples(server):
+    url = _slow(server, [0.01])
+    for _ in range(PAT._P95_MIN_SAMPLES - 1):
+        PAT.run_test("p95", PAT.get(url), max_p95=0.001)
+    assert PAT._test_results.failures == 0
+
+    PAT.run_test("p95", PAT.get(url), max_p95=0.001)
+    aggregates = dict(PAT._test_results.aggregates())
+    assert aggregates["p95"].failures == 1
+    assert "p95 超出预算" in aggregates["p95"].last_error
+
+
+def test_baseline_flags_slower_steps(server, tmp_path):
+    delay = [0.0]
+    url = _slow(server, delay)
+    path = str(tmp_path / "baseline.json")
+    for _ in range(3):
+        PAT.run_test("查询", PAT.get(url))
+        PAT.run_test("稳定", PAT.get(server.json("GET", "/fast", {"ok": True})))
+    PAT.save_baseline(path)
+    PAT.clear_test_results()
+
+    try:
+        PAT.load_baseline(path, tolerance=0.5, min_delta=0.02)
+        delay[0] = 0.05
+        for _ in range(3):
+            PAT.run_test("查询", PAT.get(url))
+            PAT.run_test("稳定", PAT.get(server.base + "/fast"))
+        regressions = PAT.check_baseline()
+    finally:
+        PAT.load_baseline(None)
+
+    assert [r.description for r in regressions] == ["查询"]
+    assert regressions[0].current > regressions[0].baseline + 0.02
+    assert PAT.check_baseline() == []
@@ -0,0 +1,49 @@
+import json
+
+import PAT
+
+
+def _users(server):
+    server.json("GET", "/users/1", {"id": 1, "name": "a"})
+    server.json("GET", "/users/999", {"error": "not found"}, status=404)
+    server.route("POST", "/posts", lambda req, body: (201, {}, json.loads(body)))
+
+
+def test_jsonl_cases_count_malformed_rows_as_failed(server, tmp_path):
+    _users(server)
+    rows = [
+        json.dumps({"description": "获取用户", "url": "/users/{id}", "id": 1, "extract": ["name"]}),
+        json.dumps({"method": "POST", "url": "/posts", "body": {"title": "foo"}}),
+        json.dumps({"url": "/users/999", "should_fail": True}),
+        "{not json",
+        json.dumps({"url": "/users/{missing}"}),
+        json.dumps({"method": "FETCH", "url": "/users/1"}),
+        json.dumps({"description": "没有 URL"}),
+        "",
+    ]
+    path = tmp_path / "cases.jsonl"
+    path.write_text("\n".join(rows), encoding="utf-8")
+
+    summary = PAT.run_cases(str(path), max_workers=3, base_url=server.base)
+
+    assert summary == {"cases": 7, "passed": 3, "failed": 4}
+    assert server.hits == {"/users/1": 1, "/posts": 1, "/users/999": 1}
+    assert PAT._test_results.count == 7
+    assert PAT._test_results.failures == 4
+
+
+def test_csv_cases_use_variables_and_should_fail(server, tmp_path):
+    _users(server)
+    path = tmp_path / "cases.csv"
+    path.write_text(
+        "method,url,id,should_fail\n"
+        "GET,{base}/users/{id},1,false\n"
+        "GET,{base}/users/{id},999,yes\n"
+        "GET,{base}/users/{id},999,0\n",
+        encoding="utf-8",
+    )
+
+    summary = PAT.run_cases(str(path), variables={"base": server.base})
+
+    assert summary == {"cases": 3, "passed": 2, "failed": 1}
+    assert server.hits == {"/users/1": 1, "/users/999": 2}
@@ -0,0 +1,89 @@
+import PAT
+
+
+def _statements(cassette):
+    seen = []
+    cassette._db.set_trace_callback(seen.append)
+    return seen
+
+
+def test_replay_hits_do_not_write(tmp_path, server):
+    url = server.json("GET", "/item", {"id": 1})
+    cassette = PAT.Cassette(str(tmp_path / "c.db"))
+    PAT.open_engine(cassette=cassette)
+    PAT.get(url)
+
+    seen = _statements(cassette)
+    for _ in range(20):
+        assert PAT.get(url)[1] == {"id": 1}
+
+    assert server.hits["/item"] == 1
+    assert cassette.hits == 20
+    assert not [sql for sql in seen if not sql.startswith("SELECT")]
+    cassette.close()
+
+
+def test_save_under_limit_does_not_scan(tmp_path):
+    cassette = PAT.Cassette(str(tmp_path / "c.db"), max_bytes=10_000_000)
+    seen = _statements(cassette)
+    for i in range(20):
+        cassette.save(f"k{i}", "GET", "/x", 200, {}, b"body")
+    assert not [sql for sql in seen if "ORDER BY last_used" in sql]
+    cassette.close()
+
+
+def test_eviction_respects_replay_access(tmp_path):
+    path = str(tmp_path / "c.db")
+    with PAT.Cassette(path) as cassette:
+        for key in ("a", "b", "c"):
+            cassette.save(key, "GET", "/x", 200, {}, b"x" * 1000)
+        size = cassette.stats()["bytes"]
+        # a 最近被回放过，淘汰时应先淘汰 b
+        assert cassette.load("a") is not None
+
+    with PAT.Cassette(path, max_bytes=size) as cassette:
+        cassette.save("d", "GET", "/x", 200, {}, b"x" * 1000)
+        assert cassette.load("b") is None
+        assert cassette.load("a") is not None
+        assert cassette.evicted == 1
+
+
+def test_access_times_persist_on_close(tmp_path):
+    path = str(tmp_path / "c.db")
+    with PAT.Cassette(path) as cassette:
+        cassette.save("a", "GET", "/x", 200, {}, b"x")
+        before = cassette._db.execute("SELECT last_used FROM entries").fetchone()[0]
+        cassette.load("a")
+    with PAT.Cassette(path) as cassette:
+        after = cassette._db.execute("SELECT last_used FROM entries").fetchone()[0]
+    assert after > before
+
+
+def test_replay_only_blocks_streamed_and_sink_requests(tmp_path, server):
+    upload = server.json("POST", "/upload", {"ok": True})
+    export = server.json("GET", "/export", {"rows": 3})
+    source = tmp_path / "data.bin"
+    source.write_bytes(b"x" * 1000)
+
+    with PAT.Cassette(str(tmp_path / "c.db"), mode="replay_only") as cassette:
+        PAT.open_engine(cassette=cassette)
+        status, _, code, _ = PAT.post(upload, PAT.FileBody(str(source)))
+        assert (status, code) == ("❌", 999)
+        sink = PAT.DownloadSink(str(tmp_path / "out.json"))
+        status, _, code, _ = PAT.get(export, sink=sink)
+        assert (status, code) == ("❌", 999)
+    assert server.hits == {}
+    assert not (tmp_path / "out.json").exists()
+
+
+def test_record_mode_sends_streamed_requests_without_recording(tmp_path, server):
+    upload = server.json("POST", "/upload", {"ok": True})
+    source = tmp_path / "data.bin"
+    source.write_bytes(b"x" * 1000)
+
+    with PAT.Cassette(str(tmp_path / "c.db")) as cassette:
+        PAT.open_engine(cassette=cassette)
+        assert PAT.post(upload, PAT.FileBody(str(source)))[1] == {"ok": True}
+        assert PAT.post(upload, PAT.FileBody(str(source)))[1] == {"ok": True}
+        assert cassette.hits == 0
+    assert server.hits["/upload"] == 2
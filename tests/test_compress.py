@@ -0,0 +1,69 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+import PAT
+
+BODY = {"rows": [{"id": i, "name": "用户", "note": "重复内容" * 4} for i in range(200)]}
+
+
+def _decode(req, body):
+    encoding = req.headers.get("Content-Encoding")
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "deflate":
+        body = zlib.decompress(body)
+    return 200, {}, {
+        "encoding": encoding,
+        "chunked": req.headers.get("Transfer-Encoding") == "chunked",
+        "size": len(body),
+        "rows": len(json.loads(body)["rows"]),
+    }
+
+
+@pytest.mark.parametrize("algorithm", ["gzip", "deflate"])
+def test_request_body_is_compressed(server, algorithm):
+    url = server.route("POST", "/bulk", _decode)
+    PAT.open_engine(compress=algorithm)
+
+    response = PAT.post(url, BODY)
+
+    assert response[1]["encoding"] == algorithm and response[1]["rows"] == 200
+    timing = response.timing
+    assert timing.bytes_sent_uncompressed == len(PAT._dumps(BODY)) == response[1]["size"]
+    assert timing.bytes_sent < timing.bytes_sent_uncompressed / 5
+    assert PAT._test_results.total_sent == 0
+    PAT.run_test("批量写入", response)
+    assert PAT._test_results.total_sent == timing.bytes_sent
+
+
+def test_small_and_streamed_bodies(server):
+    url = server.route("POST", "/bulk", _decode)
+    PAT.open_engine(compress="gzip", compress_min_size=4096)
+
+    small = PAT.post(url, {"rows": []})
+    assert small[1]["encoding"] is None
+    assert small.timing.bytes_sent == small.timing.bytes_sent_uncompressed
+
+    raw = PAT._dumps(BODY)
+    streamed = PAT.post(url, (raw[i : i + 1000] for i in range(0, len(raw), 1000)))
+    assert streamed[1] == {"encoding": "gzip", "chunked": True, "size": len(raw), "rows": 200}
+    assert streamed.timing.bytes_sent < streamed.timing.bytes_sent_uncompressed
+
+
+def test_uncompressed_by_default_and_compressed_responses(server):
+    url = server.route("POST", "/bulk", _decode)
+    payload = PAT._dumps(BODY)
+    packed = gzip.compress(payload)
+    download = server.route("GET", "/export", lambda req, body: (200, {"Content-Encoding": "gzip"}, packed))
+
+    plain = PAT.post(url, BODY)
+    assert plain[1]["encoding"] is None
+    assert plain.timing.bytes_sent == plain.timing.bytes_sent_uncompressed == len(payload)
+
+    response = PAT.get(download)
+    assert response[1] == BODY
+    assert response.timing.bytes_received == len(packed)
+    assert response.timing.bytes_received_uncompressed == len(payload)
@@ -0,0 +1,101 @@
+import tracemalloc
+
+import PAT
+
+DATA = {
+    "10:30": {"slot": "morning"},
+    "items": [{"name": "a"}, {"name": "b"}, {"id": 3}],
+}
+
+
+def test_slice_like_key_on_object():
+    values, errors = PAT._extract_many(DATA, ("10:30.slot", "items.0:2.name"))
+    assert values == ["morning", ["a", "b"]]
+    assert errors == {}
+
+
+def test_wildcard_typo_is_reported():
+    values, errors = PAT._extract_many(DATA, ("*.nmae", "items.*.nmae", "items.*.name"))
+    assert values[1] == [] and values[2] == ["a", "b"]
+    assert "key 'nmae' not found at 'items.*'" in errors[1]
+    assert 2 not in errors
+
+
+def test_partial_wildcard_match_is_not_an_error():
+    values, errors = PAT._extract_many({"items": [{"id": 1}, {}]}, ("items.*.id",))
+    assert values == [[1]] and errors == {}
+
+
+def test_streamed_slice_like_key(server):
+    url = server.json("GET", "/schedule", DATA)
+    slot, names = PAT.run_test(
+        "流式提取", PAT.get(url, stream=True), "10:30.slot", "items.*.name"
+    )
+    assert slot == "morning"
+    assert names == ["a", "b"]
+
+
+NESTED = {
+    "items": [
+        {"id": 1, "user": {"name": "a"}, "tags": ["x", "y"]},
+        {"id": 2, "user": {}, "tags": []},
+        {"id": 3, "user": {"name": "c"}, "tags": ["z"]},
+        7,
+    ],
+    "meta": {"count": 4},
+}
+PATHS = (
+    "items.*.id",
+    "items.*.user.name",
+    "items.0:2.id",
+    "items.1:3.user.name",
+    "items.*.nmae",
+    "items.*.tags.-1",
+    "items.*.tags.*",
+    "items.-1",
+    "items.0.user",
+    "items.*",
+    "*.count",
+)
+
+
+def test_streamed_extraction_matches_parsed(server):
+    url = server.json("GET", "/nested", NESTED)
+    expected = PAT._extract_many(NESTED, PATHS)
+    content = PAT.get(url, stream=True)[1]
+    assert content.extract(PATHS) == expected
+    # 首次读取时指定的路径的任意子集都可以再次提取
+    subset = PATHS[4:0:-1]
+    assert content.extract(subset) == PAT._extract_many(NESTED, subset)
+
+
+def test_streamed_wildcard_keeps_only_values(server):
+    items = [{"id": i, "name": f"user{i}", "payload": "x" * 200} for i in range(50_000)]
+    url = server.json("GET", "/export", {"items": items})
+    del items
+    content = PAT.get(url, stream=True)[1]
+
+    tracemalloc.start()
+    try:
+        (ids,), errors = content.extract(("items.*.id",))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert errors == {} and ids == list(range(50_000))
+    # 响应体约 12 MB；为每个元素重建字典时峰值约 30 MB
+    assert peak < 4 * 1024 * 1024
+
+
+def test_wildcard_walk_does_not_buffer_per_element_results():
+    data = {"items": [{"id": i} for i in range(100_000)]}
+    tracemalloc.start()
+    try:
+        (ids, names), errors = PAT._extract_many(data, ("items.*.id", "items.0:10.name"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert ids == list(range(100_000)) and names == []
+    assert errors == {1: "no element matched: key 'name' not found at 'items.0:10'"}
+    # 为每个元素分配结果字典时峰值约 24 MB
+    assert peak < 2 * 1024 * 1024
@@ -0,0 +1,87 @@
+import dataclasses
+import datetime
+import enum
+import uuid
+
+import pytest
+
+import PAT
+
+BODY = {"name": "用户", "tags": ["a", "b"], "nested": {"n": 1, "x": None, "ok": True}, "score": 1.5}
+
+
+@pytest.fixture
+def backend():
+    old = PAT.get_json_backend()
+    yield PAT.set_json_backend
+    PAT.set_json_backend(old)
+
+
+def test_backends_encode_identically(backend):
+    pytest.importorskip("orjson")
+    backend("orjson")
+    fast = PAT._dumps(BODY)
+    backend("json")
+    assert PAT._dumps(BODY) == fast
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+@dataclasses.dataclass
+class Point:
+    x: float
+    y: float
+
+
+SPECIAL = {
+    "nan": float("nan"),
+    "inf": [float("inf"), float("-inf")],
+    "naive": datetime.datetime(2024, 1, 2, 3, 4, 5),
+    "aware": datetime.datetime(2024, 1, 2, 3, 4, 5, 123, tzinfo=datetime.timezone.utc),
+    "date": datetime.date(2024, 1, 2),
+    "time": datetime.time(3, 4, 5),
+    "uuid": uuid.UUID(int=5),
+    "color": Color.RED,
+    "point": Point(1.5, float("nan")),
+    "keys": {1: "a", None: "b"},
+}
+
+
+def test_backends_encode_special_values_identically(backend):
+    pytest.importorskip("orjson")
+    backend("orjson")
+    fast = PAT._dumps(SPECIAL)
+    backend("json")
+    assert PAT._dumps(SPECIAL) == fast
+    assert PAT._loads(fast)["nan"] is None
+
+
+def test_stdlib_backend_rejects_unknown_and_circular_values(backend):
+    backend("json")
+    with pytest.raises(TypeError):
+        PAT._dumps({"value": object()})
+    loop = [float("nan")]
+    loop.append(loop)
+    with pytest.raises(ValueError):
+        PAT._dumps(loop)
+
+
+def test_cassette_key_independent_of_backend(backend, server, tmp_path):
+    pytest.importorskip("orjson")
+    url = server.json("POST", "/items", {"id": 7})
+    path = str(tmp_path / "c.db")
+
+    backend("orjson")
+    with PAT.Cassette(path) as cassette:
+        PAT.open_engine(cassette=cassette)
+        assert PAT.post(url, BODY)[1] == {"id": 7}
+        PAT.close_engine(show=False)
+
+    backend("json")
+    with PAT.Cassette(path, mode="replay_only") as cassette:
+        PAT.open_engine(cassette=cassette)
+        assert PAT.post(url, BODY)[1] == {"id": 7}
+        assert cassette.hits == 1
+    assert server.hits["/items"] == 1
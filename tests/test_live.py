@@ -0,0 +1,54 @@
+import io
+
+import pytest
+from rich.console import Console
+
+import PAT
+
+
+def _render(progress):
+    console = Console(width=120, record=True, file=io.StringIO())
+    console.print(progress._render())
+    return console.export_text()
+
+
+def test_live_progress_counts_results(server):
+    ok = server.json("GET", "/ok", {"ok": True})
+    broken = server.json("GET", "/broken", {"error": "boom"}, status=500)
+
+    with PAT.live_progress(total=3, failures=2, show=False) as progress:
+        PAT.run_test("正常 1", PAT.get(ok))
+        PAT.run_test("正常 2", PAT.get(ok))
+        PAT.run_test("出错", PAT.get(broken))
+        text = _render(progress)
+
+    assert (progress.completed, progress.failed) == (3, 1)
+    assert "3/3 (100%)" in text and "成功 2" in text and "失败 1" in text
+    assert "出错" in text and "500" in text and "boom" in text
+    assert PAT._live_progress is None
+    assert PAT._test_results.count == 3
+
+
+def test_live_progress_keeps_recent_failures_and_rejects_nesting():
+    with PAT.live_progress(failures=2, show=False) as progress:
+        with pytest.raises(RuntimeError):
+            PAT.live_progress().__enter__()
+        for i in range(4):
+            progress.record(f"失败 {i}", False, 500, {"error": i}, 0.01 * (i + 1))
+        completed, failed, _, _, pct, sampled, failures = progress._snapshot()
+
+    assert (completed, failed, sampled) == (4, 4, 4)
+    assert [f[0] for f in failures] == ["失败 2", "失败 3"]
+    assert pct[50] == pytest.approx(0.02) and pct[99] == pytest.approx(0.04)
+
+
+def test_headless_progress_prints_plain_lines(capsys):
+    PAT.set_verbosity("full")
+    PAT.set_headless(True)
+    try:
+        with PAT.live_progress(total=2, show=False) as progress:
+            progress.record("步骤", True, 200, {}, 0.005)
+    finally:
+        PAT.set_headless(False)
+    out = capsys.readouterr().out
+    assert "进度 1/2 (50%)" in out and "失败 0" in out
@@ -0,0 +1,47 @@
+import os
+import time
+
+import pytest
+
+import PAT
+
+
+def _crash_before_connect(scenario, address, authkey):
+    os._exit(3)
+
+
+def _never_connect(scenario, address, authkey):
+    time.sleep(30)
+
+
+def _noop():
+    pass
+
+
+def test_worker_crash_before_connect_is_reported(monkeypatch):
+    monkeypatch.setattr(PAT, "_process_node", _crash_before_connect)
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="退出码 3"):
+        PAT.multiprocess_load_test(_noop, processes=2, users=2, iterations=2, show=False)
+    assert time.perf_counter() - start < 10
+
+
+def test_connect_timeout(monkeypatch):
+    monkeypatch.setattr(PAT, "_process_node", _never_connect)
+    with pytest.raises(TimeoutError, match="0/1"):
+        PAT.multiprocess_load_test(
+            _noop, processes=1, users=1, iterations=1, show=False, connect_timeout=0.5
+        )
+
+
+def test_multiprocess_load_test_merges_reports(server):
+    url = server.json("GET", "/ping", {"ok": True})
+
+    def scenario():
+        PAT.get(url)
+
+    report = PAT.multiprocess_load_test(
+        scenario, processes=2, users=2, iterations=6, show=False
+    )
+    assert report.nodes == 2
+    assert report.iterations == 6
@@ -0,0 +1,27 @@
+import PAT
+
+HTML = b"<html><body>502 Bad Gateway</body></html>"
+
+
+def _html(server):
+    return server.route("GET", "/page", lambda req, body: (200, {"Content-Type": "text/html"}, HTML))
+
+
+def test_extract_reports_non_json_body(server):
+    url = _html(server)
+    status, content, _, _ = PAT.get(url)
+    assert status == "❌"
+    assert "text/html" in content
+    values, errors = PAT._extract_content(content, ("id",))
+    assert values == [None]
+    assert errors[0].startswith("响应不是有效的JSON格式") and "text/html" in errors[0]
+
+
+def test_streamed_non_json_body(server):
+    url = _html(server)
+    content = PAT.get(url, stream=True)[1]
+    values, errors = PAT._extract_content(content, ("id",))
+    assert values == [None]
+    assert "text/html" in errors[0] and "无效的 JSON" in errors[0]
+    assert PAT.run_test("流式 HTML", PAT.get(url, stream=True), "id") is None
+    assert dict(PAT._test_results.aggregates())["流式 HTML"].failures == 1
@@ -0,0 +1,73 @@
+import cProfile
+import sys
+import threading
+
+import pytest
+
+import PAT
+
+
+def _worker_only():
+    return sum(range(1000))
+
+
+def _functions(session):
+    return {name for (_, _, name) in session.stats.stats}
+
+
+def test_profile_includes_worker_threads():
+    with PAT.profile_session(show=False) as session:
+        thread = threading.Thread(target=_worker_only)
+        thread.start()
+        thread.join()
+    assert "_worker_only" in _functions(session)
+
+
+def test_profile_includes_suite_steps(server):
+    url = server.json("GET", "/ok", {"ok": True})
+
+    def verb(target):
+        _worker_only()
+        return PAT.get(target)
+
+    with PAT.profile_session(show=False) as session:
+        suite = PAT.Suite(max_workers=2)
+        suite.step("步骤", verb, url, "ok")
+        assert suite.run() == [True]
+    assert "_worker_only" in _functions(session)
+    assert threading.getprofile() is None
+
+
+def test_nested_session_skips_cprofile(server):
+    url = server.json("GET", "/ok", {"ok": True})
+    with PAT.profile_session(show=False) as outer:
+        with PAT.profile_session(show=False) as inner:
+            PAT.run_test("嵌套步骤", PAT.get(url))
+        assert inner.stats is None
+        assert inner.cpu_skipped
+        assert inner.phases["网络"].count == 1
+        assert not any(inner._on_event in hooks for hooks in PAT._hooks.values())
+        with PAT.profile_session(show=False) as again:
+            pass
+        assert again.cpu_skipped
+    assert outer.stats is not None and outer.cpu_skipped is None
+    assert outer.phases["网络"].count == 1
+    assert PAT._hooks == {}
+
+    with PAT.profile_session(show=False) as later:
+        pass
+    assert later.stats is not None
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="cProfile 基于 sys.monitoring 时才只允许一个剖析工具")
+def test_session_survives_foreign_profiler():
+    foreign = cProfile.Profile()
+    foreign.enable()
+    try:
+        with PAT.profile_session(show=False) as session:
+            pass
+    finally:
+        foreign.disable()
+    assert session.cpu_skipped and session.stats is None
+    assert PAT._hooks == {}
+    assert PAT._cpu_session is None
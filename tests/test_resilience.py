@@ -0,0 +1,72 @@
+import time
+
+import PAT
+
+
+def _unavailable(req, body):
+    return 503, {"Retry-After": "0"}, {"error": "down"}
+
+
+def _flaky(fail_times):
+    calls = []
+
+    def handler(req, body):
+        calls.append(1)
+        if len(calls) <= fail_times:
+            return 503, {}, {"error": "down"}
+        return 200, {}, {"ok": True}
+
+    return handler
+
+
+def test_retries_idempotent_requests(server):
+    url = server.route("GET", "/flaky", _flaky(2))
+    PAT.open_engine(retries=3, backoff=0.001)
+    response = PAT.get(url)
+    assert response[2] == 200
+    assert response.timing.retries == 2
+    assert server.hits["/flaky"] == 3
+
+
+def test_post_is_not_retried(server):
+    url = server.route("POST", "/flaky", _flaky(1))
+    PAT.open_engine(retries=3, backoff=0.001)
+    assert PAT.post(url, {"a": 1})[2] == 503
+    assert server.hits["/flaky"] == 1
+
+
+def test_breaker_counts_requests_not_attempts(server):
+    url = server.route("GET", "/down", _unavailable)
+    PAT.open_engine(retries=2, backoff=0.001, breaker_threshold=3, breaker_cooldown=60)
+
+    for _ in range(2):
+        assert PAT.get(url)[2] == 503
+    assert server.hits["/down"] == 6
+
+    assert PAT.get(url)[2] == 503
+    response = PAT.get(url)
+    assert response[2] == 999
+    assert response.timing.error == "circuit_open"
+    assert server.hits["/down"] == 9
+
+
+def test_breaker_probe_closes_after_recovery(server):
+    url = server.route("GET", "/flaky", _flaky(2))
+    PAT.open_engine(breaker_threshold=2, breaker_cooldown=0.2)
+    PAT.get(url)
+    PAT.get(url)
+    assert PAT.get(url).timing.error == "circuit_open"
+    time.sleep(0.25)
+    assert PAT.get(url)[2] == 200
+    assert PAT.get(url)[2] == 200
+    assert PAT.engine_stats()["rejected"] == 1
+
+
+def test_rate_limit(server):
+    url = server.json("GET", "/ok", {"ok": True})
+    PAT.open_engine(rate_limit=50, burst=5)
+    start = time.perf_counter()
+    for _ in range(25):
+        PAT.get(url)
+    elapsed = time.perf_counter() - start
+    assert 0.35 < elapsed < 2.0
@@ -0,0 +1,79 @@
+import hashlib
+import io
+import os
+
+import PAT
+
+
+class _RecordingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+    def readline(self, size=-1):
+        raise AssertionError("文件对象不应按行读取")
+
+
+def _echo_size(req, body):
+    return 200, {}, {"size": len(body), "sha256": hashlib.sha256(body).hexdigest()}
+
+
+def test_file_object_is_read_in_fixed_chunks(server):
+    url = server.route("POST", "/upload", _echo_size)
+    data = os.urandom(3 * 1024 * 1024)
+    f = _RecordingFile(data)
+
+    status, content, _, _ = PAT.post(url, f)
+
+    assert status == "✅"
+    assert content == {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    sizes = [size for size in f.reads if size]
+    assert sizes and all(size == PAT._CHUNK_SIZE for size in sizes)
+
+
+def test_open_binary_file_upload(server, tmp_path):
+    url = server.route("PUT", "/upload", _echo_size)
+    path = tmp_path / "blob.bin"
+    data = b"\n".join(os.urandom(64) for _ in range(2000))
+    path.write_bytes(data)
+
+    with open(path, "rb") as f:
+        status, content, _, _ = PAT.put(url, f)
+
+    assert status == "✅"
+    assert content["sha256"] == hashlib.sha256(data).hexdigest()
+
+
+def test_text_file_and_multipart_field(server, tmp_path):
+    url = server.route("POST", "/form", _echo_size)
+    path = tmp_path / "notes.txt"
+    path.write_text("第一行\n第二行\n", encoding="utf-8")
+
+    with open(path, encoding="utf-8") as f:
+        form = PAT.MultipartBody({"file": ("notes.txt", f, "text/plain")})
+        status, _, _, _ = PAT.post(url, form)
+
+    assert status == "✅"
+    assert "第二行".encode("utf-8") in server.bodies["/form"][0]
+
+
+def test_file_body_and_download_sink(server, tmp_path):
+    data = os.urandom(200_000)
+    url = server.route("GET", "/export", lambda req, body: (200, {"Content-Type": "application/octet-stream"}, data))
+    target = tmp_path / "export.bin"
+
+    sink = PAT.DownloadSink(str(target), checksum=hashlib.sha256(data).hexdigest())
+    status, content, _, _ = PAT.get(url, sink=sink)
+
+    assert status == "✅"
+    assert content["bytes"] == len(data)
+    assert target.read_bytes() == data
+
+    upload = server.route("POST", "/upload", _echo_size)
+    for use_mmap in (False, True):
+        result = PAT.post(upload, PAT.FileBody(str(target), mmap=use_mmap))
+        assert result[1]["sha256"] == hashlib.sha256(data).hexdigest()
@@ -0,0 +1,79 @@
+import PAT
+
+
+def _broken_verb(url):
+    raise ValueError("坏的参数")
+
+
+def test_step_exception_is_recorded_as_failure(server):
+    user = server.json("GET", "/user", {"id": 3})
+    ok = server.json("GET", "/ok", {"ok": True})
+
+    suite = PAT.Suite(max_workers=2)
+    uid = suite.step("登录", PAT.get, user, "id")
+    suite.step("错误的模板", PAT.get, PAT.fmt(ok + "?u={missing}", uid))
+    suite.step("方法出错", _broken_verb, ok)
+    value = suite.step("正常步骤", PAT.get, PAT.fmt(ok + "?u={}", uid), "ok")
+    results = suite.run()
+
+    assert results[0] == 3
+    assert results[3] is True
+    log = PAT._test_results
+    assert log.count == 4
+    assert log.failures == 2
+    aggregates = dict(log.aggregates())
+    assert aggregates["错误的模板"].failures == 1
+    assert aggregates["方法出错"].failures == 1
+    assert value.value is True
+
+
+def test_dependent_steps_wait_for_refs(server):
+    server.json("GET", "/user", {"id": 5})
+    server.route("GET", "/posts", lambda req, body: (200, {}, {"path": req.path}))
+
+    suite = PAT.Suite(max_workers=4)
+    uid = suite.step("用户", PAT.get, server.base + "/user", "id")
+    suite.step("帖子", PAT.get, PAT.fmt(server.base + "/posts?user={}", uid), "path")
+    assert suite.run() == [5, "/posts?user=5"]
+
+
+def _upload_suite(server, source, history):
+    url = server.route("POST", "/upload", lambda req, body: (200, {}, {"size": len(body)}))
+    suite = PAT.Suite(max_workers=2, history=history)
+    size = suite.step("上传", PAT.post, url, "size", body=PAT.FileBody(str(source)))
+    return suite, size
+
+
+def test_reuse_hits_file_body_step_across_runs(server, tmp_path):
+    source = tmp_path / "data.bin"
+    source.write_bytes(b"x" * 2048)
+    history = str(tmp_path / "history.db")
+
+    suite, _ = _upload_suite(server, source, history)
+    assert suite.run() == [2048]
+    suite.history.close()
+    suite, size = _upload_suite(server, source, history)
+    assert suite.run(reuse=True) == [2048]
+    assert server.hits["/upload"] == 1
+    assert suite.summary["reused"] == 1
+
+    source.write_bytes(b"y" * 4096)
+    suite.history.close()
+    suite, _ = _upload_suite(server, source, history)
+    assert suite.run(reuse=True) == [4096]
+    assert server.hits["/upload"] == 2
+
+
+def test_unstable_arguments_are_never_reused(server, tmp_path):
+    source = tmp_path / "data.bin"
+    source.write_bytes(b"x" * 16)
+    url = server.route("POST", "/upload", lambda req, body: (200, {}, {"size": len(body)}))
+    history = PAT.RunHistory(str(tmp_path / "history.db"))
+    for _ in range(2):
+        with open(source, "rb") as f:
+            suite = PAT.Suite(history=history)
+            suite.step("句柄上传", PAT.post, url, "size", body=f)
+            suite.run(reuse=True)
+        assert suite._steps[0].fingerprint is None
+    assert server.hits["/upload"] == 2
+    history.close()
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import PAT
+
+
+def _echo(req, body):
+    return 200, {}, {
+        "path": req.path,
+        "auth": req.headers.get("Authorization"),
+        "type": req.headers.get("Content-Type"),
+        "body": json.loads(body) if body else None,
+    }
+
+
+def test_template_fills_url_and_body_params(server):
+    server.route("POST", "/groups/a%20b%2Fc/users", _echo)
+    create = PAT.RequestTemplate(
+        "post",
+        server.base + "/groups/{group}/users",
+        {"name": PAT.Param("name"), "role": "member", "tags": [PAT.Param("tag")]},
+        key="secret",
+    )
+    assert create.params == {"group", "name", "tag"}
+
+    status, content, code, _ = create(group="a b/c", name="用户 1", tag={"x": 1})
+
+    assert (status, code) == ("✅", 200)
+    assert content["path"] == "/groups/a%20b%2Fc/users"
+    assert content["auth"] == "Bearer secret"
+    assert content["type"] == "application/json"
+    assert content["body"] == {"name": "用户 1", "role": "member", "tags": [{"x": 1}]}
+
+
+def test_template_matches_plain_verb(server):
+    server.route("POST", "/items", _echo)
+    template = PAT.RequestTemplate("POST", server.base + "/items", {"id": PAT.Param("id")})
+    for i in range(3):
+        assert template(id=i)[1] == PAT.post(server.base + "/items", {"id": i})[1]
+    assert [json.loads(b) for b in server.bodies["/items"]] == [{"id": i} for i in (0, 0, 1, 1, 2, 2)]
+
+
+def test_template_rejects_missing_and_unknown_params(server):
+    template = PAT.RequestTemplate("GET", server.base + "/users/{id}")
+    with pytest.raises(TypeError, match="缺少参数: id"):
+        template()
+    with pytest.raises(TypeError, match="没有这些参数: extra"):
+        template(id=1, extra=2)
+    assert server.hits == {}